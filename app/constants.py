@@ -34,6 +34,131 @@ MEAL_RISTRICTIONS = [
     "Gluten-Free",
     "Balanced-Meal",
 ]
+CALORIE_ENTITIES = ["no-calories", "low-calorie", "mid-calorie", "high-calorie"]
+PORTION_ENTITIES = [
+    "no-serving-size",
+    "small-portion",
+    "medium-portion",
+    "large-portion",
+]
+MACRONUTRIENT_ENTITIES = [
+    f"{nutrient}-free" if level == "free" else f"{level}-{nutrient}"
+    for nutrient in [
+        "fat",
+        "sat-fat",
+        "cholesterol",
+        "sodium",
+        "carb",
+        "sugar",
+        "fiber",
+        "protein",
+    ]
+    for level in ["free", "low", "mid", "high"]
+]
+
+# Numeric columns of the menu CSVs, indexed as `metadata.nutrition.<column>`.
+NUTRITION_COLUMNS = [
+    "serving_size",
+    "calories",
+    "fat_g",
+    "sat_fat_g",
+    "trans_fat_g",
+    "cholesterol_mg",
+    "sodium_mg",
+    "carbohydrates_g",
+    "fiber_g",
+    "sugar_g",
+    "protein_g",
+]
+
+# Per-serving thresholds behind the calorie/portion/macronutrient buckets:
+# entity prefix -> (column, "free" below, "low" up to, "high" from).
+# Fitted to the labeled buckets of data_prep/chick-fil-a.csv with
+# data_prep/fit_nutrition_thresholds.py (89-100% of the labels reproduced).
+NUTRITION_THRESHOLDS = {
+    "calorie": ("calories", 5, 190, 410),
+    "fat": ("fat_g", 0.5, 2.5, 10),
+    "sat-fat": ("sat_fat_g", 0.5, 1.5, 5),
+    "cholesterol": ("cholesterol_mg", 5, 95, 180),
+    "sodium": ("sodium_mg", 10, 140, 400),
+    "carb": ("carbohydrates_g", 1, 14, 50),
+    "sugar": ("sugar_g", 1, 4, 15),
+    "fiber": ("fiber_g", 1, 2, 8),
+    "protein": ("protein_g", 1, 4, 20),
+    "portion": ("serving_size", 1, 100, 300),
+}
+
+
+def _nutrition_ranges() -> dict:
+    ranges = {}
+    for nutrient, (column, free, low, high) in NUTRITION_THRESHOLDS.items():
+        ranges[f"{nutrient}-free"] = (column, {"lt": free})
+        ranges[f"low-{nutrient}"] = (column, {"lte": low})
+        ranges[f"mid-{nutrient}"] = (column, {"gt": low, "lt": high})
+        ranges[f"high-{nutrient}"] = (column, {"gte": high})
+    ranges["no-calories"] = ranges.pop("calorie-free")
+    ranges["no-serving-size"] = ranges.pop("portion-free")
+    ranges["small-portion"] = ranges.pop("low-portion")
+    ranges["medium-portion"] = ranges.pop("mid-portion")
+    ranges["large-portion"] = ranges.pop("high-portion")
+    return ranges
+
+
+# Bucket entity -> (nutrition column, OpenSearch `range` bounds).
+NUTRITION_RANGES = _nutrition_ranges()
+
+# Extra surface forms for the closed extraction vocabulary, used by the rule-based
+# extractor. Hyphen/space variants of every entity are generated automatically.
+ENTITY_SYNONYMS = {
+    "keto": ["ketogenic", "keto-friendly", "keto friendly"],
+    "vegan": ["plant based", "plant-based"],
+    "paleo": ["paleolithic"],
+    "Mediterranean": ["mediterranean diet"],
+    "Gluten-Free": ["gluten free", "celiac friendly"],
+    "Balanced-Meal": ["balanced diet"],
+    "no-calories": ["zero calorie", "zero calories", "calorie free", "calorie-free"],
+    "low-calorie": ["low calories", "low cal"],
+    "high-calorie": ["high calories", "calorie dense", "bulking"],
+    "small-portion": ["small portions", "small serving", "light bite"],
+    "medium-portion": ["medium portions", "regular portion", "regular size"],
+    "large-portion": ["large portions", "large serving", "big portion"],
+    "low-carb": ["low carbs", "low carbohydrate", "few carbs"],
+    "high-carb": ["high carbs", "high carbohydrate", "carb heavy"],
+    "carb-free": ["no carb", "zero carb", "carbless"],
+    "high-protein": ["protein rich", "protein-rich", "protein packed", "lots of protein"],
+    "low-protein": ["little protein"],
+    "high-fiber": ["fiber rich", "fibre rich", "high fibre"],
+    "low-fiber": ["low fibre"],
+    "fat-free": ["no fat", "zero fat", "nonfat", "non-fat"],
+    "low-fat": ["low fats"],
+    "sugar-free": ["no sugar", "zero sugar", "unsweetened"],
+    "low-sugar": ["little sugar", "less sugar"],
+    "low-sodium": ["low salt", "less salt"],
+    "sodium-free": ["salt free", "no salt"],
+    "low-cholesterol": ["heart healthy", "heart-healthy"],
+    "chick-fil-a": ["chick fil a", "chickfila", "chick-fil-a's"],
+    "trader-joe": ["trader joe", "trader joes", "trader joe's"],
+}
+
+# Words that flip an entity into `exclude` when they precede it in the same clause.
+NEGATION_CUES = [
+    "no",
+    "not",
+    "without",
+    "avoid",
+    "avoiding",
+    "exclude",
+    "excluding",
+    "except",
+    "free of",
+    "allergic to",
+    "allergy to",
+    "intolerant to",
+    "can't have",
+    "cannot have",
+    "don't want",
+    "do not want",
+]
 
 USER_CUSTOM_QUERY_PROMPT = """I have allergies to {ALLERGIES}, 
 and my current height is {HEIGHT} cm and weight is {WEIGHT} kg. My goal is to reach a weight of 
@@ -105,6 +230,9 @@ PROMPT_CHAT_TEMPLATE_WITH_MENU_AND_INFO = """You are FitAI"""
 PROMPT_CHAT_TEMPLATE_WITH_INFO = """You are FitAI, a dietitian and nutritionist AI assistan.
 """
 
+# Bump whenever PROMPT_TEMPLATE_EXTRACT_METADATA_FROM_USER changes meaning, so cached
+# extraction results from the previous template are no longer served.
+PROMPT_TEMPLATE_EXTRACT_METADATA_VERSION = "1"
 PROMPT_TEMPLATE_EXTRACT_METADATA_FROM_USER = """Categorize the user's preferences into three categories: **recommended**, **exclude**, and **queries_or_faqs**.
 
 ### Task 1: Classify the following entities into the appropriate categories:
@@ -174,16 +302,33 @@ class vectorSearchType(Enum):
     PAINLESS_SCRIPTING_SEARCH = "painless_scripting"
 
 
+class IngestMode(Enum):
+    # write every chunk, overwriting documents with the same id
+    INDEX = "index"
+    # skip chunks whose content hash is already indexed under their id
+    UPSERT = "upsert"
+
+
 class IndexesEnum(Enum):
     INDEX_OF_MENUS = "index-of-menus"
     INDEX_OF_FAQ = "index-of-faqs"
 
 
+# Holds one document per vector index counting its ingests, so in-process
+# replicas can tell when to reload, and the reindex markers and ingest leases
+# that keep uploads and reindexes of an index apart (see `IndexManager`).
+INGEST_GENERATION_INDEX = "fitai-ingest-generations"
+
+
 class AvailableRestaurants(Enum):
     CHICK_FIL_A = "chick-fil-a"
     TRADER_JOE = "trader-joe"
 
 
+# Restaurants offered to the metadata extractor (LLM prompt and rule-based path).
+EXTRACTION_RESTAURANTS = [AvailableRestaurants.CHICK_FIL_A.value]
+
+
 class Temperature(Enum):
     """Can be adjusted to influence how creative
     or conservative the generated responses are."""
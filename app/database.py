@@ -1,18 +1,10 @@
-import os
 from typing import AsyncGenerator
 
 from motor import motor_asyncio
 
-from app.core.config import config
-
-DB_URL = os.environ.get('DB_URL')
+from app.main import app
 
 
 async def get_db() -> AsyncGenerator[motor_asyncio.AsyncIOMotorDatabase, None]:
-    client = motor_asyncio.AsyncIOMotorClient(DB_URL)
-
-    database = client[config.db_name]
-    try:
-        yield database
-    finally:
-        client.close()
+    """The database of the lifespan's pooled client; nothing to close per request."""
+    yield app.db_instance
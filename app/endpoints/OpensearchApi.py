@@ -1,3 +1,5 @@
+import asyncio
+import json
 import shutil
 import time
 from fastapi import (
@@ -8,19 +10,23 @@ from fastapi import (
     UploadFile,
     status,
 )
-from typing import List
-from app.constants import USER_CUSTOM_QUERY_PROMPT
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from app.constants import USER_CUSTOM_QUERY_PROMPT, IngestMode
+from app.main import app
 from app.dependencies import (
     get_feedback_db_service,
     get_opensearch_service,
 )
 from app.models.openSeachModel import (
     AIFeedbackRequest,
+    ReindexRequest,
     SearchRequest,
     SearchResponse,
 )
 from app.services.JwtAuthService import JWTBearer
 from app.services.crud import AIFeedBackCrudService
+from app.services.index_manager import ReindexInProgress
 from app.services.openSearch import OpenSearchService
 
 router = APIRouter(tags=["OpenSearch Support"])
@@ -34,20 +40,27 @@ router = APIRouter(tags=["OpenSearch Support"])
 async def upload_file(
     files: List[UploadFile],
     index_name: str = Body(...),
+    mode: IngestMode = Body(IngestMode.UPSERT),
+    delete_missing: bool = Body(False),
     service: OpenSearchService = Depends(get_opensearch_service),
 ):
+    folder_path = None
     try:
         if not files:
             raise HTTPException(status_code=400, detail="No files uploaded.")
 
-        folder_path, filename = await service.save_uploaded_file(files)
-        await service.upload_to_opensearch(
-            f"{folder_path}/{filename}", index_name=index_name
+        folder_path, saved = await service.save_uploaded_file(files)
+        results = await service.ingest_files(
+            saved, index_name=index_name, mode=mode, delete_missing=delete_missing
         )
+    except HTTPException:
+        raise
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except ReindexInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except RuntimeError as e:
         raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
@@ -55,7 +68,56 @@ async def upload_file(
     finally:
         if folder_path:
             shutil.rmtree(folder_path)
-    return {"message": "Files uploaded and processed successfully."}
+
+    failed = sum(result["status"] == "failed" for result in results)
+    if failed == len(results):
+        raise HTTPException(
+            status_code=400, detail={"message": "No file was ingested.", "files": results}
+        )
+    return {
+        "message": (
+            "Files uploaded and processed successfully."
+            if not failed
+            else f"{len(results) - failed} of {len(results)} files processed."
+        ),
+        "files": results,
+    }
+
+
+@router.post(
+    "/reindex",
+    description="Reindex: Rebuilds an index into a fresh physical index and "
+    "atomically moves its alias to it.",
+)
+async def reindex(
+    request: ReindexRequest = Body(...),
+    _=Depends(JWTBearer()),
+    service: OpenSearchService = Depends(get_opensearch_service),
+):
+    try:
+        return await service.reindex(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ReindexInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Reindex failed: {e}")
+
+
+def _get_search_prompt(request: SearchRequest) -> str:
+    return (
+        USER_CUSTOM_QUERY_PROMPT.format(
+            ALLERGIES=", ".join(request.allergies),
+            HEIGHT=request.current_height,
+            WEIGHT=request.current_weight,
+            GOAL_WEIGHT=request.goal_weight,
+            DIET_IMPROVEMENT=", ".join(request.diet_improvement),
+            DIET_TYPE=", ".join(request.meal_restriction),
+            FOOD_OPTIONS=", ".join(request.food_arround_me),
+        )
+        if not request.prompt
+        else request.text
+    )
 
 
 @router.post("/search", description="search docs for prompt.")
@@ -66,19 +128,7 @@ async def search(
     try:
         start_time = time.time()
 
-        prompt = (
-            USER_CUSTOM_QUERY_PROMPT.format(
-                ALLERGIES=", ".join(request.allergies),
-                HEIGHT=request.current_height,
-                WEIGHT=request.current_weight,
-                GOAL_WEIGHT=request.goal_weight,
-                DIET_IMPROVEMENT=", ".join(request.diet_improvement),
-                DIET_TYPE=", ".join(request.meal_restriction),
-                FOOD_OPTIONS=", ".join(request.food_arround_me),
-            )
-            if not request.prompt
-            else request.text
-        )
+        prompt = _get_search_prompt(request)
 
         res = await service.search(request, prompt)
         duration = time.time() - start_time
@@ -92,6 +142,35 @@ async def search(
         )
 
 
+@router.post(
+    "/search/stream",
+    description="search docs for prompt, streamed as server-sent events "
+    "(retrieval, message, menu, final).",
+)
+async def search_stream(
+    request: SearchRequest = Body(...),
+    service: OpenSearchService = Depends(get_opensearch_service),
+):
+    prompt = _get_search_prompt(request)
+
+    async def event_source():
+        try:
+            async for event, data in service.search_stream(request, prompt):
+                payload = json.dumps(data, ensure_ascii=False, default=str)
+                yield f"event: {event}\ndata: {payload}\n\n"
+        except Exception as e:
+            payload = json.dumps(
+                {"detail": f"An error occurred while processing the request. {e}"}
+            )
+            yield f"event: error\ndata: {payload}\n\n"
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/ping", description="Ping: Checks if the OpenSearch cluster is alive.")
 async def ping(
     _=Depends(JWTBearer()), service: OpenSearchService = Depends(get_opensearch_service)
@@ -106,6 +185,52 @@ async def ping(
         )
 
 
+@router.get("/stats", description="Stats: Cache and queue counters for sizing.")
+async def stats():
+    return {
+        "embedder": app.embedder.stats(),
+        "extraction_cache": app.extraction_cache.stats(),
+        "semantic_cache": app.semantic_cache.stats(),
+        "rule_extractor": (
+            app.rule_extractor.stats() if app.rule_extractor is not None else None
+        ),
+        "speculative_retrieval": (
+            app.speculative_retrieval.stats()
+            if app.speculative_retrieval is not None
+            else None
+        ),
+        "menu_replica": (
+            app.menu_replica.stats() if app.menu_replica is not None else None
+        ),
+        "prompt_log": app.prompt_log.stats(),
+        "token_cache": app.token_cache.stats(),
+        "password_hasher": app.password_hasher.stats(),
+        "rate_limiter": app.rate_limiter.stats(),
+        "mongo_writers": {
+            "feedback": app.feedback_writer.stats(),
+            "prompt_log": app.prompt_log_writer.stats(),
+        },
+        "embedding_store": (
+            app.embedding_store.stats() if app.embedding_store is not None else None
+        ),
+    }
+
+
+@router.post(
+    "/embedding_store/compact",
+    description="Compact: Drops stored chunk embeddings unused for max_age_days "
+    "and reclaims their space.",
+)
+async def compact_embedding_store(
+    max_age_days: Optional[float] = Body(None, embed=True),
+    _=Depends(JWTBearer()),
+):
+    if app.embedding_store is None:
+        raise HTTPException(status_code=404, detail="Embedding store is disabled.")
+    max_age = max_age_days * 86400 if max_age_days is not None else None
+    return await asyncio.to_thread(app.embedding_store.compact, max_age)
+
+
 @router.post(
     "/ai_search_feedback",
     description="To provide feedback to AI search results.",
@@ -1,6 +1,16 @@
 from datetime import datetime
-import logging
+import asyncio
 import csv
+import gzip
+import json
+import logging
+import os
+import random
+import shutil
+import time
+from typing import List, Optional, Tuple
+
+from app.utils.batch_worker import BatchWorker
 
 # Create a logger
 logging.basicConfig(level=logging.INFO)
@@ -9,21 +19,133 @@ logger = logging.getLogger("prompt_logger")
 # CSV file to store the logs
 CSV_FILE = "logs.csv"
 
+LOG_FORMATS = ("csv", "jsonl")
+OVERFLOW_POLICIES = ("drop", "sample")
+
+
+class PromptLogSink(BatchWorker):
+    """
+    Non-blocking prompt/response log.
+
+    `log` only appends to the bounded `BatchWorker` queue; each batch is
+    written with one file open on a worker thread. The file is rotated once
+    it reaches `max_bytes` or `max_age_seconds`, and rotated files are
+    gzip-compressed.
+
+    When the queue is full the entry is dropped. With the "sample" overflow
+    policy, entries are already sampled at `sample_rate` once the queue is 80%
+    full, so a burst thins out the log instead of cutting it off.
+    """
+
+    def __init__(
+        self,
+        path: str = CSV_FILE,
+        log_format: str = "csv",
+        queue_size: int = 1000,
+        batch_size: int = 100,
+        flush_seconds: float = 1,
+        max_bytes: int = 10 * 1024 * 1024,
+        max_age_seconds: Optional[float] = None,
+        overflow: str = "drop",
+        sample_rate: float = 0.1,
+        compress: bool = True,
+    ):
+        if log_format not in LOG_FORMATS:
+            raise ValueError(f"Unsupported prompt log format: {log_format}")
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unsupported prompt log overflow policy: {overflow}")
+        super().__init__(
+            f"Prompt log {path}",
+            queue_size=queue_size,
+            batch_size=batch_size,
+            flush_seconds=flush_seconds,
+        )
+        self.path = path
+        self.log_format = log_format
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.overflow = overflow
+        self.sample_rate = sample_rate
+        self.compress = compress
+        self.opened_at = time.time()
+        self.written = 0
+        self.dropped = 0
+        self.sampled_out = 0
+        self.rotations = 0
+
+    def log(self, prompt, response):
+        """Queues one entry; never blocks the caller."""
+        maxsize = self.queue.maxsize
+        if (
+            self.overflow == "sample"
+            and self.queue.qsize() >= 0.8 * maxsize
+            and random.random() >= self.sample_rate
+        ):
+            self.sampled_out += 1
+            return
+        entry = (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), prompt, response)
+        try:
+            self.queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def _flush(self, rows: List[Tuple[str, object, object]]):
+        try:
+            await asyncio.to_thread(self._write, rows)
+        except Exception as e:
+            self.dropped += len(rows)
+            logger.error(f"Failed to write prompt log: {e}")
 
-# Initialize the CSV with headers if the file doesn't exist
-def initialize_csv():
-    try:
-        with open(CSV_FILE, "x", newline="") as file:
-            writer = csv.writer(file)
-            writer.writerow(["Time", "Prompt", "Response"])
-    except FileExistsError:
-        pass  # The file already exists
+    def _should_rotate(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        if os.path.getsize(self.path) >= self.max_bytes:
+            return True
+        return (
+            self.max_age_seconds is not None
+            and time.time() - self.opened_at >= self.max_age_seconds
+        )
 
+    def _rotate(self):
+        stem, extension = os.path.splitext(self.path)
+        rotated = f"{stem}-{datetime.now():%Y%m%d-%H%M%S-%f}{extension}"
+        os.replace(self.path, rotated)
+        if self.compress:
+            with open(rotated, "rb") as source, gzip.open(
+                f"{rotated}.gz", "wb"
+            ) as target:
+                shutil.copyfileobj(source, target)
+            os.remove(rotated)
+        self.opened_at = time.time()
+        self.rotations += 1
 
-# Function to log data to CSV
-def log_to_csv(prompt: str, response: str):
-    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    with open(CSV_FILE, "a", newline="") as file:
-        writer = csv.writer(file)
-        writer.writerow([current_time, prompt, response])
+    def _write(self, rows: List[Tuple[str, object, object]]):
+        if self._should_rotate():
+            self._rotate()
+        new_file = not os.path.exists(self.path)
+        with open(self.path, "a", newline="") as file:
+            if self.log_format == "jsonl":
+                file.writelines(
+                    json.dumps(
+                        {"time": when, "prompt": prompt, "response": response},
+                        ensure_ascii=False,
+                        default=str,
+                    )
+                    + "\n"
+                    for when, prompt, response in rows
+                )
+            else:
+                writer = csv.writer(file)
+                if new_file:
+                    writer.writerow(["Time", "Prompt", "Response"])
+                writer.writerows(rows)
+        self.written += len(rows)
 
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "sampled_out": self.sampled_out,
+            "rotations": self.rotations,
+        }
@@ -1,32 +1,126 @@
+import asyncio
+import base64
+import binascii
 from logging import error, info
 from fastapi import FastAPI
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo.server_api import ServerApi
 from fastapi.responses import HTMLResponse
 from contextlib import asynccontextmanager
-from langchain_huggingface import HuggingFaceEmbeddings
+from concurrent.futures import ProcessPoolExecutor
 from openai import AsyncOpenAI
 from langchain_community.vectorstores import OpenSearchVectorSearch
 from app.models.settings import Settings
-from app.logger import initialize_csv
-from app.constants import embedding_model_dimension, IndexesEnum
+from app.services.embedder import BatchingEmbedder
+from app.services.embedding_cache import EmbeddingCache
+from app.services.embedding_backends import build_embedding_model, embedding_namespace
+from app.services.embedding_store import EmbeddingStore
+from app.services.semantic_cache import SemanticResponseCache
+from app.services.rule_extractor import RuleBasedExtractor
+from app.services.speculative import SpeculativeRetrieval
+from app.services.menu_replica import MenuReplica
+from app.services.index_manager import IndexManager
+from app.services.mongo_writer import MongoWriteBuffer
+from app.services.password_hasher import PasswordHasher
+from app.services.rate_limiter import MongoRateLimiter, build_rate_limiter
+from app.utils.cache import TTLCache
+from app.logger import PromptLogSink
+from app.constants import (
+    embedding_model_dimension,
+    IndexesEnum,
+    NUTRITION_RANGES,
+    vectorSearchType,
+)
 from fastapi.middleware.cors import CORSMiddleware
 
-# logger initialization for dev
-initialize_csv()
-
 
 # INITIATE SETTING, DB AND EMBEDDING MODEL WHEN APP START
 @asynccontextmanager
 async def lifespan(app: FastAPI):
 
     app.settings_instance = Settings()
-    app.mongodb_client = MongoClient(
-        app.settings_instance.MONGO_URL, server_api=ServerApi("1")
+    # one pooled client for the whole process; requests only borrow connections
+    app.mongodb_client = AsyncIOMotorClient(
+        app.settings_instance.MONGO_URL,
+        server_api=ServerApi("1"),
+        maxPoolSize=app.settings_instance.MONGO_MAX_POOL_SIZE,
+        minPoolSize=app.settings_instance.MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=app.settings_instance.MONGO_MAX_IDLE_TIME_MS,
     )
     app.db_instance = app.mongodb_client[app.settings_instance.MONGO_DATABASENAME]
-    app.embedding_model_instance = HuggingFaceEmbeddings(
-        model_name=app.settings_instance.EMBEDDING_MODEL_NAME
+    mongo_write_options = dict(
+        queue_size=app.settings_instance.MONGO_WRITE_QUEUE_SIZE,
+        batch_size=app.settings_instance.MONGO_WRITE_BATCH_SIZE,
+        flush_seconds=app.settings_instance.MONGO_WRITE_FLUSH_SECONDS,
+        put_timeout=app.settings_instance.MONGO_WRITE_PUT_TIMEOUT,
+    )
+    app.feedback_writer = MongoWriteBuffer(
+        app.db_instance["ai-search-feetback"], **mongo_write_options
+    )
+    app.prompt_log_writer = MongoWriteBuffer(
+        app.db_instance["prompt_logger"], **mongo_write_options
+    )
+    app.feedback_writer.start()
+    app.prompt_log_writer.start()
+    app.embedding_model_instance = build_embedding_model(app.settings_instance)
+    app.embedder = BatchingEmbedder(
+        app.embedding_model_instance,
+        batch_size=app.settings_instance.EMBEDDING_BATCH_SIZE,
+        batch_window_ms=app.settings_instance.EMBEDDING_BATCH_WINDOW_MS,
+        queue_depth=app.settings_instance.EMBEDDING_QUEUE_DEPTH,
+        workers=app.settings_instance.EMBEDDING_WORKERS,
+        cache=EmbeddingCache(
+            namespace=embedding_namespace(app.settings_instance),
+            maxsize=app.settings_instance.EMBEDDING_CACHE_SIZE,
+            path=app.settings_instance.EMBEDDING_CACHE_PATH,
+        ),
+    )
+    app.embedder.start()
+    app.embedding_store = (
+        EmbeddingStore(
+            app.settings_instance.EMBEDDING_STORE_PATH,
+            namespace=embedding_namespace(app.settings_instance),
+            dimension=embedding_model_dimension,
+        )
+        if app.settings_instance.EMBEDDING_STORE_PATH
+        else None
+    )
+    app.prompt_log = PromptLogSink(
+        path=app.settings_instance.PROMPT_LOG_PATH,
+        log_format=app.settings_instance.PROMPT_LOG_FORMAT,
+        queue_size=app.settings_instance.PROMPT_LOG_QUEUE_SIZE,
+        batch_size=app.settings_instance.PROMPT_LOG_BATCH_SIZE,
+        flush_seconds=app.settings_instance.PROMPT_LOG_FLUSH_SECONDS,
+        max_bytes=app.settings_instance.PROMPT_LOG_MAX_BYTES,
+        max_age_seconds=app.settings_instance.PROMPT_LOG_MAX_AGE_SECONDS,
+        overflow=app.settings_instance.PROMPT_LOG_OVERFLOW,
+        sample_rate=app.settings_instance.PROMPT_LOG_SAMPLE_RATE,
+    )
+    app.prompt_log.start()
+    app.parser_pool = ProcessPoolExecutor(
+        max_workers=app.settings_instance.PARSER_WORKERS
+    )
+    app.extraction_cache = TTLCache(
+        maxsize=app.settings_instance.EXTRACTION_CACHE_SIZE,
+        ttl=app.settings_instance.EXTRACTION_CACHE_TTL_SECONDS,
+    )
+    app.semantic_cache = SemanticResponseCache(
+        dimension=embedding_model_dimension,
+        maxsize=app.settings_instance.SEMANTIC_CACHE_SIZE,
+        ttl=app.settings_instance.SEMANTIC_CACHE_TTL_SECONDS,
+        threshold=app.settings_instance.SEMANTIC_CACHE_THRESHOLD,
+    )
+    app.rule_extractor = (
+        RuleBasedExtractor(
+            min_confidence=app.settings_instance.RULE_EXTRACTION_MIN_CONFIDENCE
+        )
+        if app.settings_instance.RULE_EXTRACTION_ENABLED
+        else None
+    )
+    app.speculative_retrieval = (
+        SpeculativeRetrieval(k=app.settings_instance.SPECULATIVE_RETRIEVAL_K)
+        if app.settings_instance.SPECULATIVE_RETRIEVAL
+        else None
     )
     app.llm = AsyncOpenAI(
         max_retries=2,
@@ -48,28 +142,98 @@ async def lifespan(app: FastAPI):
         index_name=IndexesEnum.INDEX_OF_MENUS.value,
     )
 
-    # create index
+    app.nutrition_ranges = (
+        NUTRITION_RANGES if app.settings_instance.NUMERIC_NUTRITION_FILTERS else None
+    )
+    app.vector_search_types = {
+        index: vectorSearchType(search_type)
+        for index, search_type in app.settings_instance.VECTOR_SEARCH_TYPES.items()
+    }
+
+    app.services = ServiceRegistry(
+        app.db_instance,
+        app.openseach_client,
+        app.feedback_writer,
+        app.prompt_log_writer,
+    )
+    # the JWT verification key is stored base64-encoded; decode it once
+    try:
+        app.jwt_verification_key = base64.b64decode(
+            app.settings_instance.JWT_SECRET_KEY
+        ).decode("utf-8")
+    except (binascii.Error, UnicodeDecodeError) as e:
+        app.jwt_verification_key = None
+        error(f"JWT_SECRET_KEY is not a base64-encoded key: {e}")
+    app.password_hasher = PasswordHasher(
+        workers=app.settings_instance.PASSWORD_HASH_WORKERS,
+        queue_timeout=app.settings_instance.PASSWORD_HASH_QUEUE_TIMEOUT,
+    )
+    app.token_cache = TTLCache(
+        maxsize=app.settings_instance.JWT_TOKEN_CACHE_SIZE,
+        ttl=app.settings_instance.JWT_TOKEN_CACHE_TTL_SECONDS,
+    )
+    app.rate_limiter = build_rate_limiter(
+        app.settings_instance.RATE_LIMIT_BACKEND,
+        db=app.db_instance,
+        max_keys=app.settings_instance.RATE_LIMIT_MAX_KEYS,
+    )
+    try:
+        await app.services.create_indexes()
+        if isinstance(app.rate_limiter, MongoRateLimiter):
+            await app.rate_limiter.create_indexes()
+    except Exception as e:
+        error(f"Failed to create Mongo indexes: {e}")
+
+    # create indexes, each behind an alias named after the IndexesEnum value
+    app.index_manager = IndexManager(
+        app.openseach_client,
+        dimension=embedding_model_dimension,
+        search_types=app.vector_search_types,
+    )
     for index in [
         IndexesEnum.INDEX_OF_MENUS.value,
         IndexesEnum.INDEX_OF_FAQ.value,
     ]:
-        if not app.openseach_client.index_exists(index_name=index):
-            try:
-                app.openseach_client.create_index(
-                    index_name=index,
-                    dimension=embedding_model_dimension,
-                )
-            except Exception:
-                error("Index not found! please check with administrator")
-
-    # Check if database is connected
+        try:
+            await app.index_manager.ensure(index)
+        except Exception:
+            error("Index not found! please check with administrator")
+
+    app.menu_replica = None
+    if app.settings_instance.MENU_REPLICA_ENABLED:
+        app.menu_replica = MenuReplica(
+            app.openseach_client.async_client,
+            IndexesEnum.INDEX_OF_MENUS.value,
+            max_documents=app.settings_instance.MENU_REPLICA_MAX_DOCUMENTS,
+            quantize=app.settings_instance.MENU_REPLICA_QUANTIZE,
+            refresh_seconds=app.settings_instance.MENU_REPLICA_REFRESH_SECONDS,
+            nutrition_ranges=app.nutrition_ranges,
+        )
+        app.menu_replica.start()
+
+    # Check if database is connected, opening the minimum pool with concurrent pings
     try:
-        app.db_instance.command("ping")
+        await asyncio.gather(
+            *(
+                app.db_instance.command("ping")
+                for _ in range(max(1, app.settings_instance.MONGO_MIN_POOL_SIZE))
+            )
+        )
         info("Pinged your deployment. You successfully connected to MongoDB!")
     except Exception as e:
-        print(e)
+        error(f"MongoDB ping failed: {e}")
 
     yield
+    if app.menu_replica is not None:
+        await app.menu_replica.stop()
+    await app.embedder.stop()
+    await app.prompt_log.stop()
+    await app.feedback_writer.stop()
+    await app.prompt_log_writer.stop()
+    app.parser_pool.shutdown(wait=False, cancel_futures=True)
+    app.password_hasher.shutdown()
+    if app.embedding_store is not None:
+        app.embedding_store.close()
     app.mongodb_client.close()
 
 
@@ -85,6 +249,7 @@ app.add_middleware(
 )
 
 from app.endpoints import OpensearchApi  # noqa: E402
+from app.services.registry import ServiceRegistry  # noqa: E402
 
 
 @app.get("/")
@@ -18,6 +18,7 @@ class SearchRequest(BaseModel):
     allergies: Optional[List[str]] = []
     food_arround_me: Optional[List[str]] = []
     history: Optional[List[dict]] = []
+    bypass_cache: Optional[bool] = False
 
     @model_validator(mode="before")
     def check_fields_based_on_prompt(cls, values):
@@ -81,6 +82,12 @@ class AddTextsRequest(BaseModel):
     metadatas: Optional[List[dict]] = None
 
 
+class ReindexRequest(BaseModel):
+    index_name: str = Field(..., example="index-of-menus")
+    reembed: Optional[bool] = False
+    keep_old: Optional[bool] = False
+
+
 class CountRequest(BaseModel):
     prompt: str = Field(...)
 
@@ -1,3 +1,5 @@
+from typing import Dict, Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -19,9 +21,76 @@ class Settings(BaseSettings):
     MAX_CHUNK_OVERLAP: int
     MONGO_DATABASENAME: str
     MONGO_URL: str
+    MONGO_MAX_POOL_SIZE: int = 100
+    # connections kept open (and opened at startup) even when idle
+    MONGO_MIN_POOL_SIZE: int = 10
+    MONGO_MAX_IDLE_TIME_MS: int = 300000
+    MONGO_WRITE_QUEUE_SIZE: int = 10000
+    MONGO_WRITE_BATCH_SIZE: int = 500
+    MONGO_WRITE_FLUSH_SECONDS: float = 0.5
+    MONGO_WRITE_PUT_TIMEOUT: float = 5
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int
     JWT_SECRET_KEY: str
     JWT_ALGORITHM: str
+    PASSWORD_HASH_WORKERS: int = 2
+    # seconds a login may wait for a hashing slot before it is rejected
+    PASSWORD_HASH_QUEUE_TIMEOUT: float = 2
+    # verified tokens are cached until their `exp`, and at most this long
+    JWT_TOKEN_CACHE_SIZE: int = 10000
+    JWT_TOKEN_CACHE_TTL_SECONDS: int = 300
+    # "memory" (per worker) or "mongo" (shared by every worker)
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_MAX_KEYS: int = 100000
     JWT_AUDIENCE: str = "fitAi"
     JWT_ISSUER: str = "fitAi"
+    # "torch" (HuggingFaceEmbeddings) or "onnx" (onnxruntime, CPU)
+    EMBEDDING_BACKEND: str = "torch"
+    EMBEDDING_ONNX_DIR: str = "onnx_models"
+    EMBEDDING_ONNX_QUANTIZE: bool = False
+    EMBEDDING_INTRA_OP_THREADS: int = 1
+    EMBEDDING_BATCH_SIZE: int = 32
+    EMBEDDING_BATCH_WINDOW_MS: float = 5
+    EMBEDDING_QUEUE_DEPTH: int = 256
+    EMBEDDING_WORKERS: int = 1
+    EMBEDDING_CACHE_SIZE: int = 4096
+    EMBEDDING_CACHE_PATH: Optional[str] = None
+    # directory of the persistent chunk embedding store used by ingestion
+    EMBEDDING_STORE_PATH: Optional[str] = None
+    EXTRACTION_CACHE_SIZE: int = 2048
+    EXTRACTION_CACHE_TTL_SECONDS: int = 3600
+    SEMANTIC_CACHE_SIZE: int = 1024
+    SEMANTIC_CACHE_TTL_SECONDS: int = 3600
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95
+    RULE_EXTRACTION_ENABLED: bool = True
+    RULE_EXTRACTION_MIN_CONFIDENCE: float = 0.75
+    SPECULATIVE_RETRIEVAL: bool = False
+    SPECULATIVE_RETRIEVAL_K: int = 100
+    # index name -> vectorSearchType value, e.g. {"index-of-menus": "approximate_search"}
+    VECTOR_SEARCH_TYPES: Dict[str, str] = {}
+    # filter nutrition buckets on metadata.nutrition ranges; turn on once the
+    # indexes have been re-ingested, older documents have no such field
+    NUMERIC_NUTRITION_FILTERS: bool = False
+    INGEST_CSV_CHUNK_ROWS: int = 1000
+    INGEST_EMBED_BATCH_SIZE: int = 64
+    INGEST_BULK_CONCURRENCY: int = 2
+    INGEST_FILE_CONCURRENCY: int = 2
+    REINDEX_BATCH_SIZE: int = 500
+    UPLOAD_CHUNK_BYTES: int = 1024 * 1024
+    PARSER_WORKERS: int = 2
+    PDF_PAGES_PER_TASK: int = 20
+    MENU_REPLICA_ENABLED: bool = False
+    MENU_REPLICA_QUANTIZE: bool = False
+    MENU_REPLICA_MAX_DOCUMENTS: int = 50000
+    MENU_REPLICA_REFRESH_SECONDS: float = 30
+    PROMPT_LOG_PATH: str = "logs.csv"
+    # "csv" or "jsonl"
+    PROMPT_LOG_FORMAT: str = "csv"
+    PROMPT_LOG_QUEUE_SIZE: int = 1000
+    PROMPT_LOG_BATCH_SIZE: int = 100
+    PROMPT_LOG_FLUSH_SECONDS: float = 1
+    PROMPT_LOG_MAX_BYTES: int = 10 * 1024 * 1024
+    PROMPT_LOG_MAX_AGE_SECONDS: Optional[float] = None
+    # "drop" or "sample"
+    PROMPT_LOG_OVERFLOW: str = "drop"
+    PROMPT_LOG_SAMPLE_RATE: float = 0.1
     model_config = SettingsConfigDict(env_file=".env")
@@ -0,0 +1,78 @@
+"""
+Rebuilds an index behind its alias from the command line, without the API:
+
+    python -m app.reindex --index index-of-menus [--reembed] [--keep-old]
+
+Uses the same settings (.env) as the app, including VECTOR_SEARCH_TYPES for
+the new index mapping and EMBEDDING_STORE_PATH when re-embedding.
+"""
+
+import argparse
+import asyncio
+import json
+
+from langchain_community.vectorstores import OpenSearchVectorSearch
+
+from app.constants import embedding_model_dimension, vectorSearchType
+from app.models.settings import Settings
+from app.services.embedding_backends import build_embedding_model, embedding_namespace
+from app.services.embedding_store import EmbeddingStore
+from app.services.index_manager import IndexManager
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--index", required=True)
+    parser.add_argument("--reembed", action="store_true")
+    parser.add_argument("--keep-old", action="store_true")
+    args = parser.parse_args()
+
+    settings = Settings()
+    embedding_model = build_embedding_model(settings) if args.reembed else None
+    vdb_handler = OpenSearchVectorSearch(
+        settings.DEV_OPENSEARCH_URL,
+        embedding_function=embedding_model,
+        http_auth=(
+            settings.OPENSEARCH_INITIAL_ADMIN_USERNAME,
+            settings.OPENSEARCH_INITIAL_ADMIN_PASSWORD,
+        ),
+        use_ssl=False,
+        verify_certs=False,
+        ssl_assert_hostname=False,
+        ssl_show_warn=False,
+        index_name=args.index,
+    )
+    store = None
+    if args.reembed and settings.EMBEDDING_STORE_PATH:
+        store = EmbeddingStore(
+            settings.EMBEDDING_STORE_PATH,
+            namespace=embedding_namespace(settings),
+            dimension=embedding_model_dimension,
+        )
+    manager = IndexManager(
+        vdb_handler,
+        dimension=embedding_model_dimension,
+        search_types={
+            index: vectorSearchType(search_type)
+            for index, search_type in settings.VECTOR_SEARCH_TYPES.items()
+        },
+    )
+    try:
+        result = await manager.reindex(
+            args.index,
+            embedding_model=embedding_model,
+            store=store,
+            reembed=args.reembed,
+            keep_old=args.keep_old,
+            batch_size=settings.REINDEX_BATCH_SIZE,
+            concurrency=settings.INGEST_BULK_CONCURRENCY,
+        )
+    finally:
+        if store is not None:
+            store.close()
+        await vdb_handler.async_client.close()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
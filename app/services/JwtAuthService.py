@@ -1,13 +1,13 @@
 import os
 import jwt
-import base64
-from typing import Dict
+import time
 from passlib.context import CryptContext
-from datetime import datetime, timedelta
+from datetime import timedelta
 from fastapi import HTTPException, Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
 from app.main import app
+from app.services.rate_limiter import limiter_key
 
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -23,7 +23,6 @@ class JWTBearer(HTTPBearer):
         super(JWTBearer, self).__init__(auto_error=auto_error)
         self.request_limit = request_limit
         self.interval = interval
-        self.requests: Dict[str, list] = {}
 
     async def __call__(self, request: Request):
         credentials: HTTPAuthorizationCredentials = await super(
@@ -39,7 +38,7 @@ class JWTBearer(HTTPBearer):
                 raise HTTPException(
                     status_code=403, detail="Invalid token or expired token."
                 )
-            self.rate_limit(credentials.credentials)
+            await self.rate_limit(credentials.credentials)
             return payload, credentials.credentials
         else:
             raise HTTPException(status_code=403, detail="Invalid authorization code.")
@@ -48,28 +47,38 @@ class JWTBearer(HTTPBearer):
     def _generateJWT(payload) -> str:
         token = jwt.encode(
             payload,
-            app.setting_instence.JWT_SECRET_KEY,
-            algorithm=app.setting_instence.JWT_ALGORITHM,
+            app.settings_instance.JWT_SECRET_KEY,
+            algorithm=app.settings_instance.JWT_ALGORITHM,
         )
         return token
 
     @staticmethod
     def _decodeJWT(token: str) -> dict:
+        """
+        Verifies `token`, or returns the payload cached by an earlier successful
+        verification. Entries expire at the token's `exp`.
+        """
+        payload = app.token_cache.get(token)
+        if payload is not None:
+            return payload
+        if app.jwt_verification_key is None:
+            raise ValueError("No JWT verification key configured.")
         try:
-            base64_encoded_string = app.setting_instence.get_setting.JWT_SECRET_KEY
-            decoded_bytes = base64.b64decode(base64_encoded_string)
-            pub_decoded_string = decoded_bytes.decode("utf-8")
-
-            return jwt.decode(
+            payload = jwt.decode(
                 token,
-                pub_decoded_string,
-                algorithms=[app.setting_instence.get_setting.JWT_ALGORITHM],
+                app.jwt_verification_key,
+                algorithms=[app.settings_instance.JWT_ALGORITHM],
                 audience="Client_Identity",
                 issuer="FitAi",
             )
         except jwt.ExpiredSignatureError as err:
             print(err)
             return {}
+        expires_at = time.time() + app.token_cache.ttl
+        if "exp" in payload:
+            expires_at = min(expires_at, float(payload["exp"]))
+        app.token_cache.set(token, payload, expires_at=expires_at)
+        return payload
 
     def verify_jwt(self, jwtoken: str) -> bool:
         isTokenValid: bool = False
@@ -82,14 +91,13 @@ class JWTBearer(HTTPBearer):
             isTokenValid = True
         return isTokenValid, payload
 
-    def rate_limit(self, token: str):
-        if token not in self.requests:
-            self.requests[token] = []
-        self.requests[token].append(datetime.now())
-        self.requests[token] = [
-            d for d in self.requests[token] if d > datetime.now() - self.interval
-        ]
-        if len(self.requests[token]) > self.request_limit:
+    async def rate_limit(self, token: str):
+        """Counts the request on the app-wide limiter, shared by every JWTBearer."""
+        interval = self.interval.total_seconds()
+        allowed = await app.rate_limiter.hit(
+            limiter_key(token, interval), self.request_limit, interval
+        )
+        if not allowed:
             raise HTTPException(
                 status_code=429,
                 detail="Too many requests",
@@ -1,26 +1,33 @@
 from app.models.openSeachModel import AIFeedbackRequest, PromptLogger
+from motor.motor_asyncio import AsyncIOMotorCollection
 from pymongo import IndexModel
 from logging import info, error
+from app.services.mongo_writer import MongoWriteBuffer
+from app.services.password_hasher import PasswordHasher
 
 
 class UserCrudService:
-    def __init__(self, collection):
+    def __init__(self, collection: AsyncIOMotorCollection):
         self.collection = collection
-        self.collection.create_indexes(
+
+    async def create_indexes(self):
+        await self.collection.create_indexes(
             [IndexModel([("user_id", 1)], unique=True), IndexModel([("email", 1)])]
         )
 
-    def get_user_data(self, user_id, projection=None):
+    async def get_user_data(self, user_id, projection=None):
         try:
-            user_data = self.collection.find_one({"user_id": user_id}, projection)
+            user_data = await self.collection.find_one({"user_id": user_id}, projection)
             return user_data
         except Exception as e:
             error(f"Failed to get user data: {e}")
             raise e
 
-    def update_user_data(self, user_id, data):
+    async def update_user_data(self, user_id, data):
         try:
-            result = self.collection.update_one({"user_id": user_id}, {"$set": data})
+            result = await self.collection.update_one(
+                {"user_id": user_id}, {"$set": data}
+            )
             if result.modified_count == 0:
                 info(f"No updates made for user_id: {user_id}")
                 return False
@@ -29,17 +36,17 @@ class UserCrudService:
             error(f"Failed to update user data: {e}")
             raise e
 
-    def create_user_data(self, user_id, data):
+    async def create_user_data(self, user_id, data):
         try:
-            self.collection.insert_one({"user_id": user_id, **data})
+            await self.collection.insert_one({"user_id": user_id, **data})
             return True
         except Exception as e:
             error(f"Failed to create user data: {e}")
             raise e
 
-    def delete_user_data(self, user_id):
+    async def delete_user_data(self, user_id):
         try:
-            result = self.collection.delete_one({"user_id": user_id})
+            result = await self.collection.delete_one({"user_id": user_id})
             if result.deleted_count == 0:
                 info(f"No user found to delete with user_id: {user_id}")
                 return False
@@ -48,17 +55,17 @@ class UserCrudService:
             error(f"Failed to delete user data: {e}")
             raise e
 
-    def get_all_users_data(self, projection=None):
+    async def get_all_users_data(self, projection=None):
         try:
             users_data = self.collection.find({}, projection)
-            return list(users_data)
+            return await users_data.to_list(length=None)
         except Exception as e:
             error(f"Failed to get all users data: {e}")
             raise e
 
-    def get_user_by_email(self, email, projection=None):
+    async def get_user_by_email(self, email, projection=None):
         try:
-            user_data = self.collection.find_one(
+            user_data = await self.collection.find_one(
                 {"email": email}, projection=projection
             )
             return user_data
@@ -66,14 +73,43 @@ class UserCrudService:
             error(f"Failed to get user data by email: {e}")
             raise e
 
+    async def verify_user_password(
+        self, email, password, hasher: PasswordHasher
+    ) -> bool:
+        """
+        Checks a login; a legacy md5_crypt/des_crypt hash is replaced on success.
+
+        Tokens are issued by the identity service, so this API has no login
+        endpoint yet; one added here must call this instead of verifying the
+        password itself.
+        """
+        try:
+            user_data = await self.collection.find_one(
+                {"email": email}, projection={"hashed_password": 1}
+            )
+            if not user_data or not user_data.get("hashed_password"):
+                return False
+            verified, new_hash = await hasher.verify_and_update(
+                password, user_data["hashed_password"]
+            )
+            if verified and new_hash is not None:
+                await self.collection.update_one(
+                    {"_id": user_data["_id"]}, {"$set": {"hashed_password": new_hash}}
+                )
+                info(f"Rehashed the legacy password hash of {email}")
+            return verified
+        except Exception as e:
+            error(f"Failed to verify user password: {e}")
+            raise e
+
 
 class AIFeedBackCrudService:
-    def __init__(self, collection):
-        self.collection = collection
+    def __init__(self, writer: MongoWriteBuffer):
+        self.writer = writer
 
     async def create_feedback(self, data: AIFeedbackRequest):
         try:
-            self.collection.insert_one(data.to_dict())
+            await self.writer.put(data.to_dict())
             return True
         except Exception as e:
             error(f"Failed to create feedback: {e}")
@@ -81,13 +117,13 @@ class AIFeedBackCrudService:
 
 
 class Logger:
-    def __init__(self, collection):
-        self.collection = collection
+    def __init__(self, writer: MongoWriteBuffer):
+        self.writer = writer
 
     async def create_logger(self, data: PromptLogger):
         try:
-            self.collection.insert_one(data.to_dict())
+            await self.writer.put(data.to_dict())
             return True
         except Exception as e:
-            error(f"Failed to create feedback: {e}")
+            error(f"Failed to create prompt log: {e}")
             raise e
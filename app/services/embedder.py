@@ -0,0 +1,150 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from logging import error
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from app.services.embedding_cache import EmbeddingCache, normalize_text
+
+
+class BatchingEmbedder:
+    """
+    Runs query embedding on a dedicated worker pool instead of the event loop.
+
+    Queries coming from concurrent requests are collected for up to
+    `batch_window_ms` (or until `batch_size` queries are waiting) and embedded
+    together with a single `embed_documents` call. Each caller awaits its own
+    future and receives only its own vector.
+
+    When an `EmbeddingCache` is given, cached queries are answered without
+    touching the queue and duplicate queries within a batch are embedded once.
+    """
+
+    def __init__(
+        self,
+        embedding_model: Embeddings,
+        batch_size: int = 32,
+        batch_window_ms: float = 5,
+        queue_depth: int = 256,
+        workers: int = 1,
+        cache: Optional[EmbeddingCache] = None,
+    ):
+        self.embedding_model = embedding_model
+        self.batch_size = batch_size
+        self.batch_window = batch_window_ms / 1000
+        self.cache = cache
+        self.embedded = 0
+        self.queue: asyncio.Queue[Tuple[str, str, asyncio.Future]] = asyncio.Queue(
+            maxsize=queue_depth
+        )
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="embedder"
+        )
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while not self.queue.empty():
+            _, _, future = self.queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Embedder is shutting down."))
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.cache is not None:
+            self.cache.close()
+
+    async def embed_query(self, text: str) -> List[float]:
+        """
+        Embeds a single query. Waits for a free queue slot when the queue is full.
+        """
+        if self._task is None:
+            raise RuntimeError("Embedder is not running.")
+        key = normalize_text(text)
+        if self.cache is not None:
+            vector = self.cache.get(key)
+            if vector is not None:
+                return vector.tolist()
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((text, key, future))
+        return (await future).tolist()
+
+    def stats(self) -> dict:
+        stats = {
+            "queue_depth": self.queue.qsize(),
+            "queue_limit": self.queue.maxsize,
+            "embedded": self.embedded,
+        }
+        if self.cache is not None:
+            stats["cache"] = self.cache.stats()
+        return stats
+
+    async def _collect_batch(self) -> List[Tuple[str, str, asyncio.Future]]:
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _embed_batch(self, texts: Dict[str, str]) -> Dict[str, np.ndarray]:
+        """
+        Resolves a batch of unique keys to vectors, runs on the worker pool.
+        """
+        vectors = self.cache.load_persisted(texts) if self.cache is not None else {}
+        missing = [key for key in texts if key not in vectors]
+        if missing:
+            embedded = self.embedding_model.embed_documents(
+                [texts[key] for key in missing]
+            )
+            computed = {
+                key: np.asarray(vector, dtype=np.float32)
+                for key, vector in zip(missing, embedded)
+            }
+            self.embedded += len(computed)
+            if self.cache is not None:
+                self.cache.persist(computed)
+            vectors.update(computed)
+        return vectors
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect_batch()
+            # Callers that went away (e.g. client disconnected) don't need a vector.
+            batch = [item for item in batch if not item[2].done()]
+            if not batch:
+                continue
+            texts = {key: text for text, key, _ in batch}
+            try:
+                vectors = await loop.run_in_executor(
+                    self.executor, self._embed_batch, texts
+                )
+            except Exception as e:
+                error(f"Failed to embed batch of {len(texts)} queries: {e}")
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            if self.cache is not None:
+                for key, vector in vectors.items():
+                    self.cache.set(key, vector)
+            for _, key, future in batch:
+                if not future.done():
+                    future.set_result(vectors[key])
@@ -0,0 +1,233 @@
+import inspect
+import os
+import threading
+from logging import info
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from app.constants import embedding_model_dimension
+
+# Bumped when exports change; older files are left alone and re-exported.
+# Revision 1 bound attention_mask and token_type_ids to each other's inputs.
+EXPORT_REVISION = 2
+
+# Padded to different lengths, so a swapped attention mask shows up.
+PARITY_TEXTS = [
+    "grilled chicken salad",
+    "a keto breakfast with eggs and no cheese at all",
+]
+PARITY_TOLERANCE = 1e-4
+
+
+def _mean_pool(hidden: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """Mean over the unmasked tokens, L2-normalized (sentence-transformers pooling)."""
+    mask = attention_mask[..., None].astype(np.float32)
+    pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+    norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+    return pooled / np.clip(norms, 1e-12, None)
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Sentence embeddings with onnxruntime on CPU.
+
+    The transformer is exported from `model_name` with `torch.onnx` on first
+    use and stored under `model_dir`; later starts only load the file. With
+    `quantize`, a dynamically int8-quantized copy is made and served instead.
+    Token embeddings are mean-pooled over the attention mask and L2-normalized,
+    like the sentence-transformers pipeline of the MiniLM models.
+
+    Every embedder worker thread gets its own session with `intra_op_threads`
+    threads, so `EMBEDDING_WORKERS * intra_op_threads` bounds the cores used.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        model_dir: str = "onnx_models",
+        quantize: bool = False,
+        intra_op_threads: int = 1,
+        max_length: int = 256,
+        dimension: int = embedding_model_dimension,
+    ):
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name
+        self.quantize = quantize
+        self.intra_op_threads = intra_op_threads
+        self.max_length = max_length
+        self.directory = os.path.join(
+            model_dir, f"{model_name.replace('/', '__')}-r{EXPORT_REVISION}"
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model_path = self._prepare()
+        self._local = threading.local()
+
+        probe = self.embed_query("dimension check")
+        if len(probe) != dimension:
+            raise ValueError(
+                f"ONNX model {model_name} returns {len(probe)}-dim vectors, "
+                f"expected {dimension}."
+            )
+
+    def _prepare(self) -> str:
+        fp32_path = os.path.join(self.directory, "model.onnx")
+        if not os.path.exists(fp32_path):
+            self._export(fp32_path)
+        if not self.quantize:
+            return fp32_path
+
+        int8_path = os.path.join(self.directory, "model.int8.onnx")
+        if not os.path.exists(int8_path):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            info(f"Quantizing {fp32_path} to int8.")
+            quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+        return int8_path
+
+    def _export(self, path: str):
+        import torch
+        from transformers import AutoModel
+
+        info(f"Exporting {self.model_name} to {path}.")
+        os.makedirs(self.directory, exist_ok=True)
+        model = AutoModel.from_pretrained(self.model_name).eval()
+        sample = self.tokenizer(["export sample"], return_tensors="pt")
+        # Inputs are passed positionally, so they must follow `forward`'s
+        # parameter order (BERT: input_ids, attention_mask, token_type_ids),
+        # not the tokenizer's; ONNX names are assigned by position.
+        parameters = list(inspect.signature(model.forward).parameters)
+        input_names = parameters[: len(sample)]
+        if set(input_names) != set(sample):
+            raise ValueError(
+                f"Cannot export {self.model_name}: tokenizer outputs {list(sample)} "
+                f"are not the leading parameters of its forward {parameters}."
+            )
+        axes = {0: "batch", 1: "sequence"}
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(sample[name] for name in input_names),
+                path,
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes={
+                    **{name: axes for name in input_names},
+                    "last_hidden_state": axes,
+                },
+                opset_version=14,
+            )
+        try:
+            self._check_parity(model, path)
+        except Exception:
+            os.remove(path)
+            raise
+
+    def _check_parity(self, model, path: str):
+        """
+        Compares the exported graph with the torch model it came from on a
+        padded batch, so a wrong input binding fails the export instead of
+        silently changing every vector.
+        """
+        import onnxruntime
+        import torch
+
+        encoded = self.tokenizer(
+            PARITY_TEXTS, padding=True, truncation=True, return_tensors="np"
+        )
+        with torch.no_grad():
+            expected = model(
+                **{name: torch.from_numpy(value) for name, value in encoded.items()}
+            ).last_hidden_state.numpy()
+        session = onnxruntime.InferenceSession(path, providers=["CPUExecutionProvider"])
+        feed = {
+            model_input.name: encoded[model_input.name].astype(np.int64)
+            for model_input in session.get_inputs()
+        }
+        actual = session.run(None, feed)[0]
+        difference = float(
+            np.abs(
+                _mean_pool(actual, encoded["attention_mask"])
+                - _mean_pool(expected, encoded["attention_mask"])
+            ).max()
+        )
+        if difference > PARITY_TOLERANCE:
+            raise ValueError(
+                f"ONNX export of {self.model_name} differs from torch by "
+                f"{difference:.2e} (tolerance {PARITY_TOLERANCE:.0e})."
+            )
+        info(
+            f"ONNX export of {self.model_name} matches torch (max diff {difference:.2e})."
+        )
+
+    @property
+    def session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            import onnxruntime
+
+            options = onnxruntime.SessionOptions()
+            options.intra_op_num_threads = self.intra_op_threads
+            options.inter_op_num_threads = 1
+            options.graph_optimization_level = (
+                onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+            )
+            session = onnxruntime.InferenceSession(
+                self.model_path, options, providers=["CPUExecutionProvider"]
+            )
+            self._local.session = session
+        return session
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        session = self.session
+        encoded = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors="np",
+        )
+        feed = {
+            model_input.name: encoded[model_input.name].astype(np.int64)
+            for model_input in session.get_inputs()
+        }
+        hidden = session.run(None, feed)[0]
+        return _mean_pool(hidden, encoded["attention_mask"]).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def build_embedding_model(settings) -> Embeddings:
+    """The embedding model selected by `EMBEDDING_BACKEND` (torch or onnx)."""
+    backend = settings.EMBEDDING_BACKEND
+    if backend == "torch":
+        from langchain_huggingface import HuggingFaceEmbeddings
+
+        return HuggingFaceEmbeddings(model_name=settings.EMBEDDING_MODEL_NAME)
+    if backend == "onnx":
+        return OnnxEmbeddings(
+            settings.EMBEDDING_MODEL_NAME,
+            model_dir=settings.EMBEDDING_ONNX_DIR,
+            quantize=settings.EMBEDDING_ONNX_QUANTIZE,
+            intra_op_threads=settings.EMBEDDING_INTRA_OP_THREADS,
+        )
+    raise ValueError(f"Unsupported embedding backend: {backend}")
+
+
+def embedding_namespace(settings) -> str:
+    """
+    The embedding cache namespace. Backends produce slightly different
+    vectors, so each gets its own; torch keeps the plain model name.
+    """
+    if settings.EMBEDDING_BACKEND == "torch":
+        return settings.EMBEDDING_MODEL_NAME
+    suffix = "-int8" if settings.EMBEDDING_ONNX_QUANTIZE else ""
+    return (
+        f"{settings.EMBEDDING_MODEL_NAME}:{settings.EMBEDDING_BACKEND}"
+        f"-r{EXPORT_REVISION}{suffix}"
+    )
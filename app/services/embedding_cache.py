@@ -0,0 +1,95 @@
+import re
+import sqlite3
+import threading
+import unicodedata
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from app.utils.cache import LRUCache
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalizes a query so that trivially different phrasings share a cache entry.
+    """
+    text = unicodedata.normalize("NFKC", text or "")
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class EmbeddingCache:
+    """
+    Caches query embeddings keyed on normalized text.
+
+    Vectors are kept as float32 in a bounded in-memory LRU. When `path` is set
+    they are also written to an SQLite file so the cache survives restarts;
+    the on-disk store is only touched from the embedder worker thread.
+    """
+
+    def __init__(self, namespace: str, maxsize: int = 4096, path: Optional[str] = None):
+        self.namespace = namespace
+        self.memory = LRUCache(maxsize=maxsize)
+        self.disk_hits = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, vector BLOB NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        return self.memory.get(key)
+
+    def set(self, key: str, vector: np.ndarray):
+        self.memory.set(key, vector)
+
+    def load_persisted(self, keys: Iterable[str]) -> Dict[str, np.ndarray]:
+        """
+        Looks keys up in the on-disk store. Blocking; call it off the event loop.
+        """
+        keys = list(keys)
+        if self._conn is None or not keys:
+            return {}
+        placeholders = ", ".join("?" * len(keys))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key, vector FROM embeddings "
+                f"WHERE namespace = ? AND key IN ({placeholders})",
+                [self.namespace, *keys],
+            ).fetchall()
+        self.disk_hits += len(rows)
+        return {key: np.frombuffer(blob, dtype=np.float32) for key, blob in rows}
+
+    def persist(self, vectors: Dict[str, np.ndarray]):
+        """
+        Writes vectors to the on-disk store. Blocking; call it off the event loop.
+        """
+        if self._conn is None or not vectors:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (namespace, key, vector) "
+                "VALUES (?, ?, ?)",
+                [
+                    (self.namespace, key, vector.astype(np.float32).tobytes())
+                    for key, vector in vectors.items()
+                ],
+            )
+            self._conn.commit()
+
+    def close(self):
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+            self._conn = None
+
+    def stats(self) -> dict:
+        return {
+            **self.memory.stats(),
+            "disk_hits": self.disk_hits,
+            "persistent": self._conn is not None,
+        }
@@ -0,0 +1,229 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from logging import info
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+INITIAL_CAPACITY = 1024
+SQLITE_BATCH = 500
+
+
+def text_key(text: str) -> str:
+    """Store key of a chunk text; the vector only depends on the exact text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    On-disk chunk embeddings for ingestion and reindex jobs.
+
+    Vectors are rows of one memory-mapped float32 file; an SQLite index maps
+    each text hash to its row and records when it was last used. New rows are
+    appended and the vectors are flushed before the index is committed, so the
+    index never points at unwritten rows.
+
+    The store belongs to one embedding model (`namespace`). Opening it with a
+    different namespace or dimension discards all vectors. `compact` rewrites
+    the live rows into a fresh file and swaps it in with the same commit that
+    renumbers the index.
+    """
+
+    def __init__(self, directory: str, namespace: str, dimension: int):
+        self.directory = directory
+        self.namespace = namespace
+        self.dimension = dimension
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(
+            os.path.join(directory, "index.sqlite"), check_same_thread=False
+        )
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS vectors ("
+            "key TEXT PRIMARY KEY, row INTEGER NOT NULL, used_at REAL NOT NULL);"
+        )
+        meta = dict(self._conn.execute("SELECT key, value FROM meta").fetchall())
+        if meta and (
+            meta.get("namespace") != namespace
+            or meta.get("dimension") != str(dimension)
+        ):
+            info(
+                f"Embedding store {directory} was built for {meta.get('namespace')}, "
+                f"discarding it for {namespace}."
+            )
+            self._reset(meta.get("file"))
+        elif not meta:
+            self._reset(None)
+        else:
+            self.file = meta["file"]
+        self.size = self._conn.execute(
+            "SELECT COALESCE(MAX(row) + 1, 0) FROM vectors"
+        ).fetchone()[0]
+        self._open()
+
+    def _path(self, file: str) -> str:
+        return os.path.join(self.directory, file)
+
+    def _reset(self, old_file: Optional[str]):
+        self.file = f"vectors-{time.time_ns()}.f32"
+        with self._conn:
+            self._conn.execute("DELETE FROM vectors")
+            self._conn.execute("DELETE FROM meta")
+            self._conn.executemany(
+                "INSERT INTO meta (key, value) VALUES (?, ?)",
+                [
+                    ("namespace", self.namespace),
+                    ("dimension", str(self.dimension)),
+                    ("file", self.file),
+                ],
+            )
+        if old_file and os.path.exists(self._path(old_file)):
+            os.remove(self._path(old_file))
+
+    def _open(self, capacity: int = 0):
+        path = self._path(self.file)
+        row_bytes = self.dimension * 4
+        current = os.path.getsize(path) // row_bytes if os.path.exists(path) else 0
+        capacity = max(capacity, current, INITIAL_CAPACITY)
+        if capacity > current:
+            with open(path, "ab") as file:
+                file.truncate(capacity * row_bytes)
+        self.vectors = np.memmap(
+            path, dtype=np.float32, mode="r+", shape=(capacity, self.dimension)
+        )
+
+    def _ensure_capacity(self, rows: int):
+        if rows > len(self.vectors):
+            self.vectors.flush()
+            del self.vectors
+            self._open(max(rows, 2 * self.size))
+
+    def _lookup(self, keys: List[str]) -> Dict[str, int]:
+        found = {}
+        for start in range(0, len(keys), SQLITE_BATCH):
+            batch = keys[start : start + SQLITE_BATCH]
+            placeholders = ", ".join("?" * len(batch))
+            found.update(
+                self._conn.execute(
+                    f"SELECT key, row FROM vectors WHERE key IN ({placeholders})", batch
+                ).fetchall()
+            )
+        return found
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, np.ndarray]:
+        """Stored vectors of `keys`. Blocking; call it off the event loop."""
+        keys = list(dict.fromkeys(keys))
+        with self._lock:
+            rows = self._lookup(keys)
+            if rows:
+                now = time.time()
+                with self._conn:
+                    self._conn.executemany(
+                        "UPDATE vectors SET used_at = ? WHERE key = ?",
+                        [(now, key) for key in rows],
+                    )
+            vectors = {key: np.array(self.vectors[row]) for key, row in rows.items()}
+        self.hits += len(vectors)
+        self.misses += len(keys) - len(vectors)
+        return vectors
+
+    def put_many(self, vectors: Dict[str, np.ndarray]):
+        """Appends new vectors. Blocking; call it off the event loop."""
+        with self._lock:
+            known = self._lookup(list(vectors))
+            new = [key for key in vectors if key not in known]
+            if not new:
+                return
+            self._ensure_capacity(self.size + len(new))
+            rows = range(self.size, self.size + len(new))
+            for key, row in zip(new, rows):
+                self.vectors[row] = np.asarray(vectors[key], dtype=np.float32)
+            self.vectors.flush()
+            now = time.time()
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO vectors (key, row, used_at) VALUES (?, ?, ?)",
+                    [(key, row, now) for key, row in zip(new, rows)],
+                )
+            self.size += len(new)
+
+    def compact(self, max_age_seconds: Optional[float] = None) -> dict:
+        """
+        Drops rows not used for `max_age_seconds` (and space left by earlier
+        drops) by copying the live rows into a new file. Blocking.
+        """
+        with self._lock:
+            query = "SELECT key, row FROM vectors"
+            params = []
+            if max_age_seconds is not None:
+                query += " WHERE used_at >= ?"
+                params.append(time.time() - max_age_seconds)
+            live = self._conn.execute(query + " ORDER BY row", params).fetchall()
+
+            old_file, old_vectors = self.file, self.vectors
+            new_file = f"vectors-{time.time_ns()}.f32"
+            capacity = max(len(live), INITIAL_CAPACITY)
+            with open(self._path(new_file), "wb") as file:
+                file.truncate(capacity * self.dimension * 4)
+            vectors = np.memmap(
+                self._path(new_file),
+                dtype=np.float32,
+                mode="r+",
+                shape=(capacity, self.dimension),
+            )
+            for start in range(0, len(live), SQLITE_BATCH):
+                rows = [row for _, row in live[start : start + SQLITE_BATCH]]
+                vectors[start : start + len(rows)] = old_vectors[rows]
+            vectors.flush()
+
+            with self._conn:
+                self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS live (key TEXT)")
+                self._conn.execute("DELETE FROM live")
+                self._conn.executemany(
+                    "INSERT INTO live (key) VALUES (?)", [(key,) for key, _ in live]
+                )
+                self._conn.execute("DELETE FROM vectors WHERE key NOT IN live")
+                self._conn.executemany(
+                    "UPDATE vectors SET row = ? WHERE key = ?",
+                    [(row, key) for row, (key, _) in enumerate(live)],
+                )
+                self._conn.execute(
+                    "UPDATE meta SET value = ? WHERE key = 'file'", (new_file,)
+                )
+            removed = self.size - len(live)
+            self.file, self.vectors, self.size = new_file, vectors, len(live)
+            del old_vectors
+            os.remove(self._path(old_file))
+        return {"rows": self.size, "removed": removed}
+
+    def invalidate(self):
+        """Discards every stored vector, e.g. after a model change."""
+        with self._lock:
+            old_file = self.file
+            self.vectors.flush()
+            del self.vectors
+            self._reset(old_file)
+            self.size = 0
+            self._open()
+
+    def close(self):
+        with self._lock:
+            self.vectors.flush()
+            self._conn.close()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "namespace": self.namespace,
+            "rows": self.size,
+            "capacity": len(self.vectors),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,371 @@
+import asyncio
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from logging import error, info
+from typing import AsyncIterator, Dict, List, Optional
+
+from langchain_community.vectorstores import OpenSearchVectorSearch
+from langchain_core.embeddings import Embeddings
+from opensearchpy import ConflictError, NotFoundError
+
+from app.constants import INGEST_GENERATION_INDEX, IngestMode, vectorSearchType
+from app.services.embedding_store import EmbeddingStore
+from app.services.ingestion import BulkIngestor
+from app.services.menu_replica import bump_ingest_generation
+from app.utils.query_builder import vector_index_options
+
+SCROLL_SIZE = 500
+SCROLL_TIMEOUT = "5m"
+# Reindex markers and ingest leases expire unless their holder renews them,
+# so a crashed worker blocks an alias for at most LEASE_SECONDS.
+LEASE_SECONDS = 60
+LEASE_RENEW_SECONDS = 20
+DRAIN_POLL_SECONDS = 1
+
+
+class ReindexInProgress(RuntimeError):
+    pass
+
+
+def physical_name(alias: str) -> str:
+    return f"{alias}-{datetime.now(timezone.utc):%Y%m%d%H%M%S%f}"
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def _lease_body(alias: str, kind: str) -> dict:
+    return {
+        "alias": alias,
+        "kind": kind,
+        "expires_at": _now_ms() + LEASE_SECONDS * 1000,
+    }
+
+
+class IndexManager:
+    """
+    Serves every logical index (`IndexesEnum` value) through an alias of the
+    same name that points at one physical index.
+
+    `reindex` builds a new physical index tuned for loading (no refresh, no
+    replicas), copies the documents into it, force-merges it, restores the
+    live settings and moves the alias in one atomic `update_aliases` call, so
+    searches never see a partial index. An older deployment's concrete index
+    named like the alias is replaced in the same call.
+
+    Writes would miss the copy, so uploads and reindexes of an alias exclude
+    each other through documents in `INGEST_GENERATION_INDEX`, which every
+    worker and the `app.reindex` CLI see: a reindex holds a `reindex:<alias>`
+    marker and waits for the `ingest:<alias>:*` leases of running uploads;
+    uploads started during a reindex raise `ReindexInProgress`. Writers that
+    bypass `ingesting` (e.g. direct OpenSearch clients) are not covered.
+    """
+
+    def __init__(
+        self,
+        vdb_handler: OpenSearchVectorSearch,
+        dimension: int,
+        search_types: Optional[Dict[str, vectorSearchType]] = None,
+    ):
+        self.vdb_handler = vdb_handler
+        self.client = vdb_handler.async_client
+        self.dimension = dimension
+        self.search_types = search_types or {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._ensure_locks: Dict[str, asyncio.Lock] = {}
+
+    async def physical_indices(self, alias: str) -> List[str]:
+        try:
+            return list(await self.client.indices.get_alias(name=alias))
+        except NotFoundError:
+            return []
+
+    async def _create(self, alias: str, physical: str):
+        await asyncio.to_thread(
+            self.vdb_handler.create_index,
+            index_name=physical,
+            dimension=self.dimension,
+            **vector_index_options(self.search_types.get(alias)),
+        )
+
+    async def ensure(self, alias: str):
+        """
+        Creates a physical index behind `alias` unless the name is taken.
+
+        Concurrent calls in this process are serialized. Another process may
+        still add its own index to the alias at the same time; then every
+        caller keeps the oldest index and the newer ones are removed.
+        """
+        async with self._ensure_locks.setdefault(alias, asyncio.Lock()):
+            if await self.client.indices.exists(index=alias):
+                return
+            physical = physical_name(alias)
+            await self._create(alias, physical)
+            await self.client.indices.update_aliases(
+                body={"actions": [{"add": {"index": physical, "alias": alias}}]}
+            )
+            indices = sorted(await self.physical_indices(alias))
+            if len(indices) > 1 and physical != indices[0]:
+                await self.client.indices.update_aliases(
+                    body={"actions": [{"remove_index": {"index": physical}}]}
+                )
+                info(f"{alias} was created concurrently, keeping {indices[0]}.")
+                return
+            info(f"Created {physical} behind alias {alias}.")
+
+    async def _renew(self, lease: str):
+        while True:
+            await asyncio.sleep(LEASE_RENEW_SECONDS)
+            try:
+                await self.client.update(
+                    index=INGEST_GENERATION_INDEX,
+                    id=lease,
+                    body={"doc": {"expires_at": _now_ms() + LEASE_SECONDS * 1000}},
+                    refresh=True,
+                )
+            except Exception as e:
+                error(f"Failed to renew {lease}: {e}")
+
+    @asynccontextmanager
+    async def _holding(self, lease: str) -> AsyncIterator[None]:
+        """Renews the written lease document `lease` until the block exits."""
+        renew = asyncio.create_task(self._renew(lease))
+        try:
+            yield
+        finally:
+            renew.cancel()
+            await self.client.delete(
+                index=INGEST_GENERATION_INDEX, id=lease, refresh=True, ignore=[404]
+            )
+
+    async def _reindex_running(self, alias: str) -> bool:
+        try:
+            marker = await self.client.get(
+                index=INGEST_GENERATION_INDEX, id=f"reindex:{alias}"
+            )
+        except NotFoundError:
+            return False
+        return marker["_source"]["expires_at"] > _now_ms()
+
+    @asynccontextmanager
+    async def ingesting(self, alias: str) -> AsyncIterator[None]:
+        """
+        Holds an ingest lease on `alias` for the block. Raises
+        `ReindexInProgress` while the alias is being reindexed.
+        """
+        lease = f"ingest:{alias}:{uuid.uuid4().hex}"
+        # The lease is written before the marker is read and a reindex writes
+        # its marker before reading the leases, so one always sees the other.
+        await self.client.index(
+            index=INGEST_GENERATION_INDEX,
+            id=lease,
+            body=_lease_body(alias, "ingest"),
+            refresh=True,
+        )
+        async with self._holding(lease):
+            if await self._reindex_running(alias):
+                raise ReindexInProgress(f"{alias} is being reindexed, retry later.")
+            yield
+
+    async def _claim_reindex(self, alias: str):
+        marker = f"reindex:{alias}"
+        body = _lease_body(alias, "reindex")
+        try:
+            await self.client.create(
+                index=INGEST_GENERATION_INDEX, id=marker, body=body, refresh=True
+            )
+            return
+        except ConflictError:
+            pass
+        busy = ReindexInProgress(f"A reindex of {alias} is already running.")
+        try:
+            current = await self.client.get(index=INGEST_GENERATION_INDEX, id=marker)
+        except NotFoundError:
+            raise busy
+        if current["_source"]["expires_at"] > _now_ms():
+            raise busy
+        # The previous holder died; take its marker over unless someone else did.
+        try:
+            await self.client.index(
+                index=INGEST_GENERATION_INDEX,
+                id=marker,
+                body=body,
+                if_seq_no=current["_seq_no"],
+                if_primary_term=current["_primary_term"],
+                refresh=True,
+            )
+        except ConflictError:
+            raise busy
+
+    async def _running_ingests(self, alias: str) -> int:
+        response = await self.client.search(
+            index=INGEST_GENERATION_INDEX,
+            body={
+                "size": 0,
+                "track_total_hits": True,
+                "query": {
+                    "bool": {
+                        "filter": [
+                            {"term": {"kind.keyword": "ingest"}},
+                            {"term": {"alias.keyword": alias}},
+                            {"range": {"expires_at": {"gt": _now_ms()}}},
+                        ]
+                    }
+                },
+            },
+        )
+        return response["hits"]["total"]["value"]
+
+    async def _wait_for_ingests(self, alias: str, timeout: float):
+        deadline = time.monotonic() + timeout
+        while running := await self._running_ingests(alias):
+            if time.monotonic() >= deadline:
+                raise ReindexInProgress(
+                    f"{running} uploads into {alias} are still running."
+                )
+            await asyncio.sleep(DRAIN_POLL_SECONDS)
+
+    async def _copy(self, source: str, ingestor: BulkIngestor, reembed: bool):
+        response = await self.client.search(
+            index=source,
+            body={"size": SCROLL_SIZE, "query": {"match_all": {}}},
+            scroll=SCROLL_TIMEOUT,
+        )
+        scroll_id = response.get("_scroll_id")
+        try:
+            while response["hits"]["hits"]:
+                hits = response["hits"]["hits"]
+                await ingestor.add(
+                    [hit["_source"].get("text", "") for hit in hits],
+                    [hit["_source"].get("metadata") or {} for hit in hits],
+                    [hit["_id"] for hit in hits],
+                    None if reembed else [hit["_source"]["vector_field"] for hit in hits],
+                )
+                response = await self.client.scroll(
+                    scroll_id=scroll_id, scroll=SCROLL_TIMEOUT
+                )
+                scroll_id = response.get("_scroll_id", scroll_id)
+        finally:
+            if scroll_id:
+                await self.client.clear_scroll(scroll_id=scroll_id, ignore=404)
+
+    async def reindex(
+        self,
+        alias: str,
+        embedding_model: Optional[Embeddings] = None,
+        store: Optional[EmbeddingStore] = None,
+        reembed: bool = False,
+        keep_old: bool = False,
+        batch_size: int = 500,
+        concurrency: int = 2,
+        drain_timeout: float = 600,
+    ) -> dict:
+        """
+        Rebuilds `alias` from its current documents. Stored vectors are copied
+        as they are unless `reembed` is set, in which case the texts go through
+        `embedding_model` (and `store`, when given).
+
+        New uploads into `alias` are refused while it runs; uploads already
+        running get `drain_timeout` seconds to finish before the copy starts.
+        """
+        if reembed and embedding_model is None:
+            raise ValueError("Re-embedding needs an embedding model.")
+        lock = self._locks.setdefault(alias, asyncio.Lock())
+        if lock.locked():
+            raise ReindexInProgress(f"A reindex of {alias} is already running.")
+        async with lock:
+            await self._claim_reindex(alias)
+            async with self._holding(f"reindex:{alias}"):
+                await self._wait_for_ingests(alias, drain_timeout)
+                return await self._rebuild(
+                    alias,
+                    embedding_model,
+                    store,
+                    reembed,
+                    keep_old,
+                    batch_size,
+                    concurrency,
+                )
+
+    async def _rebuild(
+        self,
+        alias: str,
+        embedding_model: Optional[Embeddings],
+        store: Optional[EmbeddingStore],
+        reembed: bool,
+        keep_old: bool,
+        batch_size: int,
+        concurrency: int,
+    ) -> dict:
+        started = time.perf_counter()
+        old = await self.physical_indices(alias)
+        concrete = not old and await self.client.indices.exists(index=alias)
+        sources = old or ([alias] if concrete else [])
+        if not sources:
+            raise ValueError(f"Index {alias} does not exist.")
+        live = (await self.client.indices.get_settings(index=sources[0]))[sources[0]][
+            "settings"
+        ]["index"]
+
+        new = physical_name(alias)
+        await self._create(alias, new)
+        try:
+            await self.client.indices.put_settings(
+                index=new,
+                body={"index": {"refresh_interval": "-1", "number_of_replicas": 0}},
+            )
+            ingestor = BulkIngestor(
+                self.client,
+                embedding_model,
+                new,
+                batch_size=batch_size,
+                concurrency=concurrency,
+                mode=IngestMode.INDEX,
+                store=store,
+            )
+            try:
+                await self._copy(alias, ingestor, reembed)
+            except BaseException:
+                await asyncio.gather(*ingestor.tasks, return_exceptions=True)
+                raise
+            stats = await ingestor.finish()
+            await self.client.indices.forcemerge(
+                index=new, max_num_segments=1, request_timeout=3600
+            )
+            await self.client.indices.put_settings(
+                index=new,
+                body={
+                    "index": {
+                        "refresh_interval": live.get("refresh_interval"),
+                        "number_of_replicas": live.get("number_of_replicas", 1),
+                    }
+                },
+            )
+            actions = [{"add": {"index": new, "alias": alias}}]
+            actions += [{"remove": {"index": index, "alias": alias}} for index in old]
+            if concrete:
+                actions.append({"remove_index": {"index": alias}})
+            await self.client.indices.update_aliases(body={"actions": actions})
+        except BaseException:
+            error(f"Reindex of {alias} failed, deleting {new}.")
+            await self.client.indices.delete(index=new, ignore=[404])
+            raise
+
+        if old and not keep_old:
+            await self.client.indices.delete(index=",".join(old), ignore=[404])
+        await bump_ingest_generation(self.client, alias)
+
+        result = {
+            "alias": alias,
+            "index": new,
+            "previous": sources,
+            "kept_previous": bool(old and keep_old),
+            "documents": stats["rows"],
+            "embedded": stats["embedded"],
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        info(f"Reindexed {result}")
+        return result
@@ -0,0 +1,393 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+import unicodedata
+from collections import Counter, deque
+from concurrent.futures import Executor
+from logging import info
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from langchain_core.embeddings import Embeddings
+from opensearchpy import AsyncOpenSearch
+
+from app.constants import IngestMode
+from app.services.embedding_cache import normalize_text
+from app.services.embedding_store import EmbeddingStore, text_key
+from app.utils.parsers import file_format, parse_and_split, pdf_page_count
+from app.utils.opensearch import (
+    format_food_items,
+    get_menu_record,
+    get_nutrition_records,
+    parse_entities,
+)
+
+# (texts, metadatas, document ids)
+Batch = Tuple[List[str], List[dict], List[str]]
+
+MENU_IDENTITY_COLUMNS = ["provider", "name", "category"]
+
+
+def _digest(*parts: str) -> str:
+    payload = "\x1f".join(unicodedata.normalize("NFKC", part) for part in parts)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def content_hash(text: str, metadata: dict) -> str:
+    """Hash of everything stored for a chunk, to tell unchanged chunks apart."""
+    return _digest(text, json.dumps(metadata, sort_keys=True, ensure_ascii=False))
+
+
+def _with_hashes(texts: List[str], metadatas: List[dict], source: str) -> List[dict]:
+    return [
+        {**metadata, "source": source, "content_hash": content_hash(text, metadata)}
+        for text, metadata in zip(texts, metadatas)
+    ]
+
+
+def iter_csv_chunks(file_path: str, chunk_rows: int = 1000) -> Iterator[Batch]:
+    """
+    Reads a menu CSV `chunk_rows` rows at a time and yields the formatted texts
+    with their metadata (entities, menu record, typed nutrition values).
+
+    A row's id is derived from the file name and the row's normalized provider,
+    name and category, so re-uploading a menu overwrites its documents, and a
+    changed row keeps its id while its content hash changes. Like document
+    chunks, ids are scoped by source: a dish listed by two files is stored
+    once per file, so `delete_missing` on one file never removes the other's.
+    Values are read as the file spells them, so a row's text (and hash) does
+    not depend on the dtypes of its chunk.
+    """
+    source = os.path.basename(file_path)
+    seen = Counter()
+    for df in pd.read_csv(file_path, chunksize=chunk_rows, dtype=str):
+        entities = parse_entities(df["entities"])
+        menus = df[MENU_IDENTITY_COLUMNS].to_dict("records")
+        metadatas = [
+            {
+                "entities": row_entities,
+                "menu": get_menu_record(menu),
+                "nutrition": nutrition,
+            }
+            for row_entities, menu, nutrition in zip(
+                entities, menus, get_nutrition_records(df)
+            )
+        ]
+        ids = []
+        for menu in menus:
+            identity = "|".join(
+                normalize_text(str(menu[c])) for c in MENU_IDENTITY_COLUMNS
+            )
+            # Repeated dishes (e.g. one row per size) keep their order.
+            seen[identity] += 1
+            ids.append(_digest("menu", source, identity, str(seen[identity])))
+        texts = format_food_items(df).tolist()
+        yield texts, _with_hashes(texts, metadatas, source), ids
+
+
+async def iterate_in_thread(chunks: Iterator[Batch]) -> AsyncIterator[Batch]:
+    """Pulls each item of a blocking iterator on a worker thread."""
+    done = object()
+    while True:
+        chunk = await asyncio.to_thread(next, chunks, done)
+        if chunk is done:
+            return
+        yield chunk
+
+
+async def iter_document_chunks(
+    pool: Executor,
+    file_path: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    pdf_pages_per_task: int = 20,
+    lookahead: int = 1,
+) -> AsyncIterator[Batch]:
+    """
+    Parses and splits a document in `pool` and yields its chunks with their
+    source metadata. Chunk ids are content-addressed within the source file,
+    so unchanged chunks keep their document on re-upload. PDFs are split into
+    page ranges parsed in parallel and yielded in order, with at most
+    `lookahead` ranges parsed ahead of the consumer.
+    """
+    loop = asyncio.get_running_loop()
+    source = os.path.basename(file_path)
+    ranges = [(0, None)]
+    if file_format(file_path) == ".pdf":
+        pages = await loop.run_in_executor(pool, pdf_page_count, file_path)
+        ranges = [
+            (start, start + pdf_pages_per_task)
+            for start in range(0, pages, pdf_pages_per_task)
+        ]
+
+    def submit(start, stop):
+        return loop.run_in_executor(
+            pool, parse_and_split, file_path, chunk_size, chunk_overlap, start, stop
+        )
+
+    lookahead = max(1, lookahead)
+    pending = deque(submit(*page_range) for page_range in ranges[:lookahead])
+    ranges = deque(ranges[lookahead:])
+    try:
+        while pending:
+            texts = await pending.popleft()
+            if ranges:
+                pending.append(submit(*ranges.popleft()))
+            if texts:
+                metadatas = _with_hashes(texts, [{} for _ in texts], source)
+                ids = [_digest(source, meta["content_hash"]) for meta in metadatas]
+                yield texts, metadatas, ids
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+class BulkIngestor:
+    """
+    Embeds and indexes documents in fixed-size batches.
+
+    Each batch of `batch_size` texts is embedded on a worker thread and sent
+    as one `_bulk` request in the background. At most `concurrency` batches are
+    embedded or in flight at once; the producer waits for a free slot, so
+    memory stays bounded by `batch_size * concurrency` documents however large
+    the source is.
+
+    In `IngestMode.UPSERT` the stored content hashes of a batch are fetched
+    first, and chunks whose hash did not change are neither embedded nor
+    written. Vectors of texts already in the `store` are reused instead of
+    re-embedded. With `delete_missing`, documents of the same source that were not
+    part of this ingest are deleted at the end.
+    """
+
+    def __init__(
+        self,
+        client: AsyncOpenSearch,
+        embedding_model: Embeddings,
+        index_name: str,
+        batch_size: int = 64,
+        concurrency: int = 2,
+        mode: IngestMode = IngestMode.UPSERT,
+        delete_missing: bool = False,
+        store: Optional[EmbeddingStore] = None,
+    ):
+        self.client = client
+        self.store = store
+        self.embedding_model = embedding_model
+        self.index_name = index_name
+        self.batch_size = batch_size
+        self.mode = mode
+        self.delete_missing = delete_missing
+        self.slots = asyncio.Semaphore(concurrency)
+        self.tasks = set()
+        self.failure = None
+        self.sources = set()
+        self.seen_ids = set()
+        self.rows = 0
+        self.batches = 0
+        self.added = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.deleted = 0
+        self.embedded = 0
+        self.started = time.perf_counter()
+
+    async def _stored_hashes(self, ids: List[str]) -> Dict[str, str]:
+        response = await self.client.mget(
+            index=self.index_name,
+            body={"ids": ids},
+            _source_includes=["metadata.content_hash"],
+        )
+        return {
+            doc["_id"]: doc["_source"].get("metadata", {}).get("content_hash")
+            for doc in response["docs"]
+            if doc.get("found")
+        }
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        """Embeds `texts`, reusing and filling the embedding store if any."""
+        if self.store is None:
+            self.embedded += len(texts)
+            return self.embedding_model.embed_documents(texts)
+        keys = [text_key(text) for text in texts]
+        stored = self.store.get_many(keys)
+        misses = list(
+            {key: text for key, text in zip(keys, texts) if key not in stored}.items()
+        )
+        if misses:
+            vectors = self.embedding_model.embed_documents([text for _, text in misses])
+            fresh = {
+                key: np.asarray(vector, dtype=np.float32)
+                for (key, _), vector in zip(misses, vectors)
+            }
+            self.store.put_many(fresh)
+            stored.update(fresh)
+            self.embedded += len(misses)
+        return [stored[key].tolist() for key in keys]
+
+    async def _bulk(self, texts, metadatas, ids, vectors):
+        try:
+            body = []
+            for text, metadata, doc_id, vector in zip(texts, metadatas, ids, vectors):
+                body.append({"index": {"_index": self.index_name, "_id": doc_id}})
+                body.append(
+                    {"vector_field": vector, "text": text, "metadata": metadata}
+                )
+            response = await self.client.bulk(body=body)
+            if response.get("errors"):
+                reason = next(
+                    item["index"]["error"]
+                    for item in response["items"]
+                    if "error" in item["index"]
+                )
+                raise RuntimeError(
+                    f"Bulk indexing into {self.index_name} failed: {reason}"
+                )
+            for item in response["items"]:
+                if item["index"]["result"] == "created":
+                    self.added += 1
+                else:
+                    self.updated += 1
+            self.batches += 1
+        except Exception as e:
+            self.failure = self.failure or e
+        finally:
+            self.slots.release()
+
+    async def _write(self, texts, metadatas, ids, vectors=None):
+        """Embeds one batch and schedules its bulk request; owns a slot."""
+        if self.mode == IngestMode.UPSERT:
+            stored = await self._stored_hashes(ids)
+            changed = [
+                i
+                for i, (doc_id, metadata) in enumerate(zip(ids, metadatas))
+                if stored.get(doc_id) != metadata["content_hash"]
+            ]
+            self.unchanged += len(ids) - len(changed)
+            texts = [texts[i] for i in changed]
+            metadatas = [metadatas[i] for i in changed]
+            ids = [ids[i] for i in changed]
+            if vectors is not None:
+                vectors = [vectors[i] for i in changed]
+        if not texts:
+            self.slots.release()
+            return
+        if vectors is None:
+            vectors = await asyncio.to_thread(self._embed, texts)
+        task = asyncio.create_task(self._bulk(texts, metadatas, ids, vectors))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def add(
+        self,
+        texts: List[str],
+        metadatas: List[dict],
+        ids: List[str],
+        vectors: Optional[List[List[float]]] = None,
+    ):
+        """Queues documents for indexing; `vectors` skips embedding them."""
+        self.rows += len(texts)
+        self.sources.update(
+            metadata["source"] for metadata in metadatas if metadata.get("source")
+        )
+        if self.delete_missing:
+            self.seen_ids.update(ids)
+        for start in range(0, len(texts), self.batch_size):
+            await self.slots.acquire()
+            if self.failure is not None:
+                self.slots.release()
+                raise self.failure
+            batch = slice(start, start + self.batch_size)
+            try:
+                await self._write(
+                    texts[batch],
+                    metadatas[batch],
+                    ids[batch],
+                    vectors[batch] if vectors is not None else None,
+                )
+            except BaseException:
+                self.slots.release()
+                raise
+
+    async def _delete_missing(self):
+        """Deletes documents of the ingested sources that were not seen."""
+        stale = []
+        for source in self.sources:
+            response = await self.client.search(
+                index=self.index_name,
+                body={
+                    "size": 1000,
+                    "_source": False,
+                    "query": {"term": {"metadata.source.keyword": source}},
+                },
+                scroll="2m",
+            )
+            scroll_id = response.get("_scroll_id")
+            try:
+                while response["hits"]["hits"]:
+                    stale.extend(
+                        hit["_id"]
+                        for hit in response["hits"]["hits"]
+                        if hit["_id"] not in self.seen_ids
+                    )
+                    response = await self.client.scroll(
+                        scroll_id=scroll_id, scroll="2m"
+                    )
+                    scroll_id = response.get("_scroll_id", scroll_id)
+            finally:
+                if scroll_id:
+                    await self.client.clear_scroll(scroll_id=scroll_id, ignore=404)
+        for start in range(0, len(stale), 1000):
+            body = [
+                {"delete": {"_index": self.index_name, "_id": doc_id}}
+                for doc_id in stale[start : start + 1000]
+            ]
+            response = await self.client.bulk(body=body)
+            self.deleted += sum(
+                item["delete"].get("result") == "deleted" for item in response["items"]
+            )
+
+    async def ingest(self, chunks: AsyncIterator[Batch]) -> dict:
+        """
+        Indexes every chunk and returns the added/updated/unchanged/deleted
+        counts and throughput.
+        """
+        try:
+            async for texts, metadatas, ids in chunks:
+                await self.add(texts, metadatas, ids)
+        finally:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+        return await self.finish()
+
+    async def finish(self) -> dict:
+        """Waits for the pending bulk requests and returns the ingest stats."""
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        if self.failure is not None:
+            raise self.failure
+        await self.client.indices.refresh(index=self.index_name)
+        if self.delete_missing and self.rows:
+            await self._delete_missing()
+            await self.client.indices.refresh(index=self.index_name)
+
+        seconds = time.perf_counter() - self.started
+        stats = {
+            "index": self.index_name,
+            "mode": self.mode.value,
+            "rows": self.rows,
+            "added": self.added,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "deleted": self.deleted,
+            "embedded": self.embedded,
+            "batches": self.batches,
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(self.rows / seconds, 1) if seconds else 0.0,
+        }
+        info(f"Ingested {stats}")
+        return stats
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added or self.updated or self.deleted)
@@ -0,0 +1,369 @@
+import asyncio
+import time
+from logging import error, info
+from typing import Dict, List, Optional
+
+import numpy as np
+from opensearchpy import AsyncOpenSearch, NotFoundError
+
+from app.constants import (
+    INGEST_GENERATION_INDEX,
+    MEAL_RISTRICTIONS,
+    NUTRITION_COLUMNS,
+)
+from app.models.openSeachModel import EntityClassification
+from app.utils.opensearch import SearchHit, _analyze
+
+SCROLL_SIZE = 500
+SCROLL_TIMEOUT = "2m"
+# Rows of the int8 matrix converted to float32 at a time; the buffer stays in
+# cache, so a quantized search never holds a float32 copy of the matrix.
+QUANTIZED_BLOCK_ROWS = 1024
+
+
+async def read_ingest_generation(client: AsyncOpenSearch, index: str) -> int:
+    """The number of ingests into `index` so far, 0 when none was recorded."""
+    try:
+        response = await client.get(index=INGEST_GENERATION_INDEX, id=index)
+    except NotFoundError:
+        return 0
+    return int(response.get("_source", {}).get("generation", 0))
+
+
+async def bump_ingest_generation(client: AsyncOpenSearch, index: str):
+    """Records an ingest into `index`, so replicas know to reload it."""
+    await client.update(
+        index=INGEST_GENERATION_INDEX,
+        id=index,
+        body={
+            "script": {"source": "ctx._source.generation += 1", "lang": "painless"},
+            "upsert": {"generation": 1},
+        },
+        retry_on_conflict=5,
+        refresh=True,
+    )
+
+
+def _knn_score(dot: np.ndarray) -> np.ndarray:
+    # The inner product score of the knn plugin, so `min_score` means the same
+    # here as in the OpenSearch queries.
+    return np.where(dot >= 0, dot + 1, 1 / (1 - np.minimum(dot, 0)))
+
+
+class _Snapshot:
+    """
+    One immutable load of the index. Searches read a snapshot reference, so a
+    refresh swaps it without locking.
+    """
+
+    def __init__(self, docs: List[dict], generation: int, quantize: bool):
+        self.generation = generation
+        self.quantized = quantize and bool(docs)
+        self.ids = [doc["_id"] for doc in docs]
+        self.texts = [doc["_source"].get("text", "") for doc in docs]
+        self.metadatas = [doc["_source"].get("metadata") or {} for doc in docs]
+
+        vectors = np.ascontiguousarray(
+            [doc["_source"]["vector_field"] for doc in docs] or np.zeros((0, 0)),
+            dtype=np.float32,
+        )
+        if self.quantized:
+            # Symmetric per-row int8 quantization; the scale restores the dot.
+            scales = np.abs(vectors).max(axis=1) / 127
+            scales[scales == 0] = 1
+            self.vectors = np.round(vectors / scales[:, None]).astype(np.int8)
+            self.scales = scales.astype(np.float32)
+        else:
+            self.vectors = vectors
+            self.scales = None
+
+        self.sequences = [
+            [_analyze(value) for value in metadata.get("entities") or []]
+            for metadata in self.metadatas
+        ]
+        self.token_masks: Dict[str, np.ndarray] = {}
+        for row, sequences in enumerate(self.sequences):
+            for token in {token for sequence in sequences for token in sequence}:
+                if token not in self.token_masks:
+                    self.token_masks[token] = np.zeros(len(docs), dtype=bool)
+                self.token_masks[token][row] = True
+        self.nutrition = {
+            column: np.array(
+                [
+                    (metadata.get("nutrition") or {}).get(column)
+                    for metadata in self.metadatas
+                ],
+                dtype=np.float64,
+            )
+            for column in NUTRITION_COLUMNS
+        }
+        self.phrase_masks: Dict[str, np.ndarray] = {}
+        self.range_masks: Dict[str, np.ndarray] = {}
+        self.everything = np.ones(len(docs), dtype=bool)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def dots(self, query: np.ndarray) -> np.ndarray:
+        """Dot product of every row with the float32 `query`."""
+        if not self.quantized:
+            return self.vectors @ query
+        # `int8 @ float32` would upcast the whole matrix on every search.
+        dots = np.empty(len(self), dtype=np.float32)
+        buffer = np.empty(
+            (min(QUANTIZED_BLOCK_ROWS, len(self)), self.vectors.shape[1]),
+            dtype=np.float32,
+        )
+        for start in range(0, len(self), QUANTIZED_BLOCK_ROWS):
+            block = self.vectors[start : start + QUANTIZED_BLOCK_ROWS]
+            np.copyto(buffer[: len(block)], block)
+            np.dot(buffer[: len(block)], query, out=dots[start : start + len(block)])
+        dots *= self.scales
+        return dots
+
+    @property
+    def nbytes(self) -> int:
+        return self.vectors.nbytes + (self.scales.nbytes if self.quantized else 0)
+
+    def range_mask(self, entity: str, column: str, bounds: dict) -> np.ndarray:
+        mask = self.range_masks.get(entity)
+        if mask is None:
+            values = self.nutrition[column]
+            # Comparisons against NaN (missing values) are False, like OpenSearch.
+            mask = np.ones(len(self), dtype=bool)
+            for op, compare in (
+                ("lt", np.less),
+                ("lte", np.less_equal),
+                ("gt", np.greater),
+                ("gte", np.greater_equal),
+            ):
+                if op in bounds:
+                    mask &= compare(values, bounds[op])
+            self.range_masks[entity] = mask
+        return mask
+
+    def match_mask(self, entity: str) -> np.ndarray:
+        mask = np.zeros(len(self), dtype=bool)
+        for token in _analyze(entity):
+            if token in self.token_masks:
+                mask |= self.token_masks[token]
+        return mask
+
+    def phrase_mask(self, entity: str) -> np.ndarray:
+        mask = self.phrase_masks.get(entity)
+        if mask is None:
+            phrase = _analyze(entity)
+            mask = np.array(
+                [
+                    bool(phrase)
+                    and any(
+                        sequence[i : i + len(phrase)] == phrase
+                        for sequence in sequences
+                        for i in range(len(sequence) - len(phrase) + 1)
+                    )
+                    for sequences in self.sequences
+                ],
+                dtype=bool,
+            )
+            self.phrase_masks[entity] = mask
+        return mask
+
+
+class MenuReplica:
+    """
+    In-process copy of one vector index for small corpora.
+
+    All vectors live in one contiguous float32 (or int8) matrix. A search turns
+    the extracted entities into boolean masks, scores every row with a single
+    matrix-vector product (block by block for int8) and picks the top k with
+    `argpartition`. Filters give the same result as `entity_filter` in
+    OpenSearch.
+
+    A background task polls the ingest generation counter of the index and
+    reloads it when it changed. Until a snapshot is loaded, or when the index
+    holds more than `max_documents` documents, `ready` is False and callers
+    keep using OpenSearch.
+    """
+
+    def __init__(
+        self,
+        client: AsyncOpenSearch,
+        index: str,
+        max_documents: int = 50000,
+        quantize: bool = False,
+        refresh_seconds: float = 30,
+        nutrition_ranges: Optional[dict] = None,
+    ):
+        self.client = client
+        self.index = index
+        self.max_documents = max_documents
+        self.quantize = quantize
+        self.refresh_seconds = refresh_seconds
+        self.nutrition_ranges = nutrition_ranges or {}
+        self.snapshot: Optional[_Snapshot] = None
+        self.searches = 0
+        self.refreshes = 0
+        self.oversized = False
+        self.refreshed_at: Optional[float] = None
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.snapshot is not None and not self.oversized
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def refresh_soon(self):
+        """Checks the generation counter now instead of at the next poll."""
+        self._wake.set()
+
+    async def _load(self) -> List[dict]:
+        docs = []
+        response = await self.client.search(
+            index=self.index,
+            body={
+                "size": SCROLL_SIZE,
+                "_source": ["vector_field", "text", "metadata"],
+                "query": {"match_all": {}},
+            },
+            scroll=SCROLL_TIMEOUT,
+        )
+        scroll_id = response.get("_scroll_id")
+        try:
+            while True:
+                hits = response["hits"]["hits"]
+                if not hits:
+                    break
+                docs.extend(hits)
+                response = await self.client.scroll(
+                    scroll_id=scroll_id, scroll=SCROLL_TIMEOUT
+                )
+                scroll_id = response.get("_scroll_id", scroll_id)
+        finally:
+            if scroll_id:
+                await self.client.clear_scroll(scroll_id=scroll_id, ignore=404)
+        return docs
+
+    async def refresh(self, force: bool = False):
+        generation = await read_ingest_generation(self.client, self.index)
+        if not force and self.snapshot and self.snapshot.generation == generation:
+            return
+        count = (await self.client.count(index=self.index))["count"]
+        if count > self.max_documents:
+            if not self.oversized:
+                info(
+                    f"{self.index} holds {count} documents, more than the "
+                    f"replica limit of {self.max_documents}; using OpenSearch."
+                )
+            self.oversized = True
+            self.snapshot = None
+            return
+        docs = await self._load()
+        self.snapshot = await asyncio.to_thread(self._build, docs, generation)
+        self.oversized = False
+        self.refreshes += 1
+        self.refreshed_at = time.time()
+        info(f"Replica of {self.index} loaded {len(docs)} documents (gen {generation}).")
+
+    async def _run(self):
+        force = True
+        while True:
+            try:
+                await self.refresh(force=force)
+                force = False
+            except Exception as e:
+                error(f"Replica refresh of {self.index} failed: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.refresh_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def _mask(self, snapshot: _Snapshot, entities: EntityClassification) -> np.ndarray:
+        def matches(entity):
+            if entity in self.nutrition_ranges:
+                return snapshot.range_mask(entity, *self.nutrition_ranges[entity])
+            return snapshot.match_mask(entity)
+
+        def matches_phrase(entity):
+            if entity in self.nutrition_ranges:
+                return snapshot.range_mask(entity, *self.nutrition_ranges[entity])
+            return snapshot.phrase_mask(entity)
+
+        mask = snapshot.everything.copy()
+        recommended = entities.recommended or []
+        should = entities.queries_or_faqs or []
+        for entity in recommended:
+            mask &= matches(entity)
+        if not recommended and should:
+            mask &= np.logical_or.reduce([matches(entity) for entity in should])
+        for entity in entities.exclude or []:
+            mask &= ~matches_phrase(entity)
+        return mask
+
+    def _build(self, docs: List[dict], generation: int) -> _Snapshot:
+        snapshot = _Snapshot(docs, generation, self.quantize)
+        # Precompute the masks of the closed entity vocabulary.
+        for entity in MEAL_RISTRICTIONS:
+            snapshot.phrase_mask(entity)
+        for entity, (column, bounds) in self.nutrition_ranges.items():
+            snapshot.range_mask(entity, column, bounds)
+        return snapshot
+
+    def search(
+        self,
+        vector: List[float],
+        entities: EntityClassification,
+        k: int,
+        min_score: float = 0,
+    ) -> List[SearchHit]:
+        snapshot = self.snapshot
+        self.searches += 1
+        if not len(snapshot):
+            return []
+        scores = _knn_score(snapshot.dots(np.asarray(vector, dtype=np.float32)))
+        scores[~self._mask(snapshot, entities) | (scores < min_score)] = -np.inf
+
+        candidates = int(np.isfinite(scores).sum())
+        k = min(k, candidates)
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            SearchHit(
+                index=self.index,
+                id=snapshot.ids[row],
+                score=float(scores[row]),
+                text=snapshot.texts[row],
+                metadata=snapshot.metadatas[row],
+            )
+            for row in top
+        ]
+
+    def stats(self) -> dict:
+        snapshot = self.snapshot
+        return {
+            "index": self.index,
+            "ready": self.ready,
+            "oversized": self.oversized,
+            "documents": len(snapshot) if snapshot else 0,
+            "generation": snapshot.generation if snapshot else None,
+            "quantized": self.quantize,
+            "matrix_bytes": snapshot.nbytes if snapshot else 0,
+            "searches": self.searches,
+            "refreshes": self.refreshes,
+            "refreshed_at": self.refreshed_at,
+        }
@@ -0,0 +1,82 @@
+import asyncio
+import time
+from logging import error
+from typing import List
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo.errors import BulkWriteError
+
+from app.utils.batch_worker import BatchWorker
+
+
+class MongoWriteBuffer(BatchWorker):
+    """
+    Write-behind inserts for one Mongo collection.
+
+    `put` queues a document on the bounded `BatchWorker` queue, whose batches
+    are written with `insert_many(ordered=False)`. Unordered writes keep going
+    past a failing document, so only that document is lost.
+
+    A full queue applies backpressure: `put` waits up to `put_timeout` seconds
+    and then raises `asyncio.TimeoutError`.
+    """
+
+    def __init__(
+        self,
+        collection: AsyncIOMotorCollection,
+        queue_size: int = 10000,
+        batch_size: int = 500,
+        flush_seconds: float = 0.5,
+        put_timeout: float = 5,
+    ):
+        super().__init__(
+            collection.name,
+            queue_size=queue_size,
+            batch_size=batch_size,
+            flush_seconds=flush_seconds,
+        )
+        self.collection = collection
+        self.put_timeout = put_timeout
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+        self.flush_seconds_total = 0.0
+        self.last_flush_ms = 0.0
+
+    async def put(self, document: dict):
+        await asyncio.wait_for(self.queue.put(document), self.put_timeout)
+
+    async def _flush(self, documents: List[dict]):
+        started = time.perf_counter()
+        try:
+            result = await self.collection.insert_many(documents, ordered=False)
+            self.written += len(result.inserted_ids)
+        except BulkWriteError as e:
+            failed = len(e.details.get("writeErrors", []))
+            self.written += len(documents) - failed
+            self.failed += failed
+            error(f"{failed} inserts into {self.collection.name} failed.")
+        except Exception as e:
+            self.failed += len(documents)
+            error(
+                f"Failed to write {len(documents)} documents to {self.collection.name}: {e}"
+            )
+        finally:
+            elapsed = time.perf_counter() - started
+            self.flushes += 1
+            self.flush_seconds_total += elapsed
+            self.last_flush_ms = round(elapsed * 1000, 2)
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "written": self.written,
+            "failed": self.failed,
+            "flushes": self.flushes,
+            "last_flush_ms": self.last_flush_ms,
+            "avg_flush_ms": (
+                round(self.flush_seconds_total / self.flushes * 1000, 2)
+                if self.flushes
+                else 0.0
+            ),
+        }
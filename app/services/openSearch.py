@@ -1,18 +1,21 @@
+import anyio
+import asyncio
 import os
 import re
+import hashlib
 import shutil
 import uuid
 import json
 import random
+import time
 from ast import literal_eval
-from fastapi import UploadFile, HTTPException
+from fastapi import UploadFile
 import openai
-import pandas as pd
+from jiter import from_json
 from logging import error
-from typing import List
+from typing import AsyncIterator, List, Optional, Tuple
 
 from pydantic import BaseModel
-from app.logger import log_to_csv
 from app.main import app
 from app.constants import (
     PROMPT_CHAT_TEMPLATE_NO_MENU_AND_INFO,
@@ -20,10 +23,12 @@ from app.constants import (
     PROMPT_CHAT_TEMPLATE_WITH_MENU,
     PROMPT_CHAT_TEMPLATE_WITH_INFO,
     PROMPT_TEMPLATE_EXTRACT_METADATA_FROM_USER,
+    PROMPT_TEMPLATE_EXTRACT_METADATA_VERSION,
     NO_RESPONCE_MESSAGE,
-    AvailableRestaurants,
+    EXTRACTION_RESTAURANTS,
     FrequencyPenalty,
     IndexesEnum,
+    IngestMode,
     MaxTokens,
     NucleusSampling,
     PresencePenalty,
@@ -36,16 +41,26 @@ from app.models.openSeachModel import (
     NoResponse,
     OnlyFAQResponse,
     OnlyMenuResponse,
+    ReindexRequest,
     MetadataExtraction,
     SearchRequest,
 )
+from app.services.ingestion import (
+    BulkIngestor,
+    iter_csv_chunks,
+    iter_document_chunks,
+    iterate_in_thread,
+)
+from app.services.menu_replica import bump_ingest_generation
+from app.services.semantic_cache import context_key
+from app.utils.parsers import CSV_FORMAT, file_format
+from app.utils.query_builder import build_vector_search
 from app.utils.opensearch import (
-    add_metadata,
+    SearchHit,
     check_entities,
-    format_food_item,
-    get_combined_chunks,
+    get_search_hits,
     get_chat_format,
-    get_menu_dict,
+    to_dish_info,
 )
 from openai.types.chat import ChatCompletionMessageParam
 
@@ -109,7 +124,7 @@ async def _get_llm_response(
                 "detail": "Refusal from LLM",
             }
         elif message.parsed:
-            log_to_csv(
+            app.prompt_log.log(
                 prompt=chat,
                 response=message.parsed.model_dump(),
             )
@@ -132,49 +147,94 @@ async def _get_llm_response(
             }
 
 
-def _default_script_scroling_search(
-    vector, cluster: MetadataExtraction, k=4, min_score=0, space_type="innerproduct"
+async def _stream_llm_response(
+    chat: ChatCompletionMessageParam,
+    response_format: BaseModel,
+    temperature: float,
+    max_tokens: int,
+    top_p: float,
+    frequency_penalty: float,
+    presence_penalty: float,
 ):
-    query = []
-    for index in cluster.indexes:
-        query.append({"index": index.name})
-        query.append(
-            {
-                "_source": {"excludes": ["vector_field"]},
-                "size": k,
-                "min_score": min_score,
-                "query": {
-                    "script_score": {
-                        "query": {
-                            "bool": {
-                                "must": [
-                                    {"match": {"metadata.entities": entity}}
-                                    for entity in index.entities.recommended or []
-                                ],
-                                "should": [
-                                    {"match": {"metadata.entities": entity}}
-                                    for entity in index.entities.queries_or_faqs or []
-                                ],
-                                "must_not": [
-                                    {"match_phrase": {"metadata.entities": entity}}
-                                    for entity in index.entities.exclude or []
-                                ],
-                            }
-                        },
-                        "script": {
-                            "lang": "knn",
-                            "source": "knn_score",
-                            "params": {
-                                "field": "vector_field",
-                                "query_value": vector,
-                                "space_type": space_type,
-                            },
-                        },
-                    }
-                },
-            }
-        )
-    return query
+    """
+    Streams a structured completion. Yields `("message", {"delta": str})` as
+    `message_res` grows, `("menu", dict)` for every finished menu item and,
+    last, `("parsed", result)` with the validated model (or a refusal dict, or
+    None after an `("error", dict)` when the completion could not be parsed).
+    """
+    message_res, menus_sent = "", 0
+    try:
+        async with app.llm.beta.chat.completions.stream(
+            model=app.settings_instance.LLM_MODEL_NAME,
+            temperature=temperature,
+            messages=chat,
+            max_tokens=max_tokens,
+            response_format=response_format,
+            top_p=top_p,
+            frequency_penalty=frequency_penalty,
+            presence_penalty=presence_penalty,
+        ) as stream:
+            async for event in stream:
+                if event.type != "content.delta":
+                    continue
+                # The SDK's own partial parse drops unfinished strings, so parse
+                # the snapshot with trailing strings to stream message_res tokens.
+                partial = from_json(
+                    event.snapshot.encode("utf-8"), partial_mode="trailing-strings"
+                )
+                if not isinstance(partial, dict):
+                    continue
+                current = partial.get("message_res")
+                if isinstance(current, str) and len(current) > len(message_res):
+                    yield "message", {"delta": current[len(message_res) :]}
+                    message_res = current
+                # A menu item is complete once the model has started the next one.
+                menus = partial.get("menus") or []
+                while menus_sent < len(menus) - 1:
+                    yield "menu", menus[menus_sent]
+                    menus_sent += 1
+            completion = await stream.get_final_completion()
+    except Exception as e:
+        error(e)
+        raise
+
+    message = completion.choices[0].message
+    if message.refusal:
+        yield "parsed", {"error": "REFUSAL", "detail": "Refusal from LLM"}
+        return
+    parsed = message.parsed
+    if parsed is None:
+        # Truncated or invalid output: nothing to log, the result is empty as
+        # with `_get_llm_response`.
+        yield "error", {"error": "INVALID_RESPONSE", "detail": "No parsable response from LLM"}
+        yield "parsed", None
+        return
+    for menu in (getattr(parsed, "menus", None) or [])[menus_sent:]:
+        yield "menu", menu.model_dump()
+    app.prompt_log.log(prompt=chat, response=parsed.model_dump())
+    yield "parsed", parsed
+
+
+def _extraction_cache_key(chat: ChatCompletionMessageParam) -> str:
+    payload = json.dumps(
+        [
+            app.settings_instance.LLM_MODEL_NAME,
+            PROMPT_TEMPLATE_EXTRACT_METADATA_VERSION,
+            chat,
+        ],
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def invalidate_extraction_cache():
+    """
+    Drops every cached extraction result. Call it after changing
+    `PROMPT_TEMPLATE_EXTRACT_METADATA_FROM_USER` or `EXTRACTION_RESTAURANTS`.
+    """
+    app.extraction_cache.clear()
 
 
 async def _extraction_for_user_prompt(user_chat) -> MetadataExtraction:
@@ -183,15 +243,16 @@ async def _extraction_for_user_prompt(user_chat) -> MetadataExtraction:
         system_prompt=PROMPT_TEMPLATE_EXTRACT_METADATA_FROM_USER.format(
             MENU_INDEX=IndexesEnum.INDEX_OF_MENUS.value,
             INFO_INDEX=IndexesEnum.INDEX_OF_FAQ.value,
-            AVAILABLE_RES=", ".join(
-                [
-                    AvailableRestaurants.CHICK_FIL_A.value,
-                ]
-            ),
+            AVAILABLE_RES=", ".join(EXTRACTION_RESTAURANTS),
         ),
     )
 
-    return await _get_llm_response(
+    cache_key = _extraction_cache_key(chat)
+    cached = app.extraction_cache.get(cache_key)
+    if cached is not None:
+        return cached.model_copy(deep=True)
+
+    extraction = await _get_llm_response(
         chat,
         MetadataExtraction,
         temperature=Temperature.MEDIUM_TEMPERATURE.value,
@@ -200,12 +261,70 @@ async def _extraction_for_user_prompt(user_chat) -> MetadataExtraction:
         frequency_penalty=FrequencyPenalty.LOW_FREQUENCY_PENALTY.value,
         presence_penalty=PresencePenalty.HIGH_PRESENCE_PENALTY.value,
     )
+    # Refusals come back as plain dicts and must not be cached.
+    if isinstance(extraction, MetadataExtraction):
+        app.extraction_cache.set(cache_key, extraction.model_copy(deep=True))
+    return extraction
+
+
+def _select_chat_template(available_menus: List[str], available_infos: List[str]):
+    """
+    Picks the system prompt, response model and sampling parameters for the final
+    chat completion, based on what retrieval found.
+    """
+    if available_menus and available_infos:
+        return (
+            PROMPT_CHAT_TEMPLATE_WITH_MENU_AND_INFO,
+            BothFAQAndMenuResponse,
+            Temperature.LOW_TEMPERATURE.value,
+            MaxTokens.HIGH_MAX_TOKENS.value,
+            NucleusSampling.LOW_NUCLEUS_SAMPLING.value,
+            FrequencyPenalty.HIGH_FREQUENCY_PENALTY.value,
+            PresencePenalty.HIGH_PRESENCE_PENALTY.value,
+        )
+    if available_menus:
+        return (
+            PROMPT_CHAT_TEMPLATE_WITH_MENU,
+            OnlyMenuResponse,
+            Temperature.LOW_TEMPERATURE.value,
+            MaxTokens.HIGH_MAX_TOKENS.value,
+            NucleusSampling.LOW_NUCLEUS_SAMPLING.value,
+            FrequencyPenalty.HIGH_FREQUENCY_PENALTY.value,
+            PresencePenalty.HIGH_PRESENCE_PENALTY.value,
+        )
+    if available_infos:
+        return (
+            PROMPT_CHAT_TEMPLATE_WITH_INFO,
+            OnlyFAQResponse,
+            Temperature.MEDIUM_TEMPERATURE.value,
+            MaxTokens.LOW_MAX_TOKENS.value,
+            NucleusSampling.LOW_NUCLEUS_SAMPLING.value,
+            FrequencyPenalty.HIGH_FREQUENCY_PENALTY.value,
+            PresencePenalty.MID_PRESENCE_PENALTY.value,
+        )
+    return (
+        PROMPT_CHAT_TEMPLATE_NO_MENU_AND_INFO,
+        NoResponse,
+        Temperature.HIGH_TEMPERATURE.value,
+        MaxTokens.LOW_MAX_TOKENS.value,
+        NucleusSampling.LOW_NUCLEUS_SAMPLING.value,
+        FrequencyPenalty.HIGH_FREQUENCY_PENALTY.value,
+        PresencePenalty.LOW_PRESENCE_PENALTY.value,
+    )
+
+
+def _menu_response(menu_hits: List[SearchHit]) -> OnlyMenuResponse:
+    """
+    Hydrates the non-prompt response straight from the stored menu records.
+    """
+    dishes = (to_dish_info(hit.metadata) for hit in menu_hits)
+    return OnlyMenuResponse(menus=[dish for dish in dishes if dish is not None])
 
 
 def _extraction_for_custom_prompt(request: SearchRequest) -> MetadataExtraction:
     indexes = [
         {
-            "name": IndexesEnum.INDEX_OF_MENUS,
+            "name": IndexesEnum.INDEX_OF_MENUS.value,
             "entities": {
                 "recommended": [
                     *request.meal_restriction,
@@ -225,74 +344,251 @@ class OpenSearchService:
         self.vdb_handler = openseach_client
 
     @staticmethod
-    def read_jsonl_file_with_metadata(file_path):
-        try:
-            chunks = []
-            with open(file_path, "r") as file:
-                for i, line in enumerate(file):
-                    chunk_with_metadata = add_metadata(
-                        line=line.strip(), metadata={}, chunk_id=f"{i}-{uuid.uuid4()}"
-                    )
-                    chunks.append(chunk_with_metadata)
-            return chunks
-
-        except Exception as e:
-            raise HTTPException(
-                status_code=500, detail=f"Failed to read file: {str(e)}"
-            )
-
-    @staticmethod
-    def read_csv_file_with_metadata(file_path):
-        try:
-            chunks = []
-            df = pd.read_csv(file_path)
-
-            for i, row in df.iterrows():
-                # Convert the 'entities' column from string to list using ast.literal_eval
-                row["entities"] = literal_eval(row["entities"])
-
-                # Generate the formatted description
-                formatted_item = format_food_item(row)
-
-                # Create the chunk with both formatted description and entities
-                chunk_with_metadata = add_metadata(
-                    line=formatted_item,
-                    metadata={"entities": row.entities},
-                    chunk_id=f"{i}-{uuid.uuid4()}",
-                )
-                chunks.append(chunk_with_metadata)
-            return chunks
-        except Exception as e:
-            raise HTTPException(
-                status_code=500, detail=f"Failed to read file: {str(e)}"
+    def load_documents(file_path: str):
+        """
+        The chunks of an uploaded file, dispatched on its format: menu CSVs are
+        read in row chunks on a thread, every other format is parsed and split
+        in the parser process pool.
+        """
+        if file_format(file_path) == CSV_FORMAT:
+            chunks = iter_csv_chunks(
+                file_path, chunk_rows=app.settings_instance.INGEST_CSV_CHUNK_ROWS
             )
+            return iterate_in_thread(chunks)
+        return iter_document_chunks(
+            app.parser_pool,
+            file_path,
+            chunk_size=app.settings_instance.MAX_CHUNK_SIZE,
+            chunk_overlap=app.settings_instance.MAX_CHUNK_OVERLAP,
+            pdf_pages_per_task=app.settings_instance.PDF_PAGES_PER_TASK,
+            lookahead=app.settings_instance.PARSER_WORKERS,
+        )
 
-    def load_documents(self, folder_path):
-        chunks = self.read_csv_file_with_metadata(folder_path)
-        if not chunks:
+    async def upload_to_opensearch(
+        self,
+        file_path,
+        index_name,
+        mode: IngestMode = IngestMode.UPSERT,
+        delete_missing: bool = False,
+    ) -> dict:
+        """
+        Streams an uploaded file into `index_name` chunk by chunk and returns
+        the ingestion stats (added/updated/unchanged/deleted, rows/s).
+        """
+        chunks = self.load_documents(file_path)
+        await app.index_manager.ensure(index_name)
+        ingestor = BulkIngestor(
+            self.vdb_handler.async_client,
+            app.embedding_model_instance,
+            index_name,
+            batch_size=app.settings_instance.INGEST_EMBED_BATCH_SIZE,
+            concurrency=app.settings_instance.INGEST_BULK_CONCURRENCY,
+            mode=mode,
+            delete_missing=delete_missing,
+            store=app.embedding_store,
+        )
+        stats = await ingestor.ingest(chunks)
+        if not stats["rows"]:
             raise ValueError("No chunks loaded.")
-        return chunks
-
-    async def upload_to_opensearch(self, folder_path, index_name):
-        chunks = self.load_documents(folder_path)
-        await self.vdb_handler.aadd_documents(documents=chunks, index_name=index_name)
-
-    async def save_uploaded_file(self, files: List[UploadFile]):
-        folder_path = str(uuid.uuid4())
-        os.makedirs(folder_path)
-
+        if ingestor.changed:
+            await bump_ingest_generation(self.vdb_handler.async_client, index_name)
+            if app.menu_replica is not None and app.menu_replica.index == index_name:
+                app.menu_replica.refresh_soon()
+        return stats
+
+    async def reindex(self, request: ReindexRequest) -> dict:
+        """Rebuilds an index behind its alias; see `IndexManager.reindex`."""
+        result = await app.index_manager.reindex(
+            request.index_name,
+            embedding_model=app.embedding_model_instance,
+            store=app.embedding_store,
+            reembed=request.reembed,
+            keep_old=request.keep_old,
+            batch_size=app.settings_instance.REINDEX_BATCH_SIZE,
+            concurrency=app.settings_instance.INGEST_BULK_CONCURRENCY,
+        )
+        if app.menu_replica is not None and app.menu_replica.index == request.index_name:
+            app.menu_replica.refresh_soon()
+        return result
+
+    async def save_uploaded_file(
+        self, files: List[UploadFile]
+    ) -> Tuple[str, List[Tuple[str, str, int]]]:
+        """
+        Streams every upload to a fresh folder in UPLOAD_CHUNK_BYTES chunks and
+        returns the folder with (filename, path, bytes) for each file. File
+        names must be unique within a request: the name is the documents'
+        source, so one file would overwrite the other.
+        """
+        names = set()
         for file in files:
             if not file.filename or not file.filename.endswith(
                 tuple(allowed_file_formats_without_astrics)
             ):
-                shutil.rmtree(folder_path)
                 raise ValueError(f"Invalid file type: {file.filename}")
+            filename = os.path.basename(file.filename)
+            if filename in names:
+                raise ValueError(f"Duplicate file name: {filename}")
+            names.add(filename)
+
+        chunk_bytes = app.settings_instance.UPLOAD_CHUNK_BYTES
+        folder_path = str(uuid.uuid4())
+        os.makedirs(folder_path)
+        saved = []
+        try:
+            for file in files:
+                filename = os.path.basename(file.filename)
+                file_path = os.path.join(folder_path, filename)
+                size = 0
+                async with await anyio.open_file(file_path, "wb") as buffer:
+                    while chunk := await file.read(chunk_bytes):
+                        await buffer.write(chunk)
+                        size += len(chunk)
+                saved.append((filename, file_path, size))
+        except BaseException:
+            shutil.rmtree(folder_path, ignore_errors=True)
+            raise
+        return folder_path, saved
+
+    async def ingest_files(
+        self,
+        saved: List[Tuple[str, str, int]],
+        index_name: str,
+        mode: IngestMode = IngestMode.UPSERT,
+        delete_missing: bool = False,
+    ) -> List[dict]:
+        """
+        Ingests the saved uploads concurrently, at most INGEST_FILE_CONCURRENCY
+        at a time. A failing file is reported in its result instead of
+        aborting the others. Raises `ReindexInProgress` while the index is
+        being reindexed, whose copy would miss the writes.
+        """
+        # Create the index once here rather than racing from every file's task.
+        await app.index_manager.ensure(index_name)
+        slots = asyncio.Semaphore(app.settings_instance.INGEST_FILE_CONCURRENCY)
+
+        async def ingest(filename: str, file_path: str, size: int) -> dict:
+            result = {"filename": filename, "bytes": size}
+            async with slots:
+                try:
+                    stats = await self.upload_to_opensearch(
+                        file_path, index_name, mode, delete_missing
+                    )
+                except Exception as e:
+                    error(f"Ingesting {filename} failed: {e}")
+                    return {**result, "status": "failed", "error": str(e)}
+            return {**result, "status": "ingested", **stats}
+
+        async with app.index_manager.ingesting(index_name):
+            return await asyncio.gather(*(ingest(*upload) for upload in saved))
+
+    async def _speculate(self, text: str):
+        embedding = await app.embedder.embed_query(text)
+        search_query = build_vector_search(
+            k=app.speculative_retrieval.k,
+            vector=embedding,
+            cluster=app.speculative_retrieval.extraction(),
+            min_score=1,
+            search_types=app.vector_search_types,
+            nutrition_ranges=app.nutrition_ranges,
+        )
+        return await self.vdb_handler.async_client.msearch(body=search_query)
+
+    async def _extract(self, request: SearchRequest, user_chat: dict):
+        """
+        Returns the extraction and, when the LLM extraction had to run with
+        speculative retrieval enabled, the task retrieving unfiltered menus
+        concurrently with it.
+        """
+        if not request.prompt:
+            return _extraction_for_custom_prompt(request), None
+        extracted_indexes = None
+        if app.rule_extractor is not None:
+            extracted_indexes = app.rule_extractor.extract(user_chat)
+        if extracted_indexes is not None:
+            return extracted_indexes, None
+
+        speculation = None
+        # Speculation hides network latency, which the replica does not have.
+        replica_ready = app.menu_replica is not None and app.menu_replica.ready
+        if app.speculative_retrieval is not None and not replica_ready:
+            app.speculative_retrieval.requests += 1
+            speculation = asyncio.create_task(self._speculate(user_chat["text"]))
+        try:
+            extracted_indexes = await _extraction_for_user_prompt(user_chat)
+        except BaseException:
+            if speculation is not None:
+                speculation.cancel()
+            raise
+        return extracted_indexes, speculation
 
-            file_path = os.path.join(str(folder_path), str(file.filename))
-            with open(file_path, "wb") as buffer:
-                buffer.write(await file.read())
+    async def _retrieve(
+        self,
+        extracted_indexes: MetadataExtraction,
+        user_chat: dict,
+        speculation: Optional[asyncio.Task] = None,
+    ):
+        menu_hits, info_hits, embedding = [], [], None
+        if not check_entities(extracted_indexes):
+            if speculation is not None:
+                speculation.cancel()
+                app.speculative_retrieval.wasted += 1
+            return menu_hits, info_hits, embedding
+
+        k = len(extracted_indexes.indexes) * 10
+        remaining = extracted_indexes.indexes
+        if speculation is not None:
+            try:
+                dataset = await speculation
+            except Exception as e:
+                error(f"Speculative retrieval failed: {e}")
+                dataset = None
+            speculative_menus = app.speculative_retrieval.select(
+                dataset, extracted_indexes, k, app.nutrition_ranges
+            )
+            if speculative_menus is not None:
+                menu_hits = speculative_menus
+                remaining = [
+                    index
+                    for index in remaining
+                    if index.name != IndexesEnum.INDEX_OF_MENUS.value
+                ]
 
-        return folder_path, file.filename
+        user_chat["text"] = extracted_indexes.query_expansion or user_chat["text"]
+        embedding = await app.embedder.embed_query(user_chat["text"])
+        if app.menu_replica is not None and app.menu_replica.ready:
+            for index in remaining:
+                if index.name == app.menu_replica.index:
+                    menu_hits += app.menu_replica.search(
+                        embedding, index.entities, k, min_score=1
+                    )
+            remaining = [
+                index for index in remaining if index.name != app.menu_replica.index
+            ]
+        if remaining:
+            search_query = build_vector_search(
+                k=k,
+                vector=embedding,
+                cluster=MetadataExtraction(indexes=remaining),
+                min_score=1,
+                search_types=app.vector_search_types,
+                nutrition_ranges=app.nutrition_ranges,
+            )
+
+            dataset = await self.vdb_handler.async_client.msearch(body=search_query)
+            menus, infos = get_search_hits(dataset, [index.name for index in remaining])
+            menu_hits, info_hits = menu_hits + menus, infos
+        return menu_hits, info_hits, embedding
+
+    @staticmethod
+    def _semantic_cache_key(
+        request: SearchRequest, embedding, response_format, available_menus, available_infos
+    ):
+        # Answers depend on the conversation, so only history-free
+        # queries are served from or written to the semantic cache.
+        if embedding is None or request.history or request.bypass_cache:
+            return None
+        return context_key(response_format, available_menus, available_infos)
 
     async def search(
         self,
@@ -300,96 +596,111 @@ class OpenSearchService:
         prompt: str,
     ):
         user_chat = {"history": request.history, "text": prompt}
-        if request.prompt:
-            extracted_indexes = await _extraction_for_user_prompt(user_chat)
+        extracted_indexes, speculation = await self._extract(request, user_chat)
+        menu_hits, info_hits, embedding = await self._retrieve(
+            extracted_indexes, user_chat, speculation
+        )
+        if not request.prompt:
+            return _menu_response(menu_hits)
+
+        available_menus = [hit.text for hit in menu_hits]
+        available_infos = [hit.text for hit in info_hits]
+
+        system_prompt, response_format, *llm_params = _select_chat_template(
+            available_menus, available_infos
+        )
+        cache_key = self._semantic_cache_key(
+            request, embedding, response_format, available_menus, available_infos
+        )
+        if cache_key is not None:
+            cached = app.semantic_cache.lookup(embedding, cache_key)
+            if cached is not None:
+                return cached
+
+        chat = get_chat_format(
+            chat_history=user_chat,
+            system_prompt=system_prompt.format(
+                AVAILABLE_MENUS="\n-".join(available_menus),
+                AVAILABLE_INFOS="\n-".join(available_infos),
+            ),
+        )
+        final_llm_res = await _get_llm_response(chat, response_format, *llm_params)
+        if cache_key is not None and isinstance(final_llm_res, response_format):
+            app.semantic_cache.store(embedding, cache_key, final_llm_res)
+        return final_llm_res
+
+    async def search_stream(
+        self,
+        request: SearchRequest,
+        prompt: str,
+    ) -> AsyncIterator[Tuple[str, dict]]:
+        """
+        Same pipeline as `search`, yielding `(event, data)` pairs as each stage
+        completes: `retrieval` once msearch returns, then `message` deltas and
+        `menu` items while the model generates, and a `final` event carrying
+        the validated result and per-stage timings in seconds.
+        """
+        timings = {}
+        started = stage_started = time.perf_counter()
+
+        def lap(stage):
+            nonlocal stage_started
+            now = time.perf_counter()
+            timings[stage] = round(now - stage_started, 4)
+            stage_started = now
+
+        user_chat = {"history": request.history, "text": prompt}
+        extracted_indexes, speculation = await self._extract(request, user_chat)
+        lap("extraction")
+        menu_hits, info_hits, embedding = await self._retrieve(
+            extracted_indexes, user_chat, speculation
+        )
+        lap("retrieval")
+        available_menus = [hit.text for hit in menu_hits]
+        available_infos = [hit.text for hit in info_hits]
+        yield "retrieval", {"menus": available_menus, "infos": available_infos}
+
+        final_llm_res = None
+        if not request.prompt:
+            final_llm_res = _menu_response(menu_hits)
         else:
-            extracted_indexes = _extraction_for_custom_prompt(request)
-
-        available_menus, available_infos = [], []
-        if check_entities(extracted_indexes):
-            user_chat["text"] = extracted_indexes.query_expansion or user_chat["text"]
-            embedding = app.embedding_model_instance.embed_query(user_chat["text"])
-            search_query = _default_script_scroling_search(
-                k=len(extracted_indexes.indexes) * 10,
-                vector=embedding,
-                cluster=extracted_indexes,
-                min_score=1,
+            system_prompt, response_format, *llm_params = _select_chat_template(
+                available_menus, available_infos
             )
-
-            dataset = await self.vdb_handler.async_client.msearch(body=search_query)
-            available_menus, available_infos = get_combined_chunks(dataset)
-        if request.prompt:
-            (
-                system_prompt,
-                response_format,
-                temperature,
-                max_tokens,
-                top_p,
-                frequency_penalty,
-                presence_penalty,
-            ) = (
-                (
-                    PROMPT_CHAT_TEMPLATE_WITH_MENU_AND_INFO,
-                    BothFAQAndMenuResponse,
-                    Temperature.LOW_TEMPERATURE.value,
-                    MaxTokens.HIGH_MAX_TOKENS.value,
-                    NucleusSampling.LOW_NUCLEUS_SAMPLING.value,
-                    FrequencyPenalty.HIGH_FREQUENCY_PENALTY.value,
-                    PresencePenalty.HIGH_PRESENCE_PENALTY.value,
+            cache_key = self._semantic_cache_key(
+                request, embedding, response_format, available_menus, available_infos
+            )
+            if cache_key is not None:
+                final_llm_res = app.semantic_cache.lookup(embedding, cache_key)
+            if final_llm_res is None:
+                chat = get_chat_format(
+                    chat_history=user_chat,
+                    system_prompt=system_prompt.format(
+                        AVAILABLE_MENUS="\n-".join(available_menus),
+                        AVAILABLE_INFOS="\n-".join(available_infos),
+                    ),
                 )
-                if available_menus and available_infos
-                else (
-                    (
-                        PROMPT_CHAT_TEMPLATE_WITH_MENU,
-                        OnlyMenuResponse,
-                        Temperature.LOW_TEMPERATURE.value,
-                        MaxTokens.HIGH_MAX_TOKENS.value,
-                        NucleusSampling.LOW_NUCLEUS_SAMPLING.value,
-                        FrequencyPenalty.HIGH_FREQUENCY_PENALTY.value,
-                        PresencePenalty.HIGH_PRESENCE_PENALTY.value,
-                    )
-                    if available_menus
-                    else (
-                        (
-                            PROMPT_CHAT_TEMPLATE_WITH_INFO,
-                            OnlyFAQResponse,
-                            Temperature.MEDIUM_TEMPERATURE.value,
-                            MaxTokens.LOW_MAX_TOKENS.value,
-                            NucleusSampling.LOW_NUCLEUS_SAMPLING.value,
-                            FrequencyPenalty.HIGH_FREQUENCY_PENALTY.value,
-                            PresencePenalty.MID_PRESENCE_PENALTY.value,
+                async for event, data in _stream_llm_response(
+                    chat, response_format, *llm_params
+                ):
+                    if event == "parsed":
+                        final_llm_res = data
+                        continue
+                    if "first_token" not in timings:
+                        timings["first_token"] = round(
+                            time.perf_counter() - stage_started, 4
                         )
-                        if available_infos
-                        else (
-                            PROMPT_CHAT_TEMPLATE_NO_MENU_AND_INFO,
-                            NoResponse,
-                            Temperature.HIGH_TEMPERATURE.value,
-                            MaxTokens.LOW_MAX_TOKENS.value,
-                            NucleusSampling.LOW_NUCLEUS_SAMPLING.value,
-                            FrequencyPenalty.HIGH_FREQUENCY_PENALTY.value,
-                            PresencePenalty.LOW_PRESENCE_PENALTY.value,
-                        )
-                    )
-                )
-            )
-            chat = get_chat_format(
-                chat_history=user_chat,
-                system_prompt=system_prompt.format(
-                    AVAILABLE_MENUS="\n-".join(available_menus),
-                    AVAILABLE_INFOS="\n-".join(available_infos),
-                ),
-            )
-            final_llm_res = await _get_llm_response(
-                chat,
-                response_format,
-                temperature,
-                max_tokens,
-                top_p,
-                frequency_penalty,
-                presence_penalty,
-            )
-        else:
-            final_llm_res = OnlyMenuResponse(
-                menus=[menu for menu in get_menu_dict(available_menus)]
-            )
-        return final_llm_res
+                    yield event, data
+                if cache_key is not None and isinstance(final_llm_res, response_format):
+                    app.semantic_cache.store(embedding, cache_key, final_llm_res)
+            lap("generation")
+
+        timings["total"] = round(time.perf_counter() - started, 4)
+        yield "final", {
+            "result": (
+                final_llm_res.model_dump()
+                if isinstance(final_llm_res, BaseModel)
+                else final_llm_res
+            ),
+            "timings": timings,
+        }
@@ -0,0 +1,97 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from app.utils.password_manager import PasswordManager
+
+
+class PasswordHasherBusy(TimeoutError):
+    pass
+
+
+class PasswordHasher:
+    """
+    Async front of `PasswordManager`. Hashing is CPU-bound by design and
+    passlib's builtin sha256_crypt holds the GIL, so it runs in a dedicated
+    process pool instead of on the event loop or a thread.
+
+    At most `workers` calls run at once. A caller that did not get a slot
+    within `queue_timeout` seconds gets `PasswordHasherBusy`, so a burst of
+    logins is rejected early rather than queued behind minutes of hashing.
+    """
+
+    def __init__(self, workers: int = 2, queue_timeout: float = 2):
+        self.queue_timeout = queue_timeout
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self._slots = asyncio.Semaphore(workers)
+        self.waiting = 0
+        self.in_flight = 0
+        self.timeouts = 0
+        self.rehashed = 0
+        self._latency = {"hash": [0, 0.0], "verify": [0, 0.0]}
+        self._wait = [0, 0.0]
+
+    async def _run(self, kind: str, fn, *args):
+        queued = time.perf_counter()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise PasswordHasherBusy(
+                "Password hashing is at capacity, try again."
+            ) from None
+        finally:
+            self.waiting -= 1
+        started = time.perf_counter()
+        self._wait[0] += 1
+        self._wait[1] += started - queued
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, fn, *args)
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+            latency = self._latency[kind]
+            latency[0] += 1
+            latency[1] += time.perf_counter() - started
+
+    async def hash_password(self, password: str) -> str:
+        return await self._run("hash", PasswordManager.hash_password, password)
+
+    async def verify_password(self, password: str, hashed_password: str) -> bool:
+        return await self._run(
+            "verify", PasswordManager.verify_password, password, hashed_password
+        )
+
+    async def verify_and_update(
+        self, password: str, hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        """Verifies a login; returns a new hash when the stored one is legacy."""
+        verified, new_hash = await self._run(
+            "verify", PasswordManager.verify_and_update, password, hashed_password
+        )
+        if new_hash is not None:
+            self.rehashed += 1
+        return verified, new_hash
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        def average_ms(count, seconds):
+            return round(seconds / count * 1000, 2) if count else 0.0
+
+        return {
+            "queue_depth": self.waiting,
+            "in_flight": self.in_flight,
+            "timeouts": self.timeouts,
+            "rehashed": self.rehashed,
+            "hashes": self._latency["hash"][0],
+            "verifications": self._latency["verify"][0],
+            "avg_hash_ms": average_ms(*self._latency["hash"]),
+            "avg_verify_ms": average_ms(*self._latency["verify"]),
+            "avg_wait_ms": average_ms(*self._wait),
+        }
@@ -0,0 +1,150 @@
+import asyncio
+import hashlib
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import IndexModel, ReturnDocument
+
+
+def limiter_key(token: str, interval_seconds: float) -> str:
+    """Counters are kept per token and window length; the raw token is never stored."""
+    digest = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    return f"{interval_seconds:g}:{digest}"
+
+
+def _estimate(previous: int, current: int, elapsed: float, interval: float) -> float:
+    """Sliding-window count: the previous window weighted by its remaining overlap."""
+    return previous * max(0.0, 1 - elapsed / interval) + current
+
+
+class RateLimiter(ABC):
+    """
+    Sliding-window counter limiter. `hit` counts one request for `key` and
+    returns whether it stays within `limit` requests per `interval_seconds`.
+    """
+
+    def __init__(self):
+        self.allowed = 0
+        self.limited = 0
+
+    @abstractmethod
+    async def _hit(self, key: str, limit: int, interval_seconds: float) -> bool:
+        """Counts the request in the backend; True if it is within the limit."""
+
+    async def hit(self, key: str, limit: int, interval_seconds: float) -> bool:
+        allowed = await self._hit(key, limit, interval_seconds)
+        if allowed:
+            self.allowed += 1
+        else:
+            self.limited += 1
+        return allowed
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self).__name__,
+            "allowed": self.allowed,
+            "limited": self.limited,
+        }
+
+
+class InMemoryRateLimiter(RateLimiter):
+    """
+    Per-process limiter. Each key holds two counters, so a hit is O(1); keys
+    idle for two windows are evicted and at most `max_keys` are kept (least
+    recently seen first out). Also the stand-in for the Mongo backend when
+    running a single worker or tests.
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        super().__init__()
+        self.max_keys = max_keys
+        self.evicted = 0
+        # key -> [window index, previous count, current count, last seen]
+        self._windows: OrderedDict[str, list] = OrderedDict()
+
+    def _evict(self, now: float, interval: float):
+        while self._windows:
+            key, (_, _, _, last_seen) = next(iter(self._windows.items()))
+            if len(self._windows) <= self.max_keys and now - last_seen < 2 * interval:
+                break
+            del self._windows[key]
+            self.evicted += 1
+
+    async def _hit(self, key: str, limit: int, interval_seconds: float) -> bool:
+        now = time.monotonic()
+        window = int(now // interval_seconds)
+        state = self._windows.pop(key, None)
+        if state is None:
+            state = [window, 0, 0, now]
+        elif state[0] != window:
+            state = [window, state[2] if state[0] == window - 1 else 0, 0, now]
+        state[3] = now
+        self._windows[key] = state
+        self._evict(now, interval_seconds)
+
+        elapsed = now - window * interval_seconds
+        if _estimate(state[1], state[2], elapsed, interval_seconds) >= limit:
+            return False
+        state[2] += 1
+        return True
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "keys": len(self._windows),
+            "max_keys": self.max_keys,
+            "evicted": self.evicted,
+        }
+
+
+class MongoRateLimiter(RateLimiter):
+    """
+    Limiter shared by every worker through one Mongo collection. Each window
+    is a counter document incremented atomically; a TTL index removes the
+    documents once no sliding window can reach them. Unlike the in-memory
+    backend, rejected requests are counted too: the increment comes first so
+    that concurrent workers cannot both take the last slot.
+    """
+
+    def __init__(self, collection: AsyncIOMotorCollection):
+        super().__init__()
+        self.collection = collection
+
+    async def create_indexes(self):
+        await self.collection.create_indexes(
+            [IndexModel([("expires_at", 1)], expireAfterSeconds=0)]
+        )
+
+    async def _hit(self, key: str, limit: int, interval_seconds: float) -> bool:
+        now = time.time()
+        window = int(now // interval_seconds)
+        expires_at = datetime.fromtimestamp(
+            (window + 2) * interval_seconds, timezone.utc
+        ) + timedelta(seconds=1)
+        current, previous = await asyncio.gather(
+            self.collection.find_one_and_update(
+                {"_id": f"{key}:{window}"},
+                {"$inc": {"count": 1}, "$setOnInsert": {"expires_at": expires_at}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            ),
+            self.collection.find_one({"_id": f"{key}:{window - 1}"}),
+        )
+        elapsed = now - window * interval_seconds
+        # the increment already counted this request
+        previous_count = previous["count"] if previous else 0
+        return (
+            _estimate(previous_count, current["count"] - 1, elapsed, interval_seconds)
+            < limit
+        )
+
+
+def build_rate_limiter(backend: str, db=None, max_keys: int = 100000) -> RateLimiter:
+    if backend == "memory":
+        return InMemoryRateLimiter(max_keys=max_keys)
+    if backend == "mongo":
+        return MongoRateLimiter(db["rate_limits"])
+    raise ValueError(f"Unsupported rate limiter backend: {backend}")
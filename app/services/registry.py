@@ -0,0 +1,29 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from langchain_community.vectorstores import OpenSearchVectorSearch
+
+from app.services.crud import AIFeedBackCrudService, Logger, UserCrudService
+from app.services.mongo_writer import MongoWriteBuffer
+from app.services.openSearch import OpenSearchService
+
+
+class ServiceRegistry:
+    """
+    The request-scoped dependencies, built once in the lifespan and shared by
+    every request. Collection indexes are created by `create_indexes` at
+    startup instead of on each dependency resolution.
+    """
+
+    def __init__(
+        self,
+        db: AsyncIOMotorDatabase,
+        openseach_client: OpenSearchVectorSearch,
+        feedback_writer: MongoWriteBuffer,
+        prompt_log_writer: MongoWriteBuffer,
+    ):
+        self.opensearch = OpenSearchService(openseach_client=openseach_client)
+        self.users = UserCrudService(db["user"])
+        self.feedback = AIFeedBackCrudService(feedback_writer)
+        self.prompt_logs = Logger(prompt_log_writer)
+
+    async def create_indexes(self):
+        await self.users.create_indexes()
@@ -0,0 +1,162 @@
+import re
+from typing import Dict, List, Optional
+
+from app.constants import (
+    CALORIE_ENTITIES,
+    ENTITY_SYNONYMS,
+    EXTRACTION_RESTAURANTS,
+    MACRONUTRIENT_ENTITIES,
+    MEAL_RISTRICTIONS,
+    NEGATION_CUES,
+    PORTION_ENTITIES,
+    IndexesEnum,
+)
+from app.models.openSeachModel import (
+    EntityClassification,
+    IndexMetadata,
+    MetadataExtraction,
+)
+
+# Words that carry no preference on their own. They neither raise nor lower the
+# confidence of a rule-based extraction.
+FILLER_WORDS = {
+    "a", "also", "an", "and", "any", "anything", "are", "at", "be", "best", "but", "can",
+    "could", "diet", "dish", "dishes", "eat", "find", "food", "foods", "for",
+    "friendly", "from", "get", "give", "good", "have", "i", "i'm", "im", "in",
+    "is", "it", "item", "items", "just", "like", "list", "looking", "love",
+    "me", "meal", "meals", "menu", "menus", "my", "need", "of", "on", "option",
+    "options", "or", "please", "recommend", "recommendation", "recommendations",
+    "restaurant", "show", "some", "something", "suggest", "that", "the",
+    "there", "to", "want", "what's", "which", "with", "would", "you",
+}
+
+# Inputs starting with these are questions for the FAQ index, not menu filters.
+QUESTION_WORDS = {
+    "what", "why", "how", "when", "who", "does", "do", "should", "is", "are",
+    "explain", "tell",
+}
+
+CLAUSE_BREAK = re.compile(r"[.,;:!?]|\bbut\b|\bhowever\b", re.IGNORECASE)
+WORD = re.compile(r"[a-z0-9']+")
+
+
+def _surface_forms(entity: str) -> List[str]:
+    forms = {entity.lower()}
+    forms.add(entity.lower().replace("-", " "))
+    forms.add(entity.lower().replace("-", ""))
+    for synonym in ENTITY_SYNONYMS.get(entity, []):
+        forms.add(synonym.lower())
+    return list(forms)
+
+
+def _alternation(phrases: List[str]) -> str:
+    # Longest first, so "low-sat-fat" wins over "low" prefixes of other entities.
+    phrases = sorted(set(phrases), key=len, reverse=True)
+    return "|".join(re.escape(phrase).replace(r"\ ", r"[\s-]+") for phrase in phrases)
+
+
+class RuleBasedExtractor:
+    """
+    Deterministic `MetadataExtraction` for prompts that only use the closed
+    vocabulary of `PROMPT_TEMPLATE_EXTRACT_METADATA_FROM_USER`.
+
+    All surface forms are compiled into one alternation regex. An entity goes to
+    `exclude` when a negation cue precedes it in the same clause. The result is
+    only returned when enough of the prompt's content words were explained by
+    the matcher; otherwise `extract` returns None and the caller falls back to
+    the LLM extraction.
+    """
+
+    def __init__(self, min_confidence: float = 0.75):
+        self.min_confidence = min_confidence
+        self.canonical: Dict[str, str] = {}
+        vocabulary = [
+            *MEAL_RISTRICTIONS,
+            *CALORIE_ENTITIES,
+            *PORTION_ENTITIES,
+            *MACRONUTRIENT_ENTITIES,
+            *EXTRACTION_RESTAURANTS,
+        ]
+        for entity in vocabulary:
+            for form in _surface_forms(entity):
+                self.canonical[self._key(form)] = entity
+        self.matcher = re.compile(
+            rf"(?<![\w-])(?:{_alternation(list(self.canonical))})(?![\w-])",
+            re.IGNORECASE,
+        )
+        self.negation = re.compile(
+            rf"(?<![\w-])(?:{_alternation(NEGATION_CUES)})(?![\w-])", re.IGNORECASE
+        )
+        self.hits = 0
+        self.fallbacks = 0
+
+    @staticmethod
+    def _key(phrase: str) -> str:
+        return re.sub(r"[\s-]+", " ", phrase.lower()).strip()
+
+    def _is_negated(self, text: str, start: int) -> bool:
+        clause_start = 0
+        for match in CLAUSE_BREAK.finditer(text, 0, start):
+            clause_start = match.end()
+        return bool(self.negation.search(text, clause_start, start))
+
+    def _extract(self, text: str) -> Optional[MetadataExtraction]:
+        words = WORD.findall(text.lower())
+        if not words or words[0] in QUESTION_WORDS or "?" in text:
+            return None
+
+        recommended, exclude, gaps, position = [], [], [], 0
+        for match in self.matcher.finditer(text):
+            entity = self.canonical[self._key(match.group(0))]
+            target = exclude if self._is_negated(text, match.start()) else recommended
+            if entity not in target:
+                target.append(entity)
+            gaps.append(text[position : match.start()])
+            position = match.end()
+        gaps.append(text[position:])
+        if not recommended and not exclude:
+            return None
+        if set(recommended) & set(exclude):
+            return None
+
+        matched = len(gaps) - 1
+        leftover = self.negation.sub(" ", " ".join(gaps))
+        unexplained = [
+            word for word in WORD.findall(leftover.lower()) if word not in FILLER_WORDS
+        ]
+        confidence = matched / (matched + len(unexplained))
+        if confidence < self.min_confidence:
+            return None
+
+        return MetadataExtraction(
+            indexes=[
+                IndexMetadata(
+                    name=IndexesEnum.INDEX_OF_MENUS.value,
+                    entities=EntityClassification(
+                        recommended=recommended, exclude=exclude, queries_or_faqs=[]
+                    ),
+                )
+            ]
+        )
+
+    def extract(self, user_chat: dict) -> Optional[MetadataExtraction]:
+        """
+        Returns an extraction for a history-free prompt, or None when the
+        prompt needs the LLM.
+        """
+        extraction = None
+        if not user_chat.get("history"):
+            extraction = self._extract(user_chat.get("text") or "")
+        if extraction is None:
+            self.fallbacks += 1
+        else:
+            self.hits += 1
+        return extraction
+
+    def stats(self) -> dict:
+        total = self.hits + self.fallbacks
+        return {
+            "hits": self.hits,
+            "fallbacks": self.fallbacks,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
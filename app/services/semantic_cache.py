@@ -0,0 +1,100 @@
+import hashlib
+import json
+import time
+from typing import List, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+
+def context_key(response_format: type, *chunks: List[str]) -> int:
+    """
+    Hashes the response type and the retrieved chunks into a 64-bit key, so an
+    answer is only reused when it was generated from the same menu set.
+    """
+    payload = json.dumps(
+        [response_format.__name__, *[sorted(chunk) for chunk in chunks]],
+        ensure_ascii=False,
+    )
+    digest = hashlib.sha256(payload.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "little", signed=True)
+
+
+class SemanticResponseCache:
+    """
+    Reuses final chat completions for semantically near-identical queries.
+
+    Cached query vectors live in one preallocated float32 matrix, so a lookup
+    is a single matrix-vector product over all slots. An entry matches when its
+    context key is equal and its cosine similarity reaches `threshold`. Expired
+    slots are reused first, otherwise the least recently used slot is evicted.
+    A `maxsize` of 0 disables the cache: nothing is stored and every lookup
+    misses.
+    """
+
+    def __init__(
+        self,
+        dimension: int,
+        maxsize: int = 1024,
+        ttl: float = 3600,
+        threshold: float = 0.95,
+    ):
+        self.ttl = ttl
+        self.threshold = threshold
+        maxsize = max(maxsize, 0)
+        self.vectors = np.zeros((maxsize, dimension), dtype=np.float32)
+        self.context_keys = np.zeros(maxsize, dtype=np.int64)
+        self.expires_at = np.zeros(maxsize, dtype=np.float64)
+        self.last_used = np.zeros(maxsize, dtype=np.float64)
+        self.responses: List[Optional[BaseModel]] = [None] * maxsize
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, vector: List[float], key: int) -> Optional[BaseModel]:
+        now = time.time()
+        candidates = (self.expires_at > now) & (self.context_keys == key)
+        if not candidates.any():
+            self.misses += 1
+            return None
+        similarities = self.vectors @ self._normalize(vector)
+        similarities[~candidates] = -np.inf
+        slot = int(np.argmax(similarities))
+        if similarities[slot] < self.threshold:
+            self.misses += 1
+            return None
+        self.last_used[slot] = now
+        self.hits += 1
+        return self.responses[slot].model_copy(deep=True)
+
+    def store(self, vector: List[float], key: int, response: BaseModel):
+        if not self.responses:
+            return
+        now = time.time()
+        expired = np.flatnonzero(self.expires_at <= now)
+        slot = int(expired[0]) if expired.size else int(np.argmin(self.last_used))
+        self.vectors[slot] = self._normalize(vector)
+        self.context_keys[slot] = key
+        self.expires_at[slot] = now + self.ttl
+        self.last_used[slot] = now
+        self.responses[slot] = response.model_copy(deep=True)
+
+    def clear(self):
+        self.expires_at[:] = 0
+        self.responses = [None] * len(self.responses)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": int((self.expires_at > time.time()).sum()),
+            "maxsize": len(self.responses),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "threshold": self.threshold,
+        }
@@ -0,0 +1,90 @@
+from typing import List, Optional
+
+from app.constants import IndexesEnum
+from app.models.openSeachModel import (
+    EntityClassification,
+    IndexMetadata,
+    MetadataExtraction,
+)
+from app.utils.opensearch import SearchHit, entities_match, to_search_hit
+
+
+class SpeculativeRetrieval:
+    """
+    Unfiltered kNN retrieval over the menu index that runs while the metadata
+    extraction LLM call is still in flight.
+
+    Once extraction finishes, `select` post-filters the speculative hits with
+    the extracted entities. It returns None when too few hits survive, in which
+    case the caller issues the regular filtered query.
+    """
+
+    def __init__(self, k: int = 100):
+        self.k = k
+        self.requests = 0
+        self.hits = 0
+        self.fallbacks = 0
+        self.wasted = 0
+
+    @staticmethod
+    def extraction() -> MetadataExtraction:
+        """An extraction without entities, i.e. a `match_all` over the menus."""
+        return MetadataExtraction(
+            indexes=[
+                IndexMetadata(
+                    name=IndexesEnum.INDEX_OF_MENUS.value,
+                    entities=EntityClassification(recommended=[], exclude=[]),
+                )
+            ]
+        )
+
+    def select(
+        self,
+        dataset: Optional[dict],
+        extracted_indexes: MetadataExtraction,
+        k: int,
+        nutrition_ranges: Optional[dict] = None,
+    ) -> Optional[List[SearchHit]]:
+        index = next(
+            (
+                index
+                for index in extracted_indexes.indexes
+                if index.name == IndexesEnum.INDEX_OF_MENUS.value
+            ),
+            None,
+        )
+        if index is None:
+            self.wasted += 1
+            return None
+
+        responses = (dataset or {}).get("responses") or [{}]
+        response = responses[0]
+        if response.get("status") != 200:
+            self.fallbacks += 1
+            return None
+        hits = response.get("hits", {}).get("hits", [])
+        survivors = [
+            hit
+            for hit in (to_search_hit(hit, index.name) for hit in hits)
+            if entities_match(hit.metadata, index.entities, nutrition_ranges)
+        ]
+        # Fewer hits than asked for means every scoring document was returned,
+        # so the survivors are already the complete filtered result.
+        if len(survivors) < k and len(hits) >= self.k:
+            self.fallbacks += 1
+            return None
+        self.hits += 1
+        return survivors[:k]
+
+    def stats(self) -> dict:
+        return {
+            "k": self.k,
+            "requests": self.requests,
+            "hits": self.hits,
+            "fallbacks": self.fallbacks,
+            "wasted": self.wasted,
+            "hit_rate": round(self.hits / self.requests, 4) if self.requests else 0.0,
+            "fallback_rate": (
+                round(self.fallbacks / self.requests, 4) if self.requests else 0.0
+            ),
+        }
@@ -0,0 +1,80 @@
+import asyncio
+from abc import ABC, abstractmethod
+from logging import error
+from typing import Any, List, Optional
+
+
+class BatchWorker(ABC):
+    """
+    A bounded queue drained by one background task in batches of up to
+    `batch_size` items, or whatever arrived within `flush_seconds` of the
+    first one. Subclasses implement `_flush`.
+
+    `stop` waits (up to `timeout`) until every queued item was flushed.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        queue_size: int = 1000,
+        batch_size: int = 100,
+        flush_seconds: float = 1,
+    ):
+        self.name = name
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.queue: asyncio.Queue[Any] = asyncio.Queue(maxsize=queue_size)
+        self._task: Optional[asyncio.Task] = None
+
+    @abstractmethod
+    async def _flush(self, batch: List[Any]):
+        """Writes one batch. Exceptions are logged and the batch is dropped."""
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 10):
+        """Stops the worker after it flushed everything still queued."""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            error(f"{self.name} not flushed, {self.queue.qsize()} entries lost.")
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _collect_batch(self) -> List[Any]:
+        batch = [await self.queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect_batch()
+            try:
+                await self._flush(batch)
+            except Exception as e:
+                error(f"{self.name} failed to flush {len(batch)} entries: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def stats(self) -> dict:
+        return {"queue_depth": self.queue.qsize(), "queue_limit": self.queue.maxsize}
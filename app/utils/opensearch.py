@@ -1,6 +1,10 @@
 from langchain_core.documents import Document
+import math
+import pandas as pd
 import re
-from app.constants import IndexesEnum
+from typing import List, NamedTuple, Optional, Tuple
+from app.constants import NUTRITION_COLUMNS, IndexesEnum
+from app.models.openSeachModel import DishInfo
 from openai.types.chat import ChatCompletionMessageParam
 
 
@@ -33,33 +37,79 @@ def format_food_item(menu_dict) -> str:
     )
 
 
-def get_menu_dict(menu_item: str) -> dict:
+def format_food_items(df: pd.DataFrame) -> pd.Series:
+    """`format_food_item` for a whole chunk of menu rows at once."""
+    text = {column: df[column].astype(str) for column in df.columns}
+    return (
+        text["provider"]
+        + "'s "
+        + text["name"]
+        + " for "
+        + text["category"]
+        + " is "
+        + text["serving_size"]
+        + " with "
+        + text["calories"]
+        + " calories. It contains "
+        + text["fat_g"]
+        + "g of fat, "
+        + text["sat_fat_g"]
+        + "g of saturated fat, "
+        + text["cholesterol_mg"]
+        + "mg of cholesterol, "
+        + text["sodium_mg"]
+        + "mg of sodium, "
+        + text["carbohydrates_g"]
+        + "g of carbs, "
+        + text["sugar_g"]
+        + "g of sugar, "
+        + text["fiber_g"]
+        + "g of fiber, and "
+        + text["protein_g"]
+        + "g of protein."
+    )
+
+
+def parse_entities(entities: pd.Series) -> pd.Series:
+    """
+    Parses the `entities` column (Python list literals such as
+    "['keto', 'vegan']") with one vectorized regex instead of `literal_eval`.
+    """
+    matches = entities.fillna("").astype(str).str.findall(r"""(['"])(.*?)\1""")
+    return matches.map(lambda found: [value for _, value in found])
+
+
+def get_nutrition_records(df: pd.DataFrame) -> List[dict]:
+    """`get_nutrition` for a whole chunk of menu rows at once."""
+    values = pd.DataFrame(
+        {
+            column: (
+                pd.to_numeric(df[column], errors="coerce")
+                if column in df.columns
+                else math.nan
+            )
+            for column in NUTRITION_COLUMNS
+        },
+        index=df.index,
+        dtype=float,
+    )
+    values = values.astype(object).where(values.notna(), None)
+    return values.to_dict("records")
+
+
+def get_nutrition(menu_dict) -> dict:
     """
-    Extracts the menu item information from the given string.
+    Typed nutrition values of a menu row. Everything is stored as float so the
+    dynamic mapping types each field as a number; missing values become None.
     """
-    # Define the regex pattern to match the menu item information
-    pattern = r"([A-Za-z\s]+) for ([A-Za-z\s]+) is ([A-Za-z\s]+) with ([0-9]+) calories. It contains ([0-9]+)g of fat, ([0-9]+)g of saturated fat, ([0-9]+)mg of cholesterol, ([0-9]+)mg of sodium, ([0-9]+)g of carbs, ([0-9]+)g of sugar, ([0-9]+)g of fiber, and ([0-9]+)g of protein."
-    # Use re.search to find the first match in the string
-    match = re.search(pattern, menu_item)
-    # If a match is found, extract the information
-    if match:
-        return {
-            "provider": match.group(1),
-            "name": match.group(2),
-            "category": match.group(3),
-            "serving_size": match.group(4),
-            "calories": match.group(5),
-            "fat_g": match.group(6),
-            "sat_fat_g": match.group(7),
-            "cholesterol_mg": match.group(8),
-            "sodium_mg": match.group(9),
-            "carbohydrates_g": match.group(10),
-            "sugar_g": match.group(11),
-            "fiber_g": match.group(12),
-            "protein_g": match.group(13),
-        }
-    else:
-        return {}
+    nutrition = {}
+    for column in NUTRITION_COLUMNS:
+        try:
+            value = float(menu_dict.get(column))
+        except (TypeError, ValueError):
+            value = None
+        nutrition[column] = None if value is None or math.isnan(value) else value
+    return nutrition
 
 
 def get_chat_format(chat_history: dict, system_prompt) -> ChatCompletionMessageParam:
@@ -87,23 +137,95 @@ def get_completion_format(chat_history: dict, system_prompt: str) -> str:
     return "\n".join(formatted_history)
 
 
-def get_combined_chunks(dataset):
+class SearchHit(NamedTuple):
+    """A retrieved document, without the vector."""
+
+    index: str
+    id: str
+    score: float
+    text: str
+    metadata: dict
+
+
+def to_search_hit(doc: dict, index: Optional[str] = None) -> SearchHit:
+    source = doc.get("_source", {})
+    return SearchHit(
+        index=index or doc.get("_index"),
+        id=doc.get("_id"),
+        score=doc.get("_score"),
+        text=source.get("text", ""),
+        metadata=source.get("metadata") or {},
+    )
+
+
+def get_search_hits(
+    dataset, index_names: List[str]
+) -> Tuple[List[SearchHit], List[SearchHit]]:
+    """
+    Splits msearch results into menu and FAQ hits. Responses come back in
+    request order, so `index_names` (the logical names that were searched)
+    identifies them; a hit's `_index` is the physical index behind an alias.
+    """
     responses = dataset.get("responses")
-    combined_menus_chunks = []
-    info_chunks = []
-    for response in responses:
+    menu_hits = []
+    info_hits = []
+    for index_name, response in zip(index_names, responses):
         if response.get("status") == 200:
             index = response.get("hits", {}).get("hits", [])
             for docs in index:
-                if docs.get("_index") == IndexesEnum.INDEX_OF_MENUS.value:
-                    combined_menus_chunks.append(
-                        docs.get("_source", {}).get("text", "")
-                    )
-                elif docs.get("_index") == IndexesEnum.INDEX_OF_FAQ.value:
-                    info_chunks.append(
-                        docs.get("_source", {}).get("text", ""),
-                    )
-    return combined_menus_chunks, info_chunks
+                if index_name == IndexesEnum.INDEX_OF_MENUS.value:
+                    menu_hits.append(to_search_hit(docs, index_name))
+                elif index_name == IndexesEnum.INDEX_OF_FAQ.value:
+                    info_hits.append(to_search_hit(docs, index_name))
+    return menu_hits, info_hits
+
+
+def to_dish_info(metadata: dict) -> Optional[DishInfo]:
+    """
+    Builds a `DishInfo` from the structured menu record stored at ingest.
+    Returns None for documents ingested without one.
+    """
+    menu = metadata.get("menu")
+    nutrition = metadata.get("nutrition")
+    if not menu or not nutrition:
+        return None
+
+    def number(column):
+        value = nutrition.get(column)
+        return int(round(value)) if value is not None else 0
+
+    return DishInfo(
+        restaurant_name=menu.get("restaurant_name") or "",
+        dish=menu.get("dish") or "",
+        serving_size=number("serving_size"),
+        calories=number("calories"),
+        fat=number("fat_g"),
+        sat_fat=number("sat_fat_g"),
+        trans_fat=number("trans_fat_g"),
+        cholesterol=number("cholesterol_mg"),
+        sodium=number("sodium_mg"),
+        carbohydrates=number("carbohydrates_g"),
+        fiber=number("fiber_g"),
+        sugar=number("sugar_g"),
+        protein=number("protein_g"),
+    )
+
+
+def _present(value):
+    """None for pandas' missing values (NaN), which are not valid JSON."""
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+
+def get_menu_record(menu_dict) -> dict:
+    """
+    The structured part of a menu row that `to_dish_info` needs besides the
+    nutrition values.
+    """
+    return {
+        "restaurant_name": _present(menu_dict["provider"]),
+        "dish": _present(menu_dict["name"]),
+        "category": _present(menu_dict["category"]),
+    }
 
 
 def decode_unicode_emoji(text):
@@ -126,3 +248,60 @@ def check_entities(extracted_indexes):
         getattr(extracted_indexes.indexes[0].entities, attr, False)
         for attr in ["recommended", "queries_or_faqs", "exclude"]
     )
+
+
+def _analyze(text: str) -> list:
+    """Lower-cased word tokens, close to OpenSearch's standard analyzer."""
+    return re.findall(r"[^\W_]+", str(text).lower())
+
+
+def _in_range(value, bounds: dict) -> bool:
+    if value is None:
+        return False
+    return (
+        ("lt" not in bounds or value < bounds["lt"])
+        and ("lte" not in bounds or value <= bounds["lte"])
+        and ("gt" not in bounds or value > bounds["gt"])
+        and ("gte" not in bounds or value >= bounds["gte"])
+    )
+
+
+def entities_match(metadata: dict, entities, nutrition_ranges: dict = None) -> bool:
+    """
+    Evaluates the bool query built by `entity_filter` in-process: every
+    `recommended` entity must `match` (or fall in its nutrition range), at least
+    one `queries_or_faqs` entity must `match` when there is no `recommended`
+    one, and no `exclude` entity may `match_phrase` (or fall in its range).
+    """
+    metadata = metadata or {}
+    nutrition_ranges = nutrition_ranges or {}
+    nutrition = metadata.get("nutrition") or {}
+    sequences = [_analyze(value) for value in metadata.get("entities") or []]
+    tokens = {token for sequence in sequences for token in sequence}
+
+    def in_range(entity):
+        column, bounds = nutrition_ranges[entity]
+        return _in_range(nutrition.get(column), bounds)
+
+    def matches(entity):
+        if entity in nutrition_ranges:
+            return in_range(entity)
+        return any(token in tokens for token in _analyze(entity))
+
+    def matches_phrase(entity):
+        if entity in nutrition_ranges:
+            return in_range(entity)
+        phrase = _analyze(entity)
+        return bool(phrase) and any(
+            sequence[i : i + len(phrase)] == phrase
+            for sequence in sequences
+            for i in range(len(sequence) - len(phrase) + 1)
+        )
+
+    recommended = entities.recommended or []
+    should = entities.queries_or_faqs or []
+    if not all(matches(entity) for entity in recommended):
+        return False
+    if not recommended and should and not any(matches(entity) for entity in should):
+        return False
+    return not any(matches_phrase(entity) for entity in entities.exclude or [])
@@ -0,0 +1,123 @@
+"""
+Text extraction for the non-CSV upload formats.
+
+Everything here runs inside the parser process pool, so the functions are
+module-level (picklable) and import their libraries lazily.
+"""
+
+import json
+import os
+from typing import List, Optional
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+
+def _read_text(file_path: str) -> str:
+    with open(file_path, "r", encoding="utf-8", errors="replace") as file:
+        return file.read()
+
+
+def parse_pdf(file_path: str, start: int = 0, stop: Optional[int] = None) -> str:
+    import pdfplumber
+
+    with pdfplumber.open(file_path) as pdf:
+        pages = pdf.pages[start:stop]
+        return "\n\n".join(page.extract_text() or "" for page in pages)
+
+
+def parse_docx(file_path: str) -> str:
+    import docx
+
+    document = docx.Document(file_path)
+    return "\n\n".join(paragraph.text for paragraph in document.paragraphs)
+
+
+def parse_html(file_path: str) -> str:
+    from bs4 import BeautifulSoup
+
+    with open(file_path, "rb") as file:
+        soup = BeautifulSoup(file, "html.parser")
+    for tag in soup(["script", "style", "noscript"]):
+        tag.decompose()
+    return soup.get_text(separator="\n", strip=True)
+
+
+def _json_text(item) -> str:
+    return item if isinstance(item, str) else json.dumps(item, ensure_ascii=False)
+
+
+def parse_json_records(file_path: str) -> List[str]:
+    """One text per top-level item of a JSON array, or the whole document."""
+    with open(file_path, "r", encoding="utf-8") as file:
+        data = json.load(file)
+    items = data if isinstance(data, list) else [data]
+    return [_json_text(item) for item in items]
+
+
+def parse_jsonl_records(file_path: str) -> List[str]:
+    """One text per non-empty line, as the JSONL FAQ files are laid out."""
+    with open(file_path, "r", encoding="utf-8") as file:
+        return [line.strip() for line in file if line.strip()]
+
+
+PARSERS = {
+    ".txt": _read_text,
+    ".md": _read_text,
+    ".pdf": parse_pdf,
+    ".docx": parse_docx,
+    ".html": parse_html,
+    ".xhtml": parse_html,
+}
+
+# Menu CSVs are read row by row by the ingestion pipeline, not parsed here.
+CSV_FORMAT = ".csv"
+
+# Formats whose records are already chunk-sized and are not split further.
+RECORD_PARSERS = {
+    ".json": parse_json_records,
+    ".jsonl": parse_jsonl_records,
+}
+
+
+def file_format(file_path: str) -> str:
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == ".doc":
+        raise ValueError("Legacy .doc files are not supported, save them as .docx.")
+    if (
+        extension != CSV_FORMAT
+        and extension not in PARSERS
+        and extension not in RECORD_PARSERS
+    ):
+        raise ValueError(f"Invalid file type: {os.path.basename(file_path)}")
+    return extension
+
+
+def pdf_page_count(file_path: str) -> int:
+    import pdfplumber
+
+    with pdfplumber.open(file_path) as pdf:
+        return len(pdf.pages)
+
+
+def parse_and_split(
+    file_path: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    start: int = 0,
+    stop: Optional[int] = None,
+) -> List[str]:
+    """
+    Extracts the text of a file (or of pages `start:stop` of a PDF) and splits
+    it into chunks of at most `chunk_size` characters.
+    """
+    extension = file_format(file_path)
+    if extension in RECORD_PARSERS:
+        return RECORD_PARSERS[extension](file_path)
+    if extension == ".pdf":
+        text = parse_pdf(file_path, start, stop)
+    else:
+        text = PARSERS[extension](file_path)
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap
+    )
+    return [chunk for chunk in splitter.split_text(text) if chunk.strip()]
@@ -29,3 +29,15 @@ class PasswordManager:
         :return: True if the verification is successful, False otherwise.
         """
         return app_context.verify(password, hashed_password)
+
+    @staticmethod
+    def verify_and_update(password, hashed_password):
+        """
+        Verifies a password and, if its hash uses a deprecated scheme
+        (md5_crypt, des_crypt), rehashes it with the default scheme.
+
+        :param password: The plaintext password to verify.
+        :param hashed_password: The hashed password to verify against.
+        :return: (True if the verification is successful, the new hash or None).
+        """
+        return app_context.verify_and_update(password, hashed_password)
@@ -0,0 +1,153 @@
+from typing import Callable, Dict, List, Optional
+
+from app.constants import vectorSearchType
+from app.models.openSeachModel import EntityClassification, MetadataExtraction
+
+
+def _range(column: str, bounds: dict) -> dict:
+    return {"range": {f"metadata.nutrition.{column}": bounds}}
+
+
+def entity_filter(
+    entities: EntityClassification, nutrition_ranges: Optional[dict] = None
+) -> dict:
+    """
+    The bool query selecting documents by extracted entities.
+
+    Entities found in `nutrition_ranges` (calorie, portion and macronutrient
+    buckets) become cacheable `range` filters on the numeric nutrition fields;
+    everything else is matched against the `metadata.entities` text.
+    """
+    nutrition_ranges = nutrition_ranges or {}
+    recommended = entities.recommended or []
+    exclude = entities.exclude or []
+    return {
+        "bool": {
+            "filter": [
+                _range(*nutrition_ranges[entity])
+                for entity in recommended
+                if entity in nutrition_ranges
+            ],
+            "must": [
+                {"match": {"metadata.entities": entity}}
+                for entity in recommended
+                if entity not in nutrition_ranges
+            ],
+            "should": [
+                {"match": {"metadata.entities": entity}}
+                for entity in entities.queries_or_faqs or []
+            ],
+            "must_not": [
+                (
+                    _range(*nutrition_ranges[entity])
+                    if entity in nutrition_ranges
+                    else {"match_phrase": {"metadata.entities": entity}}
+                )
+                for entity in exclude
+            ],
+        }
+    }
+
+
+def script_scoring_query(
+    vector: List[float],
+    filter_query: dict,
+    k: int,
+    min_score: float,
+    space_type: str,
+) -> dict:
+    """
+    Exact search: scores every document matching `filter_query` with the
+    `knn_score` script. Cost grows linearly with the number of matches.
+    """
+    return {
+        "_source": {"excludes": ["vector_field"]},
+        "size": k,
+        "min_score": min_score,
+        "query": {
+            "script_score": {
+                "query": filter_query,
+                "script": {
+                    "lang": "knn",
+                    "source": "knn_score",
+                    "params": {
+                        "field": "vector_field",
+                        "query_value": vector,
+                        "space_type": space_type,
+                    },
+                },
+            }
+        },
+    }
+
+
+def approximate_query(
+    vector: List[float],
+    filter_query: dict,
+    k: int,
+    min_score: float,
+    space_type: str,
+) -> dict:
+    """
+    Approximate search: an HNSW `knn` query with `filter_query` applied as
+    an efficient filter during graph traversal. Needs an index created with
+    the faiss (or lucene) engine; `space_type` is fixed by the index mapping.
+    """
+    return {
+        "_source": {"excludes": ["vector_field"]},
+        "size": k,
+        "min_score": min_score,
+        "query": {
+            "knn": {
+                "vector_field": {
+                    "vector": vector,
+                    "k": k,
+                    "filter": filter_query,
+                }
+            }
+        },
+    }
+
+
+def vector_index_options(search_type: Optional[vectorSearchType]) -> dict:
+    """
+    `create_index` keyword arguments for an index served with `search_type`.
+    Approximate search uses faiss HNSW with inner product, which supports
+    efficient filtering and scores like the `knn_score` script.
+    """
+    if search_type == vectorSearchType.APPROXIMATE_SEARCH:
+        return {"engine": "faiss", "space_type": "innerproduct"}
+    return {}
+
+
+QUERY_BUILDERS: Dict[vectorSearchType, Callable[..., dict]] = {
+    vectorSearchType.SCRIPT_SCORING_SEARCH: script_scoring_query,
+    vectorSearchType.APPROXIMATE_SEARCH: approximate_query,
+}
+
+
+def build_vector_search(
+    vector: List[float],
+    cluster: MetadataExtraction,
+    k: int = 4,
+    min_score: float = 0,
+    space_type: str = "innerproduct",
+    search_types: Optional[Dict[str, vectorSearchType]] = None,
+    nutrition_ranges: Optional[dict] = None,
+) -> List[dict]:
+    """
+    Builds the msearch body for every extracted index, using the search type
+    configured for that index (script scoring by default).
+    """
+    query = []
+    for index in cluster.indexes:
+        search_type = (search_types or {}).get(
+            index.name, vectorSearchType.SCRIPT_SCORING_SEARCH
+        )
+        builder = QUERY_BUILDERS.get(search_type)
+        if builder is None:
+            raise ValueError(f"Unsupported vector search type: {search_type.value}")
+        query.append({"index": index.name})
+        filter_query = entity_filter(index.entities, nutrition_ranges)
+        query.append(builder(vector, filter_query, k, min_score, space_type))
+    return query
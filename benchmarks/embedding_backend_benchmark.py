@@ -0,0 +1,106 @@
+"""
+Checks the ONNX embedding backends against torch and compares throughput:
+cosine drift (mean and worst case) of onnx and onnx-int8 vectors versus the
+HuggingFaceEmbeddings ones, and texts per second per backend and batch size.
+
+Texts are the formatted rows of a menu CSV, so drift is measured on what we
+actually index.
+
+    python -m benchmarks.embedding_backend_benchmark --csv menus.csv --threads 2
+"""
+
+import argparse
+import statistics
+import time
+from ast import literal_eval
+
+import numpy as np
+import pandas as pd
+from langchain_huggingface import HuggingFaceEmbeddings
+
+from app.constants import embedding_model_dimension
+from app.models.settings import Settings
+from app.services.embedding_backends import OnnxEmbeddings
+from app.utils.opensearch import format_food_item
+
+QUERIES = [
+    "high protein breakfast",
+    "keto lunch without cheese",
+    "something light and low in sodium",
+    "gluten free chicken sandwich",
+]
+
+
+def load_texts(csv_path, limit):
+    df = pd.read_csv(csv_path, nrows=limit)
+    if "entities" in df.columns:
+        df["entities"] = df["entities"].map(literal_eval)
+    return [format_food_item(row) for _, row in df.iterrows()] + QUERIES
+
+
+def throughput(model, texts, batch_size, repeat):
+    model.embed_documents(texts[:batch_size])  # warm up
+    rates = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for start in range(0, len(texts), batch_size):
+            model.embed_documents(texts[start : start + batch_size])
+        rates.append(len(texts) / (time.perf_counter() - started))
+    return statistics.median(rates)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--csv", default="trader_and_chees_menus.csv")
+    parser.add_argument("--limit", type=int, default=512)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--batch-sizes", default="1,8,32")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-drift", type=float, default=0.01)
+    args = parser.parse_args()
+
+    settings = Settings()
+    texts = load_texts(args.csv, args.limit)
+    backends = {
+        "torch": HuggingFaceEmbeddings(model_name=settings.EMBEDDING_MODEL_NAME),
+        "onnx": OnnxEmbeddings(
+            settings.EMBEDDING_MODEL_NAME,
+            model_dir=settings.EMBEDDING_ONNX_DIR,
+            intra_op_threads=args.threads,
+        ),
+        "onnx-int8": OnnxEmbeddings(
+            settings.EMBEDDING_MODEL_NAME,
+            model_dir=settings.EMBEDDING_ONNX_DIR,
+            quantize=True,
+            intra_op_threads=args.threads,
+        ),
+    }
+    print(f"model={settings.EMBEDDING_MODEL_NAME} texts={len(texts)} threads={args.threads}")
+
+    reference = np.asarray(backends["torch"].embed_documents(texts), dtype=np.float32)
+    reference /= np.linalg.norm(reference, axis=1, keepdims=True)
+    failed = False
+    for name, model in backends.items():
+        vectors = np.asarray(model.embed_documents(texts), dtype=np.float32)
+        assert vectors.shape[1] == embedding_model_dimension, vectors.shape
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        drift = 1 - (vectors * reference).sum(axis=1)
+        failed |= name != "onnx-int8" and drift.max() > args.max_drift
+        print(f"{name:>10}: drift mean={drift.mean():.6f} max={drift.max():.6f}")
+
+    for batch_size in map(int, args.batch_sizes.split(",")):
+        rates = {
+            name: throughput(model, texts, batch_size, args.repeat)
+            for name, model in backends.items()
+        }
+        print(
+            f"batch={batch_size:>3}: "
+            + " ".join(f"{name}={rate:.0f}/s" for name, rate in rates.items())
+        )
+
+    if failed:
+        raise SystemExit(f"fp32 ONNX drift exceeds {args.max_drift}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Compares exact (script_score) and approximate (HNSW knn) vector search on one
+index: latency percentiles per mode and recall@k of the approximate results
+against the exact ones, with and without entity filters.
+
+The index must be mapped for approximate search (faiss engine, inner product),
+e.g. created with VECTOR_SEARCH_TYPES={"index-of-menus": "approximate_search"}.
+Script scoring works on the same index, so both modes see identical data.
+
+    python -m benchmarks.knn_benchmark --index index-of-menus --k 10 --repeat 20
+"""
+
+import argparse
+import statistics
+import time
+
+from langchain_huggingface import HuggingFaceEmbeddings
+from opensearchpy import OpenSearch
+
+from app.constants import vectorSearchType
+from app.models.openSeachModel import EntityClassification
+from app.models.settings import Settings
+from app.utils.query_builder import QUERY_BUILDERS, entity_filter
+
+QUERIES = [
+    ("high protein breakfast", EntityClassification(recommended=[], exclude=[])),
+    ("keto lunch", EntityClassification(recommended=["keto"], exclude=[])),
+    (
+        "light meal without much sodium",
+        EntityClassification(recommended=["low-calorie"], exclude=["high-sodium"]),
+    ),
+    ("gluten free chicken", EntityClassification(recommended=["Gluten-Free"], exclude=[])),
+    (
+        "big filling dinner",
+        EntityClassification(recommended=["large-portion", "high-protein"], exclude=[]),
+    ),
+    ("sweet treat", EntityClassification(recommended=[], exclude=["sugar-free"])),
+]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def run(client, index, search_type, vector, entities, k):
+    body = QUERY_BUILDERS[search_type](
+        vector, entity_filter(entities), k, 0, "innerproduct"
+    )
+    started = time.perf_counter()
+    response = client.search(index=index, body=body, request_cache=False)
+    took = (time.perf_counter() - started) * 1000
+    return took, [hit["_id"] for hit in response["hits"]["hits"]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--index", default="index-of-menus")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    settings = Settings()
+    client = OpenSearch(
+        settings.DEV_OPENSEARCH_URL,
+        http_auth=(
+            settings.OPENSEARCH_INITIAL_ADMIN_USERNAME,
+            settings.OPENSEARCH_INITIAL_ADMIN_PASSWORD,
+        ),
+        use_ssl=False,
+        verify_certs=False,
+        ssl_show_warn=False,
+    )
+    embeddings = HuggingFaceEmbeddings(model_name=settings.EMBEDDING_MODEL_NAME)
+    doc_count = client.count(index=args.index)["count"]
+    print(f"index={args.index} docs={doc_count} k={args.k} repeat={args.repeat}")
+
+    latencies = {search_type: [] for search_type in QUERY_BUILDERS}
+    recalls = []
+    for text, entities in QUERIES:
+        vector = embeddings.embed_query(text)
+        results = {}
+        for search_type in QUERY_BUILDERS:
+            run(client, args.index, search_type, vector, entities, args.k)  # warm up
+            for _ in range(args.repeat):
+                took, ids = run(client, args.index, search_type, vector, entities, args.k)
+                latencies[search_type].append(took)
+            results[search_type] = ids
+        exact = set(results[vectorSearchType.SCRIPT_SCORING_SEARCH])
+        approximate = set(results[vectorSearchType.APPROXIMATE_SEARCH])
+        recall = len(exact & approximate) / len(exact) if exact else 1.0
+        recalls.append(recall)
+        print(f"  {text!r}: recall@{args.k}={recall:.2f}")
+
+    for search_type, values in latencies.items():
+        print(
+            f"{search_type.value:>20}: p50={percentile(values, 0.5):.1f}ms "
+            f"p95={percentile(values, 0.95):.1f}ms mean={statistics.mean(values):.1f}ms"
+        )
+    print(f"mean recall@{args.k}={statistics.mean(recalls):.3f}")
+
+
+if __name__ == "__main__":
+    main()
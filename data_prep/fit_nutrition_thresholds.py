@@ -0,0 +1,112 @@
+"""
+Fits the per-serving cut-offs of `NUTRITION_THRESHOLDS` to a labeled menu CSV.
+
+Every row's entities carry its calorie/portion/macronutrient buckets
+(e.g. "low-cholesterol", "mid-carb"). For each nutrient this picks the
+("free" below, "low" up to, "high" from) triple that reproduces the most
+labels under the same rules as `app.constants._nutrition_ranges`, and prints
+it next to the agreement of the thresholds currently in use.
+
+    python -m data_prep.fit_nutrition_thresholds --csv data_prep/chick-fil-a.csv
+"""
+
+import argparse
+from ast import literal_eval
+
+import numpy as np
+import pandas as pd
+
+from app.constants import NUTRITION_RANGES, NUTRITION_THRESHOLDS
+
+BUCKETS = ("free", "low", "mid", "high")
+
+
+def bucket_labels(entities, nutrient: str):
+    """The bucket ("free", "low", "mid", "high") `entities` give `nutrient`."""
+    names = {
+        f"{nutrient}-free": "free",
+        f"low-{nutrient}": "low",
+        f"mid-{nutrient}": "mid",
+        f"high-{nutrient}": "high",
+    }
+    # The renamed entities of `_nutrition_ranges`.
+    aliases = {
+        "calorie": {"no-calories": "free"},
+        "portion": {
+            "no-serving-size": "free",
+            "small-portion": "low",
+            "medium-portion": "mid",
+            "large-portion": "high",
+        },
+    }
+    names.update(aliases.get(nutrient, {}))
+    for entity in entities:
+        if entity in names and entity in NUTRITION_RANGES:
+            return names[entity]
+    return None
+
+
+def classify(values: np.ndarray, free: float, low: float, high: float) -> np.ndarray:
+    return np.select(
+        [values < free, values <= low, values < high],
+        ["free", "low", "mid"],
+        default="high",
+    )
+
+
+def fit(values: np.ndarray, labels: np.ndarray):
+    """Best (free, low, high) over the observed values, by labels reproduced."""
+    candidates = np.unique(values)
+    # counts[b][i]: rows labeled b with a value below candidates[i]
+    counts = {
+        bucket: np.searchsorted(np.sort(values[labels == bucket]), candidates)
+        for bucket in BUCKETS
+    }
+    totals = {bucket: int((labels == bucket).sum()) for bucket in BUCKETS}
+    # rows labeled b with a value at most candidates[i]
+    at_most = {
+        bucket: np.searchsorted(
+            np.sort(values[labels == bucket]), candidates, side="right"
+        )
+        for bucket in BUCKETS
+    }
+    best, best_score = None, -1
+    for i, free in enumerate(candidates):
+        for j in range(i, len(candidates)):
+            low_hits = at_most["low"][j] - counts["low"][i]
+            # mid: low < value < high, high: value >= high, for every high > low
+            mid_hits = counts["mid"][j + 1 :] - at_most["mid"][j]
+            high_hits = totals["high"] - counts["high"][j + 1 :]
+            if not len(mid_hits):
+                continue
+            scores = counts["free"][i] + low_hits + mid_hits + high_hits
+            k = int(np.argmax(scores))
+            if scores[k] > best_score:
+                best_score = int(scores[k])
+                best = (free, candidates[j], candidates[j + 1 + k])
+    return best, best_score
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--csv", default="data_prep/chick-fil-a.csv")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.csv)
+    entities = df["entities"].map(literal_eval)
+    for nutrient, (column, *current) in NUTRITION_THRESHOLDS.items():
+        labels = entities.map(lambda row: bucket_labels(row, nutrient))
+        values = pd.to_numeric(df[column], errors="coerce")
+        known = labels.notna() & values.notna()
+        values, labels = values[known].to_numpy(float), labels[known].to_numpy()
+        (free, low, high), score = fit(values, labels)
+        in_use = (classify(values, *current) == labels).sum()
+        print(
+            f"{nutrient:12} fitted ({free:g}, {low:g}, {high:g}) "
+            f"{score / len(labels):.0%}, in use {tuple(current)} "
+            f"{in_use / len(labels):.0%} of {len(labels)} labels"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import asyncio
+import csv
+import gzip
+from types import SimpleNamespace
+
+from pymongo.errors import BulkWriteError
+
+from app.logger import PromptLogSink
+from app.services.mongo_writer import MongoWriteBuffer
+from app.utils.batch_worker import BatchWorker
+
+
+class RecordingWorker(BatchWorker):
+    def __init__(self, **kwargs):
+        super().__init__("recording", **kwargs)
+        self.batches = []
+
+    async def _flush(self, batch):
+        if "boom" in batch:
+            raise RuntimeError("boom")
+        self.batches.append(batch)
+
+
+def test_batches_are_capped_and_everything_is_flushed_on_stop():
+    async def run():
+        worker = RecordingWorker(batch_size=4, flush_seconds=0.05)
+        for item in range(10):
+            worker.queue.put_nowait(item)
+        worker.start()
+        await worker.stop()
+        return worker.batches
+
+    batches = asyncio.run(run())
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+    assert sum(batches, []) == list(range(10))
+
+
+def test_failed_flush_does_not_stop_the_worker():
+    async def run():
+        worker = RecordingWorker(batch_size=1, flush_seconds=0.01)
+        worker.start()
+        for item in ["a", "boom", "b"]:
+            await worker.queue.put(item)
+        await worker.stop()
+        return worker.batches
+
+    assert asyncio.run(run()) == [["a"], ["b"]]
+
+
+def test_prompt_log_writes_csv_and_rotates_compressed(tmp_path):
+    path = tmp_path / "logs.csv"
+
+    async def run():
+        sink = PromptLogSink(
+            path=str(path), batch_size=5, flush_seconds=0.01, max_bytes=200
+        )
+        sink.start()
+        for i in range(20):
+            sink.log(f"prompt {i}", {"answer": i})
+            await asyncio.sleep(0)
+        await sink.stop()
+        return sink
+
+    sink = asyncio.run(run())
+    rotated = sorted(tmp_path.glob("logs-*.csv.gz"))
+    assert sink.written == 20 and sink.rotations == len(rotated) > 0
+    rows = []
+    for file in rotated:
+        with gzip.open(file, "rt", newline="") as handle:
+            rows += list(csv.reader(handle))[1:]
+    with open(path, newline="") as handle:
+        rows += list(csv.reader(handle))[1:]
+    assert [row[1] for row in rows] == [f"prompt {i}" for i in range(20)]
+
+
+def test_prompt_log_drops_when_full(tmp_path):
+    async def run():
+        sink = PromptLogSink(path=str(tmp_path / "logs.csv"), queue_size=2)
+        for i in range(5):
+            sink.log("prompt", i)
+        return sink.stats()
+
+    stats = asyncio.run(run())
+    assert stats["queue_depth"] == 2 and stats["dropped"] == 3
+
+
+class FakeCollection:
+    name = "feedback"
+
+    def __init__(self, fail_once=0):
+        self.documents = []
+        self.fail_once = fail_once
+
+    async def insert_many(self, documents, ordered=True):
+        assert ordered is False
+        if self.fail_once:
+            failed, self.fail_once = self.fail_once, 0
+            self.documents += documents[failed:]
+            raise BulkWriteError({"writeErrors": [{}] * failed})
+        self.documents += documents
+        return SimpleNamespace(inserted_ids=list(range(len(documents))))
+
+
+def test_mongo_buffer_counts_partial_failures():
+    collection = FakeCollection(fail_once=1)
+
+    async def run():
+        buffer = MongoWriteBuffer(collection, batch_size=3, flush_seconds=0.01)
+        buffer.start()
+        for i in range(6):
+            await buffer.put({"i": i})
+        await buffer.stop()
+        return buffer.stats()
+
+    stats = asyncio.run(run())
+    assert stats["written"] == 5 and stats["failed"] == 1
+    assert stats["queue_depth"] == 0 and stats["flushes"] >= 2
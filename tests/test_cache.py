@@ -0,0 +1,69 @@
+import pytest
+
+from app.utils import cache
+from app.utils.cache import LRUCache, TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    return now
+
+
+def test_lru_evicts_least_recently_used():
+    lru = LRUCache(maxsize=2)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    assert lru.get("a") == 1  # "b" is now the least recently used
+    lru.set("c", 3)
+    assert "b" not in lru
+    assert lru.get("a") == 1 and lru.get("c") == 3
+    assert len(lru) == 2
+
+
+def test_lru_stats_count_hits_and_misses():
+    lru = LRUCache(maxsize=2)
+    lru.set("a", 1)
+    lru.get("a")
+    lru.get("a")
+    assert lru.get("missing", "default") == "default"
+    assert lru.stats() == {
+        "size": 1,
+        "maxsize": 2,
+        "hits": 2,
+        "misses": 1,
+        "hit_rate": 0.6667,
+    }
+
+
+def test_lru_with_no_room_stores_nothing():
+    lru = LRUCache(maxsize=0)
+    lru.set("a", 1)
+    assert len(lru) == 0 and lru.get("a") is None
+
+
+def test_ttl_entries_expire(clock):
+    ttl = TTLCache(maxsize=4, ttl=10)
+    ttl.set("a", 1)
+    clock[0] += 9
+    assert ttl.get("a") == 1
+    clock[0] += 1
+    assert ttl.get("a") is None
+    assert "a" not in ttl
+    assert ttl.stats()["expired"] == 1 and ttl.stats()["misses"] == 1
+
+
+def test_ttl_honours_explicit_expiry(clock):
+    ttl = TTLCache(maxsize=4, ttl=3600)
+    ttl.set("token", "claims", expires_at=clock[0] + 5)
+    assert ttl.get("token") == "claims"
+    clock[0] += 5
+    assert ttl.get("token") is None
+
+
+def test_ttl_pop_returns_the_value():
+    ttl = TTLCache(maxsize=4, ttl=10)
+    ttl.set("a", 1)
+    assert ttl.pop("a") == 1
+    assert ttl.pop("a", "gone") == "gone"
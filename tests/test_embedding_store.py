@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from app.services import embedding_store
+from app.services.embedding_store import EmbeddingStore, text_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(embedding_store.time, "time", lambda: now[0])
+    return now
+
+
+def vector(seed, dimension=4):
+    return np.random.default_rng(seed).random(dimension, dtype=np.float32)
+
+
+def test_put_and_get(tmp_path):
+    store = EmbeddingStore(str(tmp_path), "model-a", 4)
+    keys = [text_key(f"chunk {i}") for i in range(3)]
+    store.put_many({key: vector(i) for i, key in enumerate(keys)})
+    found = store.get_many([*keys, text_key("unknown"), keys[0]])
+    assert set(found) == set(keys)
+    for i, key in enumerate(keys):
+        np.testing.assert_array_equal(found[key], vector(i))
+    assert store.stats()["hits"] == 3 and store.stats()["misses"] == 1
+
+
+def test_existing_keys_are_not_overwritten(tmp_path):
+    store = EmbeddingStore(str(tmp_path), "model-a", 4)
+    store.put_many({"a": vector(1)})
+    store.put_many({"a": vector(2), "b": vector(3)})
+    assert store.size == 2
+    np.testing.assert_array_equal(store.get_many(["a"])["a"], vector(1))
+
+
+def test_grows_and_persists(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_store, "INITIAL_CAPACITY", 2)
+    store = EmbeddingStore(str(tmp_path), "model-a", 4)
+    for i in range(5):
+        store.put_many({str(i): vector(i)})
+    store.close()
+
+    reopened = EmbeddingStore(str(tmp_path), "model-a", 4)
+    assert reopened.size == 5
+    found = reopened.get_many([str(i) for i in range(5)])
+    for i in range(5):
+        np.testing.assert_array_equal(found[str(i)], vector(i))
+
+
+def test_compact_drops_unused_rows(tmp_path, clock):
+    store = EmbeddingStore(str(tmp_path), "model-a", 4)
+    store.put_many({"old": vector(1), "kept": vector(2)})
+    clock[0] += 100
+    store.put_many({"new": vector(3)})
+    store.get_many(["kept"])
+    old_file = store.file
+
+    assert store.compact(max_age_seconds=50) == {"rows": 2, "removed": 1}
+    assert not (tmp_path / old_file).exists()
+    found = store.get_many(["old", "kept", "new"])
+    assert set(found) == {"kept", "new"}
+    np.testing.assert_array_equal(found["kept"], vector(2))
+    np.testing.assert_array_equal(found["new"], vector(3))
+
+    # the renumbered rows are what a reopened store sees
+    store.close()
+    reopened = EmbeddingStore(str(tmp_path), "model-a", 4)
+    np.testing.assert_array_equal(reopened.get_many(["new"])["new"], vector(3))
+
+
+def test_other_namespace_or_dimension_discards_vectors(tmp_path):
+    store = EmbeddingStore(str(tmp_path), "model-a", 4)
+    store.put_many({"a": vector(1)})
+    store.close()
+
+    store = EmbeddingStore(str(tmp_path), "model-b", 4)
+    assert store.size == 0 and store.get_many(["a"]) == {}
+    store.put_many({"a": vector(1)})
+    store.close()
+
+    store = EmbeddingStore(str(tmp_path), "model-b", 8)
+    assert store.size == 0 and store.get_many(["a"]) == {}
+    assert [path.name for path in tmp_path.glob("*.f32")] == [store.file]
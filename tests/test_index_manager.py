@@ -0,0 +1,124 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from opensearchpy import ConflictError, NotFoundError
+
+from app.services import index_manager
+from app.services.index_manager import IndexManager, ReindexInProgress
+
+
+class FakeLeaseClient:
+    """The document calls behind reindex markers and ingest leases, on a dict."""
+
+    def __init__(self):
+        self.docs = {}
+        self.seq_no = 0
+
+    def _put(self, doc_id, body):
+        self.seq_no += 1
+        self.docs[doc_id] = {"_source": dict(body), "_seq_no": self.seq_no}
+
+    async def create(self, index, id, body, refresh):
+        if id in self.docs:
+            raise ConflictError(409, "version_conflict_engine_exception", {})
+        self._put(id, body)
+
+    async def index(self, index, id, body, refresh, if_seq_no=None, **kwargs):
+        if if_seq_no is not None and self.docs[id]["_seq_no"] != if_seq_no:
+            raise ConflictError(409, "version_conflict_engine_exception", {})
+        self._put(id, body)
+
+    async def get(self, index, id):
+        if id not in self.docs:
+            raise NotFoundError(404, "not_found", {})
+        return {**self.docs[id], "_primary_term": 1}
+
+    async def update(self, index, id, body, refresh):
+        self._put(id, {**self.docs[id]["_source"], **body["doc"]})
+
+    async def delete(self, index, id, refresh, ignore):
+        self.docs.pop(id, None)
+
+    async def search(self, index, body):
+        kind, alias, expires = body["query"]["bool"]["filter"]
+        now = expires["range"]["expires_at"]["gt"]
+        total = sum(
+            doc["_source"]["kind"] == kind["term"]["kind.keyword"]
+            and doc["_source"]["alias"] == alias["term"]["alias.keyword"]
+            and doc["_source"]["expires_at"] > now
+            for doc in self.docs.values()
+        )
+        return {"hits": {"total": {"value": total}}}
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setattr(index_manager, "DRAIN_POLL_SECONDS", 0.01)
+    client = FakeLeaseClient()
+    return IndexManager(SimpleNamespace(async_client=client), dimension=4)
+
+
+def test_uploads_are_refused_during_a_reindex(manager):
+    async def run():
+        await manager._claim_reindex("menus")
+        with pytest.raises(ReindexInProgress):
+            async with manager.ingesting("menus"):
+                pass
+        # other aliases are not affected
+        async with manager.ingesting("faqs"):
+            pass
+
+    asyncio.run(run())
+    assert list(manager.client.docs) == ["reindex:menus"]
+
+
+def test_one_reindex_per_alias(manager):
+    async def run():
+        await manager._claim_reindex("menus")
+        with pytest.raises(ReindexInProgress):
+            await manager._claim_reindex("menus")
+        # a dead holder's marker expires and is taken over
+        manager.client.docs["reindex:menus"]["_source"]["expires_at"] = 0
+        await manager._claim_reindex("menus")
+
+    asyncio.run(run())
+
+
+def test_reindex_waits_for_running_uploads(manager, monkeypatch):
+    events = []
+
+    async def rebuild(alias, *args):
+        events.append("rebuild")
+        return {"alias": alias}
+
+    monkeypatch.setattr(manager, "_rebuild", rebuild)
+
+    async def upload():
+        async with manager.ingesting("menus"):
+            await asyncio.sleep(0.1)
+            events.append("upload")
+
+    async def run():
+        uploading = asyncio.create_task(upload())
+        await asyncio.sleep(0.01)
+        result = await manager.reindex("menus")
+        await uploading
+        return result
+
+    assert asyncio.run(run()) == {"alias": "menus"}
+    assert events == ["upload", "rebuild"]
+    assert manager.client.docs == {}
+
+
+def test_reindex_gives_up_on_uploads_that_do_not_finish(manager, monkeypatch):
+    async def run():
+        async with manager.ingesting("menus"):
+            with pytest.raises(ReindexInProgress):
+                await manager.reindex("menus", drain_timeout=0.05)
+        # the marker was released, so uploads are accepted again
+        async with manager.ingesting("menus"):
+            pass
+
+    asyncio.run(run())
+    assert manager.client.docs == {}
@@ -0,0 +1,174 @@
+import asyncio
+import json
+
+from app.constants import IngestMode
+from app.services.ingestion import BulkIngestor, iter_csv_chunks, iterate_in_thread
+
+HEADER = (
+    "provider,category,name,serving_size,calories,fat_g,sat_fat_g,trans_fat_g,"
+    "cholesterol_mg,sodium_mg,carbohydrates_g,fiber_g,sugar_g,protein_g,entities\n"
+)
+
+
+def write_menu(tmp_path, rows, name="menu.csv"):
+    path = tmp_path / name
+    path.write_text(HEADER + "".join(row + "\n" for row in rows), encoding="utf-8")
+    return str(path)
+
+
+def read_all(path, chunk_rows=1000):
+    texts, metadatas, ids = [], [], []
+    for chunk_texts, chunk_metadatas, chunk_ids in iter_csv_chunks(path, chunk_rows):
+        texts += chunk_texts
+        metadatas += chunk_metadatas
+        ids += chunk_ids
+    return texts, metadatas, ids
+
+
+def test_missing_values_are_stored_as_null(tmp_path):
+    path = write_menu(
+        tmp_path,
+        [
+            "Cheesecake Factory,null,Roasted Chicken,null,600,38.0,null,null,null,null,0,"
+            "null,null,65,\"['Keto']\""
+        ],
+    )
+    _, metadatas, _ = read_all(path)
+    # OpenSearch rejects NaN, so the metadata must be strict JSON.
+    json.dumps(metadatas, allow_nan=False)
+    assert metadatas[0]["menu"]["category"] is None
+    assert metadatas[0]["nutrition"]["sodium_mg"] is None
+    assert metadatas[0]["nutrition"]["calories"] == 600.0
+
+
+ROWS = [
+    "Chick-fil-A,Breakfast,Hash Browns,Small,270,18,4,0,0,410,25,3,0,3,\"['vegan']\"",
+    "Chick-fil-A,Breakfast,Hash Browns,Large,420,28,6,0,0,640,39,4,0,4,\"['vegan']\"",
+    "Chick-fil-A,null,Side Salad,null,80,4.5,2,0,10,70,null,2,4,4,\"['keto']\"",
+]
+
+
+def test_ids_are_stable_across_reads_and_chunk_sizes(tmp_path):
+    path = write_menu(tmp_path, ROWS)
+    texts, metadatas, ids = read_all(path)
+    assert read_all(path, chunk_rows=1) == (texts, metadatas, ids)
+    # one id per row, repeated dishes included
+    assert len(set(ids)) == len(ROWS)
+    assert all(metadata["source"] == "menu.csv" for metadata in metadatas)
+
+
+def test_changed_row_keeps_its_id_with_a_new_hash(tmp_path):
+    _, before, before_ids = read_all(write_menu(tmp_path, ROWS))
+    changed = [ROWS[0], ROWS[1].replace(",420,", ",430,"), ROWS[2]]
+    _, after, after_ids = read_all(write_menu(tmp_path, changed))
+    assert after_ids == before_ids
+    hashes = [metadata["content_hash"] for metadata in before]
+    new_hashes = [metadata["content_hash"] for metadata in after]
+    assert new_hashes[0] == hashes[0] and new_hashes[2] == hashes[2]
+    assert new_hashes[1] != hashes[1]
+
+
+def test_ids_ignore_case_and_spacing(tmp_path):
+    _, _, ids = read_all(write_menu(tmp_path, ROWS))
+    respelled = [ROWS[0].replace("Hash Browns", "hash  browns"), *ROWS[1:]]
+    _, _, respelled_ids = read_all(write_menu(tmp_path, respelled))
+    assert respelled_ids == ids
+    # the same rows under another file name are other documents
+    _, _, other_ids = read_all(write_menu(tmp_path, ROWS, "other.csv"))
+    assert not set(other_ids) & set(ids)
+
+
+class FakeIndices:
+    async def refresh(self, index):
+        pass
+
+
+class FakeOpenSearch:
+    """The handful of client calls `BulkIngestor` makes, on a dict."""
+
+    def __init__(self):
+        self.docs = {}
+        self.indices = FakeIndices()
+
+    async def mget(self, index, body, _source_includes):
+        return {
+            "docs": [
+                (
+                    {"_id": doc_id, "found": True, "_source": self.docs[doc_id]}
+                    if doc_id in self.docs
+                    else {"_id": doc_id, "found": False}
+                )
+                for doc_id in body["ids"]
+            ]
+        }
+
+    async def bulk(self, body):
+        items = []
+        for action, document in zip(body, body[1:] + [None]):
+            if "index" in action:
+                doc_id = action["index"]["_id"]
+                result = "updated" if doc_id in self.docs else "created"
+                self.docs[doc_id] = document
+                items.append({"index": {"result": result}})
+            elif "delete" in action:
+                self.docs.pop(action["delete"]["_id"])
+                items.append({"delete": {"result": "deleted"}})
+        return {"errors": False, "items": items}
+
+    async def search(self, index, body, scroll):
+        source = body["query"]["term"]["metadata.source.keyword"]
+        hits = [
+            {"_id": doc_id}
+            for doc_id, document in self.docs.items()
+            if document["metadata"]["source"] == source
+        ]
+        return {"_scroll_id": "scroll", "hits": {"hits": hits}}
+
+    async def scroll(self, scroll_id, scroll):
+        return {"_scroll_id": scroll_id, "hits": {"hits": []}}
+
+    async def clear_scroll(self, scroll_id, ignore):
+        pass
+
+
+class FakeEmbeddings:
+    def embed_documents(self, texts):
+        return [[0.0] for _ in texts]
+
+
+def ingest(client, path, delete_missing=False):
+    async def run():
+        ingestor = BulkIngestor(
+            client,
+            FakeEmbeddings(),
+            "menus",
+            mode=IngestMode.UPSERT,
+            delete_missing=delete_missing,
+        )
+        return await ingestor.ingest(iterate_in_thread(iter_csv_chunks(path)))
+
+    return asyncio.run(run())
+
+
+def dishes(client, source):
+    return sorted(
+        document["metadata"]["menu"]["dish"]
+        for document in client.docs.values()
+        if document["metadata"]["source"] == source
+    )
+
+
+def test_delete_missing_keeps_dishes_another_file_lists(tmp_path):
+    client = FakeOpenSearch()
+    ingest(client, write_menu(tmp_path, ROWS[1:], "a.csv"))
+    ingest(client, write_menu(tmp_path, ROWS[1:], "b.csv"))
+    assert dishes(client, "a.csv") == dishes(client, "b.csv")
+
+    # a.csv again: nothing changed, b.csv's upload did not take its rows over
+    assert ingest(client, write_menu(tmp_path, ROWS[1:], "a.csv"))["unchanged"] == 2
+
+    # b.csv drops the salad, which a.csv still lists
+    stats = ingest(client, write_menu(tmp_path, ROWS[1:2], "b.csv"), True)
+    assert stats["deleted"] == 1
+    assert dishes(client, "b.csv") == ["Hash Browns"]
+    assert dishes(client, "a.csv") == ["Hash Browns", "Side Salad"]
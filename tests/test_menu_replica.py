@@ -0,0 +1,70 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from app.models.openSeachModel import EntityClassification
+from app.services import menu_replica
+from app.services.menu_replica import MenuReplica
+
+DIMENSION = 64
+EVERYTHING = EntityClassification(recommended=[], exclude=[])
+
+
+def docs(count, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((count, DIMENSION))
+    return [
+        {
+            "_id": str(row),
+            "_source": {
+                "text": f"dish {row}",
+                "vector_field": vector.tolist(),
+                "metadata": {"entities": ["keto" if row % 2 else "vegan"]},
+            },
+        }
+        for row, vector in enumerate(vectors)
+    ]
+
+
+def replica(documents, quantize):
+    replica = MenuReplica(client=None, index="menus", quantize=quantize)
+    replica.snapshot = replica._build(documents, generation=1)
+    return replica
+
+
+@pytest.mark.parametrize("rows", [1, 1000, 2500])
+def test_quantized_dots_match_float32(monkeypatch, rows):
+    monkeypatch.setattr(menu_replica, "QUANTIZED_BLOCK_ROWS", 1000)
+    documents = docs(rows)
+    query = np.random.default_rng(1).standard_normal(DIMENSION).astype(np.float32)
+    exact = replica(documents, quantize=False).snapshot.dots(query)
+    quantized = replica(documents, quantize=True).snapshot.dots(query)
+    assert quantized.dtype == np.float32
+    np.testing.assert_allclose(quantized, exact, atol=0.05 * np.abs(exact).max())
+
+
+def test_quantized_search_ranks_like_float32():
+    documents = docs(500)
+    query = documents[42]["_source"]["vector_field"]
+    keto = EntityClassification(recommended=["keto"], exclude=[])
+    for entities in (EVERYTHING, keto):
+        exact = replica(documents, quantize=False).search(query, entities, k=5)
+        quantized = replica(documents, quantize=True).search(query, entities, k=5)
+        assert [hit.id for hit in quantized][:1] == [hit.id for hit in exact][:1]
+    assert all(int(hit.id) % 2 for hit in quantized)
+
+
+def test_quantized_search_allocates_about_one_block():
+    rows = 20 * menu_replica.QUANTIZED_BLOCK_ROWS
+    quantized = replica(docs(rows), quantize=True)
+    query = np.ones(DIMENSION, dtype=np.float32)
+    quantized.snapshot.dots(query)
+
+    tracemalloc.start()
+    quantized.snapshot.dots(query)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    block = menu_replica.QUANTIZED_BLOCK_ROWS * DIMENSION * 4
+    # one float32 block buffer plus the float32 dot per row
+    assert peak <= block + rows * 4 + 64 * 1024
+    assert peak < rows * DIMENSION * 4 / 4
@@ -0,0 +1,43 @@
+import pytest
+
+from app.constants import NUTRITION_RANGES
+
+
+def buckets(column, value):
+    """Every bucket entity whose range contains `value` of `column`."""
+    checks = {
+        "lt": lambda bound: value < bound,
+        "lte": lambda bound: value <= bound,
+        "gt": lambda bound: value > bound,
+        "gte": lambda bound: value >= bound,
+    }
+    return {
+        entity
+        for entity, (range_column, bounds) in NUTRITION_RANGES.items()
+        if range_column == column
+        and all(checks[op](bound) for op, bound in bounds.items())
+    }
+
+
+# Rows of data_prep/chick-fil-a.csv and the buckets they are labeled with.
+@pytest.mark.parametrize(
+    "column, value, entity",
+    [
+        ("calories", 460, "high-calorie"),  # Chicken Biscuit
+        ("carbohydrates_g", 45, "mid-carb"),  # Chicken Biscuit
+        ("cholesterol_mg", 95, "low-cholesterol"),
+        ("cholesterol_mg", 45, "low-cholesterol"),  # Chicken Biscuit
+        ("sodium_mg", 1510, "high-sodium"),  # Chicken Biscuit
+        ("serving_size", 153, "medium-portion"),  # Chicken Biscuit
+        ("calories", 0, "no-calories"),
+    ],
+)
+def test_labeled_values_fall_in_their_bucket(column, value, entity):
+    assert entity in buckets(column, value)
+
+
+def test_mid_and_high_buckets_do_not_overlap():
+    for entity, (column, bounds) in NUTRITION_RANGES.items():
+        if entity.startswith("mid-"):
+            high = NUTRITION_RANGES["high-" + entity[len("mid-") :]][1]
+            assert bounds["lt"] == high["gte"]
@@ -0,0 +1,40 @@
+import pytest
+
+from app.utils.parsers import file_format, parse_and_split, parse_jsonl_records
+
+
+@pytest.mark.parametrize(
+    "path, expected",
+    [
+        ("uploads/menus.csv", ".csv"),
+        ("uploads/MENUS.CSV", ".csv"),
+        ("faq.jsonl", ".jsonl"),
+        ("report.pdf", ".pdf"),
+        ("notes.md", ".md"),
+    ],
+)
+def test_file_format_accepts_supported_uploads(path, expected):
+    assert file_format(path) == expected
+
+
+def test_file_format_rejects_legacy_doc():
+    with pytest.raises(ValueError, match="docx"):
+        file_format("menu.doc")
+
+
+def test_file_format_rejects_unknown_extension():
+    with pytest.raises(ValueError, match="Invalid file type: menu.exe"):
+        file_format("uploads/menu.exe")
+
+
+def test_parse_jsonl_records_skips_blank_lines(tmp_path):
+    path = tmp_path / "faq.jsonl"
+    path.write_text('{"q": "a"}\n\n{"q": "b"}\n', encoding="utf-8")
+    assert parse_jsonl_records(str(path)) == ['{"q": "a"}', '{"q": "b"}']
+
+
+def test_parse_and_split_drops_blank_chunks(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("first paragraph\n\n\n\nsecond paragraph", encoding="utf-8")
+    chunks = parse_and_split(str(path), chunk_size=20, chunk_overlap=0)
+    assert chunks == ["first paragraph", "second paragraph"]
@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+from passlib.hash import md5_crypt
+
+from app.services.password_hasher import PasswordHasher, PasswordHasherBusy
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(workers=1, queue_timeout=0.05)
+    yield hasher
+    hasher.shutdown()
+
+
+def test_hash_and_verify(hasher):
+    async def run():
+        hashed = await hasher.hash_password("secret")
+        return hashed, await hasher.verify_password("secret", hashed)
+
+    hashed, verified = asyncio.run(run())
+    assert hashed.startswith("$5$") and verified
+
+
+def test_legacy_hash_is_upgraded_on_success_only(hasher):
+    legacy = md5_crypt.hash("secret")
+
+    async def run():
+        return (
+            await hasher.verify_and_update("secret", legacy),
+            await hasher.verify_and_update("wrong", legacy),
+        )
+
+    (verified, new_hash), (rejected, no_hash) = asyncio.run(run())
+    assert verified and new_hash.startswith("$5$")
+    assert not rejected and no_hash is None
+    assert hasher.stats()["rehashed"] == 1
+
+
+def test_callers_over_capacity_time_out(hasher):
+    async def run():
+        return await asyncio.gather(
+            *(hasher.hash_password("secret") for _ in range(3)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+    assert isinstance(results[0], str)
+    assert all(isinstance(result, PasswordHasherBusy) for result in results[1:])
+    stats = hasher.stats()
+    assert stats["timeouts"] == 2 and stats["hashes"] == 1
+    # hashing time excludes the time spent waiting for a slot
+    assert stats["avg_hash_ms"] > 0 and stats["avg_wait_ms"] < stats["avg_hash_ms"]
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from app.services import rate_limiter
+from app.services.rate_limiter import InMemoryRateLimiter, RateLimiter, limiter_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: now[0])
+    return now
+
+
+def hits(limiter, key, count, limit=5, interval=10):
+    async def run():
+        return [await limiter.hit(key, limit, interval) for _ in range(count)]
+
+    return asyncio.run(run())
+
+
+def test_rate_limiter_is_abstract():
+    with pytest.raises(TypeError):
+        RateLimiter()
+
+
+def test_limit_within_a_window(clock):
+    limiter = InMemoryRateLimiter()
+    assert hits(limiter, "a", 7) == [True] * 5 + [False] * 2
+    assert hits(limiter, "b", 1) == [True]
+    assert limiter.stats()["allowed"] == 6 and limiter.stats()["limited"] == 2
+
+
+def test_previous_window_is_weighted_by_its_overlap(clock):
+    limiter = InMemoryRateLimiter()
+    hits(limiter, "a", 5)
+    clock[0] += 10  # the full previous window still counts
+    assert hits(limiter, "a", 1) == [False]
+    clock[0] += 5  # half of it counts: 2.5 + 0, 2.5 + 1, 2.5 + 2 < 5
+    assert hits(limiter, "a", 4) == [True, True, True, False]
+    clock[0] += 20  # two windows later nothing carries over
+    assert hits(limiter, "a", 5) == [True] * 5
+
+
+def test_idle_and_excess_keys_are_evicted(clock):
+    limiter = InMemoryRateLimiter(max_keys=3)
+    for key in "abcde":
+        hits(limiter, key, 1)
+    assert limiter.stats()["keys"] == 3 and limiter.stats()["evicted"] == 2
+    clock[0] += 100
+    hits(limiter, "z", 1)
+    assert limiter.stats()["keys"] == 1
+
+
+def test_limiter_key_hides_the_token():
+    key = limiter_key("secret.jwt.token", 60)
+    assert key.startswith("60:") and "secret" not in key
+    assert limiter_key("secret.jwt.token", 1) != key
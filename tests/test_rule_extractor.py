@@ -0,0 +1,56 @@
+import pytest
+
+from app.constants import IndexesEnum
+from app.services.rule_extractor import RuleBasedExtractor
+
+
+@pytest.fixture(scope="module")
+def extractor():
+    return RuleBasedExtractor()
+
+
+def entities(extractor, text, history=None):
+    extraction = extractor.extract({"text": text, "history": history or []})
+    if extraction is None:
+        return None
+    (index,) = extraction.indexes
+    assert index.name == IndexesEnum.INDEX_OF_MENUS.value
+    return index.entities.recommended, index.entities.exclude
+
+
+def test_synonyms_map_to_canonical_entities(extractor):
+    assert entities(extractor, "low carb, high-protein") == (
+        ["low-carb", "high-protein"],
+        [],
+    )
+    assert entities(extractor, "gluten free dishes please") == (["Gluten-Free"], [])
+    assert entities(extractor, "plant-based keto") == (["vegan", "keto"], [])
+
+
+def test_negation_excludes_within_its_clause(extractor):
+    assert entities(extractor, "plant-based keto, no high-fat") == (
+        ["vegan", "keto"],
+        ["high-fat"],
+    )
+    assert entities(extractor, "keto without high-carb") == (["keto"], ["high-carb"])
+    assert entities(extractor, "no high-fat, keto") == (["keto"], ["high-fat"])
+
+
+def test_falls_back_to_the_llm(extractor):
+    # questions belong to the FAQ index
+    assert entities(extractor, "what is keto?") is None
+    # nothing from the vocabulary
+    assert entities(extractor, "something tasty and cheap for my kids tonight") is None
+    # too many words the rules cannot explain
+    assert entities(extractor, "vegan meals my grandmother used to cook") is None
+    # contradicting itself
+    assert entities(extractor, "vegan dishes but no vegan") is None
+    # follow-ups depend on the history
+    assert entities(extractor, "keto", history=[{"role": "user"}]) is None
+
+
+def test_stats():
+    extractor = RuleBasedExtractor()
+    entities(extractor, "keto")
+    entities(extractor, "what is keto?")
+    assert extractor.stats() == {"hits": 1, "fallbacks": 1, "hit_rate": 0.5}
@@ -0,0 +1,36 @@
+from pydantic import BaseModel
+
+from app.services.semantic_cache import SemanticResponseCache, context_key
+
+
+class Answer(BaseModel):
+    text: str
+
+
+def test_similar_queries_reuse_the_answer():
+    cache = SemanticResponseCache(dimension=3, maxsize=2, threshold=0.95)
+    key = context_key(Answer, ["menu a", "menu b"])
+    cache.store([1, 0, 0], key, Answer(text="grilled nuggets"))
+    assert cache.lookup([0.99, 0.05, 0], key) == Answer(text="grilled nuggets")
+    assert cache.lookup([0, 1, 0], key) is None
+    # same query, other retrieved menus
+    assert cache.lookup([1, 0, 0], context_key(Answer, ["menu c"])) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_least_recently_used_slot_is_evicted():
+    cache = SemanticResponseCache(dimension=2, maxsize=2)
+    cache.store([1, 0], 1, Answer(text="a"))
+    cache.store([0, 1], 1, Answer(text="b"))
+    cache.lookup([1, 0], 1)
+    cache.store([1, 1], 1, Answer(text="c"))
+    assert cache.lookup([1, 0], 1) == Answer(text="a")
+    assert cache.lookup([0, 1], 1) is None
+
+
+def test_size_zero_disables_the_cache():
+    for maxsize in (0, -1):
+        cache = SemanticResponseCache(dimension=3, maxsize=maxsize)
+        cache.store([1, 0, 0], 1, Answer(text="a"))
+        assert cache.lookup([1, 0, 0], 1) is None
+        assert cache.stats()["size"] == 0 and cache.stats()["maxsize"] == 0